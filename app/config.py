@@ -0,0 +1,136 @@
+
+import os
+import tempfile
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+
+USER_AGENT = os.getenv(
+    "USER_AGENT",
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+)
+
+# Shared async HTTP client
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+
+# Bounded executor for code that has to stay blocking (HTML parsing, MySQL writes)
+BLOCKING_WORKERS = int(os.getenv("BLOCKING_WORKERS", "8"))
+
+# /products.json crawl: Shopify caps `limit` at 250 per page
+PRODUCTS_PAGE_LIMIT = int(os.getenv("PRODUCTS_PAGE_LIMIT", "250"))
+PRODUCTS_FANOUT = int(os.getenv("PRODUCTS_FANOUT", "4"))
+PRODUCTS_MAX_PAGES = int(os.getenv("PRODUCTS_MAX_PAGES", "200"))
+
+# POST /insights/batch: stores scraped at once, overall and per host
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_PER_HOST_CONCURRENCY = int(os.getenv("BATCH_PER_HOST_CONCURRENCY", "2"))
+BATCH_MAX_URLS = int(os.getenv("BATCH_MAX_URLS", "500"))
+
+# Per-host request scheduling: a token bucket of HOST_RATE requests/s (bursts of HOST_BURST; 0 = unlimited)
+# that halves on 429 down to HOST_MIN_RATE and creeps back on success; transient failures (429, 5xx,
+# connection errors) are retried HTTP_RETRIES times with jittered exponential backoff, honouring
+# Retry-After up to RETRY_AFTER_MAX seconds; CIRCUIT_FAILURES consecutive failures take a host out
+# of rotation for CIRCUIT_COOLDOWN seconds
+HOST_RATE = float(os.getenv("HOST_RATE", "10"))
+HOST_BURST = int(os.getenv("HOST_BURST", "20"))
+HOST_MIN_RATE = float(os.getenv("HOST_MIN_RATE", "0.5"))
+HOST_POLICY_MAX_HOSTS = int(os.getenv("HOST_POLICY_MAX_HOSTS", "10000"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
+RETRY_BACKOFF_BASE = float(os.getenv("RETRY_BACKOFF_BASE", "0.5"))
+RETRY_BACKOFF_MAX = float(os.getenv("RETRY_BACKOFF_MAX", "10"))
+RETRY_AFTER_MAX = float(os.getenv("RETRY_AFTER_MAX", "30"))
+CIRCUIT_FAILURES = int(os.getenv("CIRCUIT_FAILURES", "5"))
+CIRCUIT_COOLDOWN = float(os.getenv("CIRCUIT_COOLDOWN", "60"))
+
+# On-disk HTTP cache revalidated with If-None-Match / If-Modified-Since; empty dir disables it. Defaults
+# to the temp dir, the one writable place on read-only deployments (Vercel); cache I/O errors count as misses
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", os.path.join(tempfile.gettempdir(), "shopify_insights_http_cache"))
+HTTP_CACHE_TTL = float(os.getenv("HTTP_CACHE_TTL", str(7 * 24 * 3600)))
+HTTP_CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# LLM structuring result cache: in-process LRU in front of a SQLite file in the temp dir (empty path =
+# memory only); the file tier is dropped if it can't be opened, so the cache never fails a request
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(tempfile.gettempdir(), "shopify_insights_llm_cache.sqlite3"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "256"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(30 * 24 * 3600)))
+
+# Chunked LLM structuring: rough token budget per Groq call and product description cut-off
+LLM_CHUNK_TOKENS = int(os.getenv("LLM_CHUNK_TOKENS", "6000"))
+LLM_DESCRIPTION_CHARS = int(os.getenv("LLM_DESCRIPTION_CHARS", "400"))
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "4"))
+# Default for the per-request `llm` flag: off | partial | full
+LLM_MODE = os.getenv("LLM_MODE", "full")
+
+# MySQL writer: pooled connections, child rows inserted with executemany in batches. All DB work runs
+# on the blocking executor, so the pool defaults to one connection per BLOCKING_WORKERS thread; a
+# checkout waits up to DB_POOL_TIMEOUT seconds for a free connection when the pool is smaller
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", str(BLOCKING_WORKERS)))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_BATCH_SIZE = int(os.getenv("DB_BATCH_SIZE", "500"))
+# incremental: diff child rows and write only what changed; replace: delete and re-insert them
+DB_WRITE_MODE = os.getenv("DB_WRITE_MODE", "incremental")
+# Append a product_snapshots row whenever a product's price or availability changes between writes
+PRODUCT_SNAPSHOTS = os.getenv("PRODUCT_SNAPSHOTS", "true").lower() in ("1", "true", "yes")
+
+# Secondary pages (policies, FAQ, about, contact): per-page timeout, time budget for the whole
+# stage, and how many pages it may fetch per store
+SECONDARY_PAGE_TIMEOUT = float(os.getenv("SECONDARY_PAGE_TIMEOUT", "5"))
+SECONDARY_BUDGET = float(os.getenv("SECONDARY_BUDGET", "8"))
+SECONDARY_MAX_PAGES = int(os.getenv("SECONDARY_MAX_PAGES", "10"))
+
+# Contact mining: country code for phone numbers written without one when the store's TLD implies
+# none (empty: keep them as national digits), and process-pool fan-out (0 disables it) for crawls
+# with at least CONTACT_MINING_MIN_BYTES of page text
+PHONE_DEFAULT_COUNTRY_CODE = os.getenv("PHONE_DEFAULT_COUNTRY_CODE", "")
+CONTACT_MINING_PROCESSES = int(os.getenv("CONTACT_MINING_PROCESSES", "0"))
+CONTACT_MINING_MIN_BYTES = int(os.getenv("CONTACT_MINING_MIN_BYTES", str(4 * 1024 * 1024)))
+
+# Stored-insights endpoints: default freshness (seconds) before a lookup re-scrapes the store,
+# page sizes for product listing/search, and the in-memory response cache in front of MySQL
+STORED_MAX_AGE = float(os.getenv("STORED_MAX_AGE", str(24 * 3600)))
+STORED_PAGE_SIZE = int(os.getenv("STORED_PAGE_SIZE", "50"))
+STORED_MAX_PAGE_SIZE = int(os.getenv("STORED_MAX_PAGE_SIZE", "250"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "60"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+
+# Competitor discovery: seed stores (one domain or URL per line, # comments) ranked by TF-IDF similarity of
+# their stored catalogs; the index over stored products is rebuilt at most every COMPETITOR_INDEX_TTL seconds,
+# and competitors scraped within COMPETITOR_MAX_AGE seconds are served from storage instead of re-scraped
+COMPETITOR_SEEDS_FILE = os.getenv(
+    "COMPETITOR_SEEDS_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "competitor_seeds.txt"))
+COMPETITOR_TOP_N = int(os.getenv("COMPETITOR_TOP_N", "5"))
+COMPETITOR_MAX_TOP_N = int(os.getenv("COMPETITOR_MAX_TOP_N", "20"))
+COMPETITOR_INDEX_TTL = float(os.getenv("COMPETITOR_INDEX_TTL", "600"))
+COMPETITOR_MAX_AGE = float(os.getenv("COMPETITOR_MAX_AGE", str(24 * 3600)))
+
+# Write pipeline results to MySQL; benchmarks turn this off to run without a database
+PERSIST_INSIGHTS = os.getenv("PERSIST_INSIGHTS", "true").lower() in ("1", "true", "yes")
+
+# Add a per-stage Server-Timing header to API responses (exposes internal timings, so off by default)
+SERVER_TIMING = os.getenv("SERVER_TIMING", "false").lower() in ("1", "true", "yes")
+
+# Background refresh scheduler: re-scrapes known stores every REFRESH_INTERVAL seconds (or the
+# store's own brand_insights.refresh_interval), spread by +/- REFRESH_JITTER of the interval
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "false").lower() in ("1", "true", "yes")
+REFRESH_INTERVAL = float(os.getenv("REFRESH_INTERVAL", str(24 * 3600)))
+REFRESH_JITTER = float(os.getenv("REFRESH_JITTER", "0.1"))
+REFRESH_CONCURRENCY = int(os.getenv("REFRESH_CONCURRENCY", "4"))
+REFRESH_POLL_INTERVAL = float(os.getenv("REFRESH_POLL_INTERVAL", "60"))
+# llm mode for background refreshes (empty: LLM_MODE)
+REFRESH_LLM_MODE = os.getenv("REFRESH_LLM_MODE", "") or None
+
+# Scrape jobs (POST /api/v1/insights/jobs): queued in the scrape_jobs table and run by worker.py
+# (WORKER_JOB_WORKERS at a time), or by JOB_WORKERS workers inside the API process. The API only
+# enqueues by default, so serverless and database-less deployments don't poll MySQL. Workers poll
+# for queued jobs every JOB_POLL_INTERVAL seconds and heartbeat running ones every JOB_HEARTBEAT
+# seconds; a running job without a heartbeat for JOB_STALE_AFTER seconds (its process died) is
+# requeued, up to JOB_MAX_ATTEMPTS runs. Finished jobs are deleted after JOB_RETENTION seconds.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "0"))
+WORKER_JOB_WORKERS = int(os.getenv("WORKER_JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "2"))
+JOB_HEARTBEAT = float(os.getenv("JOB_HEARTBEAT", "15"))
+JOB_STALE_AFTER = float(os.getenv("JOB_STALE_AFTER", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", str(7 * 24 * 3600)))
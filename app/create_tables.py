@@ -1,13 +1,11 @@
 import os
 from sqlalchemy import create_engine
-from dotenv import load_dotenv
 from models.db_models import Base
+import config  # loads .env
 
-load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL")
-engine = create_engine(DATABASE_URL)
 
 if __name__ == "__main__":
     print("Creating tables...")
-    Base.metadata.create_all(engine)
+    Base.metadata.create_all(create_engine(DATABASE_URL))
     print("Tables created!")
@@ -1,8 +1,6 @@
 import os
 import mysql.connector
-from dotenv import load_dotenv
-
-load_dotenv()
+import config  # loads .env
 
 DB_HOST = os.getenv("DB_HOST")
 DB_USER = os.getenv("DB_USER")
@@ -20,7 +18,8 @@ TABLES['brand_insights'] = (
         return_refund_policy LONGTEXT,
         about_brand LONGTEXT,
         extracted_at DATETIME,
-        important_links JSON
+        important_links JSON,
+        refresh_interval INT NULL
     ) ENGINE=InnoDB;
     """
 )
@@ -37,6 +36,8 @@ TABLES['products'] = (
         available VARCHAR(16),
         url VARCHAR(255),
         image_url VARCHAR(255),
+        INDEX idx_products_brand (brand_id, id),
+        FULLTEXT INDEX ft_products_text (title, description),
         FOREIGN KEY (brand_id) REFERENCES brand_insights(id) ON DELETE CASCADE
     ) ENGINE=InnoDB;
     """
@@ -54,6 +55,7 @@ TABLES['hero_products'] = (
         available VARCHAR(16),
         url VARCHAR(255),
         image_url VARCHAR(255),
+        INDEX idx_hero_products_brand (brand_id, id),
         FOREIGN KEY (brand_id) REFERENCES brand_insights(id) ON DELETE CASCADE
     ) ENGINE=InnoDB;
     """
@@ -97,6 +99,63 @@ TABLES['contact_info'] = (
     """
 )
 
+TABLES['product_snapshots'] = (
+    """
+    CREATE TABLE IF NOT EXISTS product_snapshots (
+        id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        brand_id INT NOT NULL,
+        product_id VARCHAR(64) NOT NULL,
+        price VARCHAR(64),
+        available TINYINT(1),
+        captured_at DATETIME NOT NULL,
+        INDEX idx_snapshots_product (brand_id, product_id, captured_at),
+        INDEX idx_snapshots_captured (captured_at),
+        FOREIGN KEY (brand_id) REFERENCES brand_insights(id) ON DELETE CASCADE
+    ) ENGINE=InnoDB;
+    """
+)
+
+TABLES['scrape_jobs'] = (
+    """
+    CREATE TABLE IF NOT EXISTS scrape_jobs (
+        id CHAR(32) PRIMARY KEY,
+        store_url VARCHAR(255) NOT NULL,
+        llm_mode VARCHAR(16) NOT NULL,
+        status VARCHAR(16) NOT NULL,
+        progress JSON,
+        result LONGTEXT,
+        error JSON,
+        attempts INT NOT NULL DEFAULT 0,
+        created_at DATETIME NOT NULL,
+        started_at DATETIME NULL,
+        finished_at DATETIME NULL,
+        updated_at DATETIME NOT NULL,
+        -- '<llm_mode> <store_url>' while queued or running, NULL once finished: at most one active job per key
+        active_key VARCHAR(272) NULL,
+        INDEX idx_scrape_jobs_status (status, created_at),
+        INDEX idx_scrape_jobs_store (store_url, status),
+        UNIQUE INDEX uq_scrape_jobs_active (active_key)
+    ) ENGINE=InnoDB;
+    """
+)
+
+# Columns and indexes added after the first release; CREATE TABLE IF NOT EXISTS won't add them to existing tables
+MIGRATIONS = [
+    # per-store re-scrape interval in seconds for the refresh scheduler (NULL: REFRESH_INTERVAL)
+    "ALTER TABLE brand_insights ADD COLUMN refresh_interval INT NULL",
+    # keyset pagination of a store's catalog: WHERE brand_id=? AND id > ? ORDER BY id
+    "ALTER TABLE products ADD INDEX idx_products_brand (brand_id, id)",
+    "ALTER TABLE hero_products ADD INDEX idx_hero_products_brand (brand_id, id)",
+    # product search: MATCH(title, description) AGAINST (...)
+    "ALTER TABLE products ADD FULLTEXT INDEX ft_products_text (title, description)",
+    # one active job per store and llm mode, enforced by the database (jobs queued before this aren't covered)
+    "ALTER TABLE scrape_jobs ADD COLUMN active_key VARCHAR(272) NULL",
+    "ALTER TABLE scrape_jobs ADD UNIQUE INDEX uq_scrape_jobs_active (active_key)",
+]
+
+DUPLICATE_COLUMN_NAME = 1060
+DUPLICATE_KEY_NAME = 1061
+
 def create_database(cursor):
     try:
         cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{DB_NAME}` DEFAULT CHARACTER SET 'utf8mb4'")
@@ -120,6 +179,12 @@ def main():
             cursor.execute(table_description)
         except mysql.connector.Error as err:
             print(f"Failed creating table {table_name}: {err}")
+    for statement in MIGRATIONS:
+        try:
+            cursor.execute(statement)
+        except mysql.connector.Error as err:
+            if err.errno not in (DUPLICATE_COLUMN_NAME, DUPLICATE_KEY_NAME):
+                print(f"Failed migrating ({statement}): {err}")
     cursor.close()
     cnx.close()
     print("All tables created!")
@@ -1,95 +1,407 @@
+import sys
 import os
-import mysql.connector
+for _path in (os.path.join(os.path.dirname(__file__), 'utils'),
+              os.path.dirname(__file__)):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+import hashlib
 import json
-from dotenv import load_dotenv
-
-load_dotenv()
+import logging
+import re
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+from concurrency import run_blocking
+from metrics import track, DB_ROWS
+import config  # loads .env
 
 DB_HOST = os.getenv("DB_HOST")
 DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 DB_NAME = os.getenv("DB_NAME")
 
-def insert_brand_insights(data: dict):
-    cnx = mysql.connector.connect(
-        host=DB_HOST,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        database=DB_NAME
-    )
-    cursor = cnx.cursor()
-    # Insert into brand_insights
-    add_brand = ("""
-        INSERT INTO brand_insights
-        (store_url, privacy_policy, return_refund_policy, about_brand, extracted_at, important_links)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-            privacy_policy=VALUES(privacy_policy),
-            return_refund_policy=VALUES(return_refund_policy),
-            about_brand=VALUES(about_brand),
-            extracted_at=VALUES(extracted_at),
-            important_links=VALUES(important_links)
-    """)
-    extracted_at = data.get("extracted_at")
-    if not extracted_at:
-        extracted_at = None
-    brand_values = (
-        data.get("store_url"),
-        data.get("privacy_policy"),
-        data.get("return_refund_policy"),
-        data.get("about_brand"),
-        extracted_at,
-        json.dumps(data.get("important_links", {}))
-    )
-    cursor.execute(add_brand, brand_values)
-    cnx.commit()
-    # Get brand_id
-    cursor.execute("SELECT id FROM brand_insights WHERE store_url=%s", (data.get("store_url"),))
-    brand_id = cursor.fetchone()[0]
-    # Helper to clear and insert child tables
-    def clear_and_insert(table, items, columns):
-        print(f"Inserting into {table}: items={items}")
-        cursor.execute(f"DELETE FROM {table} WHERE brand_id=%s", (brand_id,))
-        if not items:
+logger = logging.getLogger(__name__)
+
+PRODUCT_COLUMNS = ["id", "title", "description", "price", "available", "url", "image_url"]
+FAQ_COLUMNS = ["question", "answer"]
+SOCIAL_COLUMNS = ["platform", "url", "handle"]
+CONTACT_COLUMNS = ["emails", "phone_numbers", "addresses"]
+JSON_COLUMNS = set(CONTACT_COLUMNS)
+SNAPSHOT_COLUMNS = ["product_id", "price", "available", "captured_at"]
+
+_pool = None
+_pool_lock = threading.Lock()
+_pool_slots: Optional[threading.BoundedSemaphore] = None
+
+def get_pool():
+    """Return the shared MySQL connection pool (mysql.connector.pooling), creating it on first use"""
+    global _pool, _pool_slots
+    if _pool is None:
+        with _pool_lock:
+            # executor threads can get here together; only one of them builds the pool
+            if _pool is None:
+                # imported here so a cold start that never touches MySQL doesn't pay for the driver
+                from mysql.connector import pooling
+                _pool_slots = threading.BoundedSemaphore(config.DB_POOL_SIZE)
+                _pool = pooling.MySQLConnectionPool(
+                    pool_name="insights",
+                    pool_size=config.DB_POOL_SIZE,
+                    pool_reset_session=True,
+                    host=DB_HOST,
+                    user=DB_USER,
+                    password=DB_PASSWORD,
+                    database=DB_NAME
+                )
+    return _pool
+
+
+class _PooledConnection:
+    """A pooled connection that gives its checkout slot back when closed"""
+
+    def __init__(self, cnx, slots: threading.BoundedSemaphore):
+        self._cnx = cnx
+        self._slots = slots
+        self._closed = False
+
+    def close(self):
+        if self._closed:
             return
-        for item in items:
+        self._closed = True
+        try:
+            self._cnx.close()
+        finally:
+            self._slots.release()
+
+    def __getattr__(self, name):
+        return getattr(self._cnx, name)
+
+
+def get_connection():
+    """
+    Check a connection out of the shared pool. mysql.connector raises PoolError at once when the
+    pool is exhausted, so callers wait up to DB_POOL_TIMEOUT seconds for a free one instead.
+    """
+    pool = get_pool()
+    if not _pool_slots.acquire(timeout=config.DB_POOL_TIMEOUT):
+        from mysql.connector.errors import PoolError
+        raise PoolError(f"No pooled MySQL connection free after {config.DB_POOL_TIMEOUT:g}s")
+    try:
+        return _PooledConnection(pool.get_connection(), _pool_slots)
+    except BaseException:
+        _pool_slots.release()
+        raise
+
+def strip_html(text):
+    if not text or not isinstance(text, str):
+        return text
+    return re.sub(r'<[^>]+>', '', text)
+
+def _db_value(value):
+    # The LLM may return nested objects (e.g. a structured description); store them as JSON text
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+def _comparable(column: str, value):
+    """Normalize a value so a freshly scraped row and the stored row compare equal when unchanged"""
+    if value is None:
+        return None
+    if column in JSON_COLUMNS:
+        try:
+            value = json.loads(value) if isinstance(value, (str, bytes)) else value
+        except ValueError:
+            return str(value)
+        return json.dumps(value, sort_keys=True, ensure_ascii=False)
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, bytes):
+        return value.decode('utf-8')
+    return str(value)
+
+# Stable identifiers for the incremental diff
+def _product_key(row: dict):
+    return str(row.get("id"))
+
+def _faq_key(row: dict):
+    return hashlib.sha1((row.get("question") or "").strip().lower().encode('utf-8')).hexdigest()
+
+def _social_key(row: dict):
+    return (row.get("platform"), row.get("url"))
+
+def _single_row_key(row: dict):
+    return "contact"
+
+def _availability(value) -> Optional[int]:
+    # the stored column holds '1'/'0' from the writer and 'True'/'False' from older rows
+    if value is None:
+        return None
+    return int(str(value).lower() in ('1', 'true'))
+
+def snapshot_time(value=None) -> str:
+    """
+    A snapshot timestamp (naive UTC datetime or ISO string, default now) in the one format used for
+    product_snapshots.captured_at, so it compares the same as a string in SQLite as in MySQL
+    """
+    if not isinstance(value, datetime):
+        try:
+            value = datetime.fromisoformat(str(value)) if value else datetime.utcnow()
+        except ValueError:
+            value = datetime.utcnow()
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(sep=' ', timespec='seconds')
+
+def _batches(rows: Iterable[tuple], size: int) -> Iterable[List[tuple]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class BrandInsightsWriter:
+    """
+    Persists one brand's structured insights in a single transaction. Child rows are
+    written with executemany in batches of `batch_size` (mysql.connector turns each
+    batch into one multi-row INSERT). `connect` returns a DB-API connection, so the
+    writer also runs against sqlite3 for benchmarks (placeholder='?', dialect='sqlite').
+    """
+
+    def __init__(self, connect: Callable, placeholder: str = "%s", dialect: str = "mysql",
+                 batch_size: Optional[int] = None, snapshots: Optional[bool] = None):
+        self.connect = connect
+        self.placeholder = placeholder
+        self.dialect = dialect
+        self.batch_size = batch_size or config.DB_BATCH_SIZE
+        self.snapshots = config.PRODUCT_SNAPSHOTS if snapshots is None else snapshots
+
+    def _brand_upsert_sql(self) -> str:
+        p = self.placeholder
+        columns = "(store_url, privacy_policy, return_refund_policy, about_brand, extracted_at, important_links)"
+        values = f"VALUES ({', '.join([p] * 6)})"
+        if self.dialect == "sqlite":
+            return f"""
+                INSERT INTO brand_insights {columns} {values}
+                ON CONFLICT(store_url) DO UPDATE SET
+                    privacy_policy=excluded.privacy_policy,
+                    return_refund_policy=excluded.return_refund_policy,
+                    about_brand=excluded.about_brand,
+                    extracted_at=excluded.extracted_at,
+                    important_links=excluded.important_links
+            """
+        return f"""
+            INSERT INTO brand_insights {columns} {values}
+            ON DUPLICATE KEY UPDATE
+                privacy_policy=VALUES(privacy_policy),
+                return_refund_policy=VALUES(return_refund_policy),
+                about_brand=VALUES(about_brand),
+                extracted_at=VALUES(extracted_at),
+                important_links=VALUES(important_links)
+        """
+
+    def _upsert_brand(self, cursor, data: dict) -> int:
+        extracted_at = data.get("extracted_at")
+        if not extracted_at:
+            extracted_at = None
+        brand_values = (
+            data.get("store_url"),
+            _db_value(data.get("privacy_policy")),
+            _db_value(data.get("return_refund_policy")),
+            _db_value(data.get("about_brand")),
+            extracted_at,
+            json.dumps(data.get("important_links", {}))
+        )
+        cursor.execute(self._brand_upsert_sql(), brand_values)
+        cursor.execute(f"SELECT id FROM brand_insights WHERE store_url={self.placeholder}", (data.get("store_url"),))
+        return cursor.fetchone()[0]
+
+    def _rows(self, table: str, items, columns: Sequence[str]) -> Iterable[tuple]:
+        for item in items or []:
             if not isinstance(item, dict):
-                print(f"Skipping non-dict item in {table}: {type(item)} - {item}")
-                continue  # skip if not a dict
-            vals = tuple(item.get(col) for col in columns)
-            cursor.execute(
-                f"INSERT INTO {table} (brand_id, {', '.join(columns)}) VALUES (%s, {', '.join(['%s']*len(columns))})",
-                (brand_id, *vals)
-            )
-    # Products (cast id to str to avoid int overflow)
-    import re
-    def strip_html(text):
-        if not text:
-            return text
-        return re.sub(r'<[^>]+>', '', text)
-    def cast_id_str_and_strip_desc(items):
+                logger.debug("Skipping non-dict item in %s: %r", table, item)
+                continue
+            yield tuple(_db_value(item.get(col)) for col in columns)
+
+    def _unique_rows(self, table: str, items, columns: Sequence[str], key: Callable) -> Iterable[tuple]:
+        """Rows with repeated keys dropped, so both write modes store the same rows"""
+        seen = set()
+        for row in self._rows(table, items, columns):
+            row_key = key(dict(zip(columns, row)))
+            if row_key not in seen:
+                seen.add(row_key)
+                yield row
+
+    def _insert_rows(self, cursor, table: str, brand_id: int, rows: Iterable[tuple], columns: Sequence[str]) -> int:
+        p = self.placeholder
+        sql = f"INSERT INTO {table} (brand_id, {', '.join(columns)}) VALUES ({', '.join([p] * (len(columns) + 1))})"
+        written = 0
+        for batch in _batches(((brand_id, *row) for row in rows), self.batch_size):
+            cursor.executemany(sql, batch)
+            written += len(batch)
+        return written
+
+    def _replace_children(self, cursor, table: str, brand_id: int, items, columns: Sequence[str],
+                          key: Callable) -> Dict[str, int]:
+        cursor.execute(f"DELETE FROM {table} WHERE brand_id={self.placeholder}", (brand_id,))
+        deleted = max(cursor.rowcount, 0)
+        inserted = self._insert_rows(cursor, table, brand_id, self._unique_rows(table, items, columns, key), columns)
+        return {"inserted": inserted, "updated": 0, "deleted": deleted, "unchanged": 0}
+
+    def _sync_children(self, cursor, table: str, brand_id: int, items, columns: Sequence[str],
+                       key: Callable) -> Dict[str, int]:
+        """
+        Diff the new rows against what is stored for this brand, keyed on a stable identifier,
+        and issue only the INSERT / UPDATE / DELETE statements that are actually needed.
+        """
+        p = self.placeholder
+        value_columns = [c for c in columns if c != "id"]
+        cursor.execute(f"SELECT id, {', '.join(value_columns)} FROM {table} WHERE brand_id={p}", (brand_id,))
+        existing, duplicates = {}, []
+        for row in cursor.fetchall():
+            stored = dict(zip(value_columns, row[1:]), id=row[0])
+            row_key = key(stored)
+            if row_key in existing:
+                # written before replace mode dropped repeated rows (e.g. the same social link in
+                # header and footer); keep the first and delete the rest
+                duplicates.append((row[0],))
+            else:
+                existing[row_key] = (row[0], stored)
+
+        inserts, updates, seen = [], [], set()
+        for row in self._rows(table, items, columns):
+            new = dict(zip(columns, row))
+            row_key = key(new)
+            if row_key in seen:
+                continue
+            seen.add(row_key)
+            if row_key not in existing:
+                inserts.append(row)
+                continue
+            pk, stored = existing[row_key]
+            if any(_comparable(c, new[c]) != _comparable(c, stored[c]) for c in value_columns):
+                updates.append((*(new[c] for c in value_columns), pk))
+        deletes = [(pk,) for row_key, (pk, _) in existing.items() if row_key not in seen] + duplicates
+
+        self._insert_rows(cursor, table, brand_id, inserts, columns)
+        if updates:
+            sql = f"UPDATE {table} SET {', '.join(f'{c}={p}' for c in value_columns)} WHERE id={p}"
+            for batch in _batches(updates, self.batch_size):
+                cursor.executemany(sql, batch)
+        for batch in _batches(deletes, self.batch_size):
+            cursor.execute(f"DELETE FROM {table} WHERE id IN ({', '.join([p] * len(batch))})", [pk for (pk,) in batch])
+        return {"inserted": len(inserts), "updated": len(updates), "deleted": len(deletes),
+                "unchanged": len(seen) - len(inserts) - len(updates)}
+
+    @staticmethod
+    def _products(items) -> List[dict]:
+        # Products: cast id to str to avoid int overflow, strip leftover HTML from descriptions
+        products = []
         for item in items or []:
-            if "id" in item:
-                item["id"] = str(item["id"])
-            if "description" in item:
-                item["description"] = strip_html(item["description"])
-        return items
-    clear_and_insert("products", cast_id_str_and_strip_desc(data.get("product_catalog", [])), ["id", "title", "description", "price", "available", "url", "image_url"])
-    # Hero Products
-    clear_and_insert("hero_products", cast_id_str_and_strip_desc(data.get("hero_products", [])), ["id", "title", "description", "price", "available", "url", "image_url"])
-    # FAQs
-    clear_and_insert("faqs", data.get("faqs", []), ["question", "answer"])
-    # Social Handles
-    clear_and_insert("social_handles", data.get("social_handles", []), ["platform", "url", "handle"])
-    # Contact Info (single row)
-    cursor.execute("DELETE FROM contact_info WHERE brand_id=%s", (brand_id,))
-    contact = data.get("contact_info", {})
-    if contact:
-        cursor.execute(
-            "INSERT INTO contact_info (brand_id, emails, phone_numbers, addresses) VALUES (%s, %s, %s, %s)",
-            (brand_id, json.dumps(contact.get("emails", [])), json.dumps(contact.get("phone_numbers", [])), json.dumps(contact.get("addresses", [])))
-        )
-    cnx.commit()
-    cursor.close()
-    cnx.close()
-    print("Brand insights and all related data inserted!")
+            if isinstance(item, dict):
+                item = dict(item)
+                if "id" in item:
+                    item["id"] = str(item["id"])
+                if "description" in item:
+                    item["description"] = strip_html(item["description"])
+            products.append(item)
+        return products
+
+    @staticmethod
+    def _contact_items(contact) -> List[dict]:
+        # Contact Info (single row, list columns stored as JSON)
+        if not isinstance(contact, dict) or not contact:
+            return []
+        return [{
+            "emails": contact.get("emails", []),
+            "phone_numbers": contact.get("phone_numbers", []),
+            "addresses": contact.get("addresses", [])
+        }]
+
+    def _price_changes(self, cursor, brand_id: int, products: List[dict], captured_at: str) -> List[tuple]:
+        """
+        (product_id, price, available, captured_at) snapshot rows for the products whose price or
+        availability differs from the stored catalog, read before it is overwritten: new products,
+        changed ones, and delisted ones (price and availability NULL). A brand without any snapshot
+        yet gets a full baseline.
+        """
+        p = self.placeholder
+        cursor.execute(f"SELECT 1 FROM product_snapshots WHERE brand_id={p} LIMIT 1", (brand_id,))
+        previous = {}
+        if cursor.fetchone() is not None:
+            cursor.execute(f"SELECT id, price, available FROM products WHERE brand_id={p}", (brand_id,))
+            previous = {
+                str(product_id): (_comparable("price", price), _availability(available))
+                for product_id, price, available in cursor.fetchall()
+            }
+        rows, seen = [], set()
+        for item in products:
+            if not isinstance(item, dict):
+                continue
+            key = _product_key(item)
+            if key in seen:
+                continue
+            seen.add(key)
+            state = (_comparable("price", _db_value(item.get("price"))), _availability(item.get("available")))
+            if previous.get(key) != state:
+                rows.append((key, *state, captured_at))
+        rows.extend((key, None, None, captured_at) for key in previous.keys() - seen)
+        return rows
+
+    def _children(self, data: dict):
+        """(table, items, columns, stable key) for every child table of brand_insights"""
+        return [
+            ("products", self._products(data.get("product_catalog")), PRODUCT_COLUMNS, _product_key),
+            ("hero_products", self._products(data.get("hero_products")), PRODUCT_COLUMNS, _product_key),
+            ("faqs", data.get("faqs"), FAQ_COLUMNS, _faq_key),
+            ("social_handles", data.get("social_handles"), SOCIAL_COLUMNS, _social_key),
+            ("contact_info", self._contact_items(data.get("contact_info")), CONTACT_COLUMNS, _single_row_key),
+        ]
+
+    def write(self, data: dict, mode: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+        """
+        Write everything in one transaction. `mode` (default DB_WRITE_MODE) is 'replace' to delete and
+        re-insert child rows, or 'incremental' to apply row-level diffs. Price and availability changes
+        are appended to product_snapshots in the same transaction. Returns row changes per table.
+        """
+        mode = mode or config.DB_WRITE_MODE
+        write_children = self._sync_children if mode == "incremental" else self._replace_children
+        cnx = self.connect()
+        cursor = cnx.cursor()
+        try:
+            brand_id = self._upsert_brand(cursor, data)
+            children = self._children(data)
+            snapshots = None
+            if self.snapshots:
+                # compared with the stored catalog, so before it is overwritten
+                products = children[0][1]
+                snapshots = self._price_changes(cursor, brand_id, products, snapshot_time(data.get("extracted_at")))
+            counts = {}
+            for table, items, columns, key in children:
+                counts[table] = write_children(cursor, table, brand_id, items, columns, key)
+            if snapshots is not None:
+                inserted = self._insert_rows(cursor, "product_snapshots", brand_id, snapshots, SNAPSHOT_COLUMNS)
+                counts["product_snapshots"] = {"inserted": inserted}
+            cnx.commit()
+        except Exception:
+            cnx.rollback()
+            raise
+        finally:
+            cursor.close()
+            cnx.close()
+        logger.info("Brand insights for %s written (%s): %s", data.get("store_url"), mode, counts)
+        return counts
+
+def insert_brand_insights(data: dict) -> Dict[str, Dict[str, int]]:
+    with track('db_write'):
+        counts = BrandInsightsWriter(get_connection).write(data)
+    for table, changes in counts.items():
+        for change, rows in changes.items():
+            DB_ROWS.inc(rows, table=table, change=change)
+    return counts
+
+async def ainsert_brand_insights(data: dict) -> Dict[str, Dict[str, int]]:
+    """mysql.connector is blocking, so the write runs on the bounded executor"""
+    return await run_blocking(insert_brand_insights, data)
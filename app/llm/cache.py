@@ -0,0 +1,153 @@
+
+import sys
+import os
+for _path in (os.path.dirname(os.path.dirname(__file__)),):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+import config
+
+logger = logging.getLogger(__name__)
+
+class LLMCache:
+    """
+    Two-tier cache of LLM structuring results: an in-process LRU in front of a SQLite file.
+    Keys are content hashes, so a byte-identical scrape skips the Groq call entirely.
+    Entries expire `ttl` seconds after they were written in both tiers; expired rows are
+    deleted from the file when it is opened and then at most once per PURGE_INTERVAL.
+    SQLite errors are logged and read as a miss; a file that can't be opened leaves the
+    cache memory-only.
+    """
+
+    PURGE_INTERVAL = 3600.0
+
+    def __init__(self, path: Optional[str], max_entries: int, ttl: float):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # key -> (created_at, value)
+        self._memory: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._last_purge = 0.0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key_for(payload, prompt: str, model: str) -> str:
+        """Hash of the canonical (sorted, compact) serialized input, the prompt and the model"""
+        canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+        digest = hashlib.sha256()
+        for part in (model, prompt, canonical):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self._db is None and self.path:
+            db = None
+            try:
+                db = sqlite3.connect(self.path, check_same_thread=False)
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+                )
+                db.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_created ON llm_cache (created_at)")
+                self._purge(db)
+            except sqlite3.Error as e:
+                logger.warning("LLM cache file %s unusable, caching in memory only: %s", self.path, e)
+                if db is not None:
+                    db.close()
+                self.path = None
+                return None
+            self._db = db
+        return self._db
+
+    def _purge(self, db: sqlite3.Connection):
+        """Delete expired rows so the file doesn't grow with every distinct scrape ever cached"""
+        db.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl,))
+        db.commit()
+        self._last_purge = time.monotonic()
+
+    def get_memory(self, key: str) -> Optional[dict]:
+        """Memory tier only: cheap enough to call on the event loop"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            created_at, value = entry
+            if created_at < time.time() - self.ttl:
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return value
+
+    def get(self, key: str) -> Optional[dict]:
+        value = self.get_memory(key)
+        if value is not None:
+            return value
+        with self._lock:
+            db = self._connect()
+            row = None
+            if db is not None:
+                try:
+                    row = db.execute(
+                        "SELECT value, created_at FROM llm_cache WHERE key = ? AND created_at >= ?",
+                        (key, time.time() - self.ttl)
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    logger.warning("LLM cache read failed, treating as a miss: %s", e)
+            if row is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            value = json.loads(row[0])
+            self._remember(key, value, row[1])
+            return value
+
+    def put(self, key: str, value: dict):
+        serialized = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            # store a private copy so later mutation of `value` by the caller can't leak in
+            self._remember(key, json.loads(serialized), now)
+            db = self._connect()
+            if db is not None:
+                try:
+                    db.execute(
+                        "INSERT OR REPLACE INTO llm_cache (key, value, created_at) VALUES (?, ?, ?)",
+                        (key, serialized, now)
+                    )
+                    db.commit()
+                    if time.monotonic() - self._last_purge >= self.PURGE_INTERVAL:
+                        self._purge(db)
+                except sqlite3.Error as e:
+                    logger.warning("LLM cache write failed, result kept in memory only: %s", e)
+
+    def _remember(self, key: str, value: dict, created_at: float):
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                'memory_entries': len(self._memory),
+            }
+
+
+llm_cache = LLMCache(config.LLM_CACHE_PATH or None, config.LLM_CACHE_MAX_ENTRIES, config.LLM_CACHE_TTL)
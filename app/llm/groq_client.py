@@ -1,20 +1,39 @@
 
+import sys
 import os
-from dotenv import load_dotenv
-import groq
+for _path in (os.path.dirname(os.path.dirname(__file__)),
+              os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils')):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
 import json as pyjson
-
-load_dotenv(override=True)
+from metrics import track, LLM_TOKENS
+import config  # loads .env
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+# Point at another OpenAI-compatible endpoint, e.g. the stub in benchmarks/mock_groq.py
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL") or None
 MODEL = "meta-llama/llama-4-scout-17b-16e-instruct"
 
-groq_client = groq.Groq(api_key=GROQ_API_KEY)
+# Built on first use and reused by every later call (and warm serverless invocation):
+# importing groq and setting up its HTTP clients is a large share of a cold start
+_groq_client = None
+_async_groq_client = None
 
-def structure_with_llama(raw_text: str, system_prompt: str = None) -> dict:
-    """
-    Sends the raw text to Groq's Llama-3-70B Versatile model and returns the structured response using response_format with json_schema.
-    """
+def get_groq_client():
+    global _groq_client
+    if _groq_client is None:
+        import groq
+        _groq_client = groq.Groq(api_key=GROQ_API_KEY, base_url=GROQ_BASE_URL)
+    return _groq_client
+
+def get_async_groq_client():
+    global _async_groq_client
+    if _async_groq_client is None:
+        import groq
+        _async_groq_client = groq.AsyncGroq(api_key=GROQ_API_KEY, base_url=GROQ_BASE_URL)
+    return _async_groq_client
+
+def _build_request(raw_text: str, system_prompt: str = None) -> dict:
     if not GROQ_API_KEY:
         raise ValueError("GROQ_API_KEY not set in environment variables.")
     prompt = system_prompt or (
@@ -24,7 +43,7 @@ def structure_with_llama(raw_text: str, system_prompt: str = None) -> dict:
     schema = {
         "type": "object"
     }
-    response = groq_client.chat.completions.create(
+    return dict(
         model=MODEL,
         messages=[
             {"role": "system", "content": prompt},
@@ -39,8 +58,41 @@ def structure_with_llama(raw_text: str, system_prompt: str = None) -> dict:
         },
         temperature=0.2
     )
+
+def _record_usage(response, usage: dict = None):
+    if getattr(response, 'usage', None) is None:
+        return
+    LLM_TOKENS.inc(response.usage.prompt_tokens or 0, type='prompt')
+    LLM_TOKENS.inc(response.usage.completion_tokens or 0, type='completion')
+    if usage is None:
+        return
+    usage['prompt_tokens'] = usage.get('prompt_tokens', 0) + (response.usage.prompt_tokens or 0)
+    usage['completion_tokens'] = usage.get('completion_tokens', 0) + (response.usage.completion_tokens or 0)
+
+def _parse_response(response) -> dict:
     content = response.choices[0].message.content
     try:
         return pyjson.loads(content)
     except Exception:
         return {"raw": content}
+
+def structure_with_llama(raw_text: str, system_prompt: str = None, usage: dict = None) -> dict:
+    """
+    Sends the raw text to Groq's Llama-3-70B Versatile model and returns the structured response using response_format with json_schema.
+    If `usage` is given, the prompt/completion token counts reported by Groq are added to it.
+    """
+    request = _build_request(raw_text, system_prompt)
+    with track('llm_call'):
+        response = get_groq_client().chat.completions.create(**request)
+    _record_usage(response, usage)
+    return _parse_response(response)
+
+async def astructure_with_llama(raw_text: str, system_prompt: str = None, usage: dict = None) -> dict:
+    """
+    Async counterpart of structure_with_llama, awaiting the Groq call instead of blocking the event loop.
+    """
+    request = _build_request(raw_text, system_prompt)
+    with track('llm_call'):
+        response = await get_async_groq_client().chat.completions.create(**request)
+    _record_usage(response, usage)
+    return _parse_response(response)
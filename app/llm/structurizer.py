@@ -1,38 +1,277 @@
-from llm.groq_client import structure_with_llama
+import sys
+import os
+for _path in (os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils'),
+              os.path.dirname(os.path.dirname(__file__))):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+import asyncio
+import copy
+import json
+from typing import List, Optional, Tuple
+from concurrency import run_blocking
+from llm.groq_client import MODEL, structure_with_llama, astructure_with_llama
+from llm.cache import llm_cache
+import config
 
-def structurize_website_data(raw_data: dict) -> dict:
+PROMPT = (
+    "You are an expert data extractor. Given the following website data, return ONLY a valid JSON object with all relevant fields, categories, and values. Do not include any explanation or markdown, just the JSON. If you cannot extract or structure, return the input as valid JSON."
+)
+
+# Each section is structured on its own; list fields inside a section that blows the
+# token budget are split across several chunks and concatenated again on merge.
+SECTIONS = (
+    ('about_brand', 'contact_info', 'social_handles', 'important_links'),
+    ('privacy_policy', 'return_refund_policy', 'faqs'),
+    ('hero_products',),
+    ('product_catalog',),
+)
+PRODUCT_LISTS = ('hero_products', 'product_catalog')
+# Product fields the model needs to see; url and image_url are re-attached after merging
+PRODUCT_FIELDS = ('id', 'title', 'description', 'price', 'available')
+PRODUCT_PASSTHROUGH = ('url', 'image_url')
+# Fields that change on every scrape and carry nothing to structure; never sent to the model
+VOLATILE_FIELDS = ('extracted_at', 'metadata')
+# Never sent to the model and always restored from the scrape: store_url keys the stored rows,
+# so a value rewritten by the model would make every stored lookup miss
+SCRAPED_FIELDS = ('store_url',) + VOLATILE_FIELDS
+# Free text the scraper can't structure itself; the only fields sent to the model with llm=partial
+UNSTRUCTURED_FIELDS = ('about_brand', 'privacy_policy', 'return_refund_policy', 'faqs')
+
+# off: skip the LLM, partial: structure only UNSTRUCTURED_FIELDS, full: structure everything
+LLM_MODES = ('off', 'partial', 'full')
+
+
+class Chunk:
+    __slots__ = ('keys', 'payload', 'source', 'text', 'prompt', 'estimated_tokens')
+
+    def __init__(self, payload: dict, source: dict):
+        self.keys = tuple(payload)
+        self.payload = payload
+        self.source = source
+        self.text = _dumps(payload)
+        self.prompt = f"{PROMPT} Keep exactly these top-level keys: {', '.join(self.keys)}."
+        self.estimated_tokens = estimate_tokens(self.text)
+
+
+def make_serializable(obj):
+    if isinstance(obj, dict):
+        return {k: make_serializable(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [make_serializable(i) for i in obj]
+    elif obj is None or isinstance(obj, (bool, int, float)):
+        return obj
+    elif hasattr(obj, 'model_dump'):
+        # Pydantic models (Product, FAQItem, ...) become dicts rather than their repr
+        return make_serializable(obj.model_dump(mode='json'))
+    elif hasattr(obj, 'isoformat'):
+        return obj.isoformat()
+    else:
+        return str(obj)
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for Llama tokenizers on English/JSON)"""
+    return len(text) // 4 + 1
+
+def _dumps(obj) -> str:
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False)
+
+def _coerce_result(result) -> dict:
+    if isinstance(result, dict):
+        return result
+    # If result is a string, try to load as JSON
+    try:
+        return json.loads(result)
+    except Exception:
+        return {"raw": result}
+
+def _compact_product(product) -> dict:
+    if not isinstance(product, dict):
+        return product
+    compact = {k: product[k] for k in PRODUCT_FIELDS if k in product}
+    description = compact.get('description')
+    if isinstance(description, str) and len(description) > config.LLM_DESCRIPTION_CHARS:
+        compact['description'] = description[:config.LLM_DESCRIPTION_CHARS].rsplit(' ', 1)[0] + '…'
+    return compact
+
+def _compact(key: str, value):
+    if key in PRODUCT_LISTS and isinstance(value, list):
+        return [_compact_product(p) for p in value]
+    return value
+
+def _pack(key: str, items: list, sources: list, budget: int) -> List['Chunk']:
+    """Greedily pack list items into chunks that stay under the token budget"""
+    chunks = []
+    batch, batch_sources, size = [], [], 0
+    for item, source in zip(items, sources):
+        item_tokens = estimate_tokens(_dumps(item))
+        if batch and size + item_tokens > budget:
+            chunks.append(Chunk({key: batch}, {key: batch_sources}))
+            batch, batch_sources, size = [], [], 0
+        batch.append(item)
+        batch_sources.append(source)
+        size += item_tokens
+    if batch:
+        chunks.append(Chunk({key: batch}, {key: batch_sources}))
+    return chunks
+
+def _fields_for(mode: str) -> Tuple[str, ...]:
+    if mode not in LLM_MODES:
+        raise ValueError(f"llm mode must be one of {', '.join(LLM_MODES)}, got {mode!r}")
+    if mode == 'off':
+        return ()
+    if mode == 'partial':
+        return UNSTRUCTURED_FIELDS
+    return tuple(k for keys in SECTIONS for k in keys)
+
+def build_chunks(data: dict, budget: Optional[int] = None, fields: Optional[Tuple[str, ...]] = None) -> List[Chunk]:
+    """Compact the payload and split it into token-budgeted chunks, in a deterministic order"""
+    budget = budget or config.LLM_CHUNK_TOKENS
+    chunks = []
+    for keys in SECTIONS:
+        source = {k: data[k] for k in keys if k in data and (fields is None or k in fields)}
+        if not source:
+            continue
+        payload = {k: _compact(k, v) for k, v in source.items()}
+        chunk = Chunk(payload, source)
+        if chunk.estimated_tokens <= budget:
+            chunks.append(chunk)
+            continue
+        scalars = {k: v for k, v in payload.items() if not isinstance(v, list)}
+        if scalars:
+            chunks.append(Chunk(scalars, {k: source[k] for k in scalars}))
+        for k, v in payload.items():
+            if isinstance(v, list):
+                chunks.extend(_pack(k, v, source[k], budget))
+    return chunks
+
+def _merge_into(target: dict, part: dict):
+    for k, v in part.items():
+        if k not in target or target[k] in (None, '', [], {}):
+            target[k] = copy.deepcopy(v)
+        elif isinstance(target[k], list) and isinstance(v, list):
+            target[k].extend(copy.deepcopy(v))
+        elif isinstance(target[k], dict) and isinstance(v, dict):
+            target[k].update(copy.deepcopy(v))
+
+def _chunk_result(chunk: Chunk, result: Optional[dict]) -> dict:
+    # any key the model dropped (or the whole chunk, if the call failed) falls back to the raw input
+    if not isinstance(result, dict):
+        return chunk.source
+    merged = dict(result)
+    for k in chunk.keys:
+        if k not in merged:
+            merged[k] = chunk.source[k]
+    return merged
+
+def _reattach_products(structured: dict, data: dict):
+    """Keep every scraped product, in scrape order, and restore the fields the model never saw"""
+    for key in PRODUCT_LISTS:
+        originals = data.get(key)
+        if not isinstance(originals, list):
+            continue
+        returned = structured.get(key) if isinstance(structured.get(key), list) else []
+        by_id = {str(item.get('id')): item for item in returned if isinstance(item, dict)}
+        products = []
+        for original in originals:
+            if not isinstance(original, dict):
+                continue
+            product = by_id.get(str(original.get('id'))) or dict(original)
+            for field in PRODUCT_PASSTHROUGH:
+                if field not in product and field in original:
+                    product[field] = original[field]
+            products.append(product)
+        structured[key] = products
+
+def _merge(data: dict, chunks: List[Chunk], results: List[Optional[dict]], stats: dict) -> dict:
+    structured = {}
+    for chunk, result in zip(chunks, results):
+        _merge_into(structured, _chunk_result(chunk, result))
+    # fields that were not sent to the model are already structured: pass them through as scraped
+    for k, v in data.items():
+        if k not in structured and k not in SCRAPED_FIELDS:
+            structured[k] = copy.deepcopy(v)
+    _reattach_products(structured, data)
+    for field in SCRAPED_FIELDS:
+        if field in data:
+            structured[field] = copy.deepcopy(data[field])
+    metadata = structured.get('metadata') if isinstance(structured.get('metadata'), dict) else {}
+    metadata['llm'] = stats
+    structured['metadata'] = metadata
+    return structured
+
+def _new_stats(chunks: List[Chunk], mode: str) -> dict:
+    return {
+        'mode': mode,
+        'model': MODEL,
+        'chunks': len(chunks),
+        'cached_chunks': 0,
+        'failed_chunks': 0,
+        'estimated_input_tokens': sum(c.estimated_tokens for c in chunks),
+        'prompt_tokens': 0,
+        'completion_tokens': 0,
+    }
+
+def _prepare(raw_data: dict, mode: str) -> Tuple[dict, List[Chunk], List[str]]:
+    fields = _fields_for(mode)
+    # scraper records already produce JSON-ready dicts; anything else is walked and converted
+    data = raw_data.to_dict() if hasattr(raw_data, 'to_dict') else make_serializable(raw_data)
+    if not isinstance(data, dict):
+        data = {"raw": str(data)}
+    chunks = build_chunks(data, fields=fields)
+    keys = [llm_cache.key_for(c.payload, c.prompt, MODEL) for c in chunks]
+    return data, chunks, keys
+
+def structurize_website_data(raw_data: dict, mode: Optional[str] = None) -> dict:
     """
-    Converts the raw website data dict to a string (ensuring all values are JSON serializable) and sends it to Groq Llama-3-70B for structuring.
-    Returns the structured dict.
+    Compacts the raw website data, splits it into token-budgeted chunks and sends each chunk to Groq for structuring.
+    `mode` (off|partial|full, default LLM_MODE) picks which fields go to the model; the rest pass through as scraped.
+    Returns the merged structured dict; token counts are reported under metadata.llm.
     """
-    import json
-    def make_serializable(obj):
-        if isinstance(obj, dict):
-            return {k: make_serializable(v) for k, v in obj.items()}
-        elif isinstance(obj, list):
-            return [make_serializable(i) for i in obj]
-        elif hasattr(obj, 'isoformat'):
-            return obj.isoformat()
-        else:
-            return str(obj)
-
-    serializable_data = make_serializable(raw_data)
-    raw_text = json.dumps(serializable_data, indent=2, ensure_ascii=False)
-    prompt = (
-        "You are an expert data extractor. Given the following website data, return ONLY a valid JSON object with all relevant fields, categories, and values. Do not include any explanation or markdown, just the JSON. If you cannot extract or structure, return the input as valid JSON."
-    )
-    try:
-        result = structure_with_llama(raw_text, system_prompt=prompt)
-        if isinstance(result, dict):
-            return result
-        # If result is a string, try to load as JSON
-        import json
+    mode = mode or config.LLM_MODE
+    data, chunks, keys = _prepare(raw_data, mode)
+    stats = _new_stats(chunks, mode)
+    results = []
+    for chunk, key in zip(chunks, keys):
+        cached = llm_cache.get(key)
+        if cached is not None:
+            stats['cached_chunks'] += 1
+            results.append(cached)
+            continue
         try:
-            return json.loads(result)
+            result = _coerce_result(structure_with_llama(chunk.text, system_prompt=chunk.prompt, usage=stats))
         except Exception:
-            return {"raw": result}
-    except Exception as e:
-        # fallback: always return a dict
-        if isinstance(serializable_data, dict):
-            return serializable_data
-        return {"raw": str(serializable_data)}
+            stats['failed_chunks'] += 1
+            results.append(None)
+            continue
+        llm_cache.put(key, result)
+        results.append(result)
+    return _merge(data, chunks, results, stats)
+
+async def astructurize_website_data(raw_data: dict, mode: Optional[str] = None) -> dict:
+    """
+    Async counterpart of structurize_website_data: chunks are structured concurrently
+    (at most LLM_CONCURRENCY Groq calls at once) and merged in chunk order.
+    """
+    mode = mode or config.LLM_MODE
+    data, chunks, keys = await run_blocking(_prepare, raw_data, mode)
+    stats = _new_stats(chunks, mode)
+    semaphore = asyncio.Semaphore(config.LLM_CONCURRENCY)
+
+    async def structure(chunk: Chunk, key: str) -> Optional[dict]:
+        cached = llm_cache.get_memory(key)
+        if cached is None:
+            cached = await run_blocking(llm_cache.get, key)
+        if cached is not None:
+            stats['cached_chunks'] += 1
+            return cached
+        try:
+            async with semaphore:
+                result = _coerce_result(await astructure_with_llama(chunk.text, system_prompt=chunk.prompt, usage=stats))
+        except Exception:
+            stats['failed_chunks'] += 1
+            return None
+        await run_blocking(llm_cache.put, key, result)
+        return result
+
+    results = await asyncio.gather(*(structure(c, k) for c, k in zip(chunks, keys)))
+    return await run_blocking(_merge, data, chunks, results, stats)
@@ -1,15 +1,59 @@
 
 import sys
 import os
-sys.path.insert(0, os.path.join(os.path.dirname(__file__)))
-from fastapi import FastAPI
-from routes import insights
+for _path in (os.path.join(os.path.dirname(__file__)),
+              os.path.join(os.path.dirname(__file__), 'services'),
+              os.path.join(os.path.dirname(__file__), 'utils')):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from routes import insights, metrics
+from http_client import close_async_client
+from concurrency import shutdown_executor
+from contacts import shutdown_process_pool
+from scheduler import get_scheduler
+from jobs import get_job_queue
+from metrics import request_timings, server_timing
+import config
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if config.SCHEDULER_ENABLED:
+        get_scheduler().start()
+    if config.JOB_WORKERS:
+        get_job_queue().start()
+    yield
+    await get_job_queue().stop()
+    await get_scheduler().stop()
+    await close_async_client()
+    shutdown_executor()
+    shutdown_process_pool()
 
 
 app = FastAPI(
     title="Shopify Store Insights Fetcher",
     description="API to extract insights from Shopify stores without using official API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-app.include_router(insights.router, prefix="/api/v1", tags=["insights"])
\ No newline at end of file
+app.include_router(insights.router, prefix="/api/v1", tags=["insights"])
+app.include_router(metrics.router, tags=["metrics"])
+
+
+@app.middleware("http")
+async def add_server_timing(request: Request, call_next):
+    if not config.SERVER_TIMING:
+        return await call_next(request)
+    # a request that joins another's in-flight pipeline run reports only its own stages
+    token = request_timings.set({})
+    try:
+        response = await call_next(request)
+        timings = request_timings.get()
+    finally:
+        request_timings.reset(token)
+    if timings:
+        response.headers['Server-Timing'] = server_timing(timings)
+    return response
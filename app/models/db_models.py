@@ -1,17 +1,11 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Table, create_engine
+from sqlalchemy import Column, Integer, BigInteger, Boolean, String, Text, DateTime, ForeignKey, Table, Index, CHAR
 from sqlalchemy.orm import relationship, declarative_base
 from sqlalchemy.dialects.mysql import LONGTEXT
 from sqlalchemy.types import JSON
 import datetime
-from dotenv import load_dotenv
-import os
-
-load_dotenv(override=True)
-DATABASE_URL = os.getenv("DATABASE_URL")
-engine = create_engine(DATABASE_URL)
 
+# Model definitions only: no engine or DDL at import. Tables are created by create_tables.py.
 Base = declarative_base()
-Base.metadata.create_all(engine)
 
 class BrandInsightsDB(Base):
     __tablename__ = "brand_insights"
@@ -22,6 +16,7 @@ class BrandInsightsDB(Base):
     about_brand = Column(LONGTEXT)
     extracted_at = Column(DateTime, default=datetime.datetime.utcnow)
     important_links = Column(JSON)
+    refresh_interval = Column(Integer, nullable=True)
 
     # Relationships
     products = relationship("ProductDB", back_populates="brand", cascade="all, delete-orphan")
@@ -32,6 +27,10 @@ class BrandInsightsDB(Base):
 
 class ProductDB(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        Index("idx_products_brand", "brand_id", "id"),
+        Index("ft_products_text", "title", "description", mysql_prefix="FULLTEXT"),
+    )
     id = Column(Integer, primary_key=True)
     brand_id = Column(Integer, ForeignKey("brand_insights.id"))
     product_id = Column(String(64))
@@ -45,6 +44,7 @@ class ProductDB(Base):
 
 class HeroProductDB(Base):
     __tablename__ = "hero_products"
+    __table_args__ = (Index("idx_hero_products_brand", "brand_id", "id"),)
     id = Column(Integer, primary_key=True)
     brand_id = Column(Integer, ForeignKey("brand_insights.id"))
     product_id = Column(String(64))
@@ -80,4 +80,39 @@ class ContactInfoDB(Base):
     emails = Column(JSON)
     phone_numbers = Column(JSON)
     addresses = Column(JSON)
-    brand = relationship("BrandInsightsDB", back_populates="contact_info")
\ No newline at end of file
+    brand = relationship("BrandInsightsDB", back_populates="contact_info")
+
+class ProductSnapshotDB(Base):
+    """Append-only: a row per product each time its price or availability changes (NULLs: delisted)"""
+    __tablename__ = "product_snapshots"
+    __table_args__ = (
+        Index("idx_snapshots_product", "brand_id", "product_id", "captured_at"),
+        Index("idx_snapshots_captured", "captured_at"),
+    )
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    brand_id = Column(Integer, ForeignKey("brand_insights.id"), nullable=False)
+    product_id = Column(String(64), nullable=False)
+    price = Column(String(64))
+    available = Column(Boolean)
+    captured_at = Column(DateTime, nullable=False)
+
+class ScrapeJobDB(Base):
+    __tablename__ = "scrape_jobs"
+    __table_args__ = (
+        Index("idx_scrape_jobs_status", "status", "created_at"),
+        Index("idx_scrape_jobs_store", "store_url", "status"),
+        Index("uq_scrape_jobs_active", "active_key", unique=True),
+    )
+    id = Column(CHAR(32), primary_key=True)
+    store_url = Column(String(255), nullable=False)
+    llm_mode = Column(String(16), nullable=False)
+    status = Column(String(16), nullable=False)  # queued | running | succeeded | failed
+    progress = Column(JSON)
+    result = Column(LONGTEXT)
+    error = Column(JSON)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    updated_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+    active_key = Column(String(272))  # '<llm_mode> <store_url>' while queued or running, NULL once finished
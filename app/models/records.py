@@ -0,0 +1,134 @@
+import sys
+import os
+for _path in (os.path.dirname(__file__),):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+from typing import Dict, List, Optional
+from pydantic import HttpUrl, TypeAdapter
+from schemas import BrandInsights, Product
+
+# Internal records for the scrape -> LLM -> persist path. They hold plain str/bool values and
+# validate nothing while they are built and handed along; the scrape is checked against the
+# Pydantic models in schemas.py once, at the API boundary (InsightsRecord.to_model and
+# validate_products), instead of building a model per item and dumping it again.
+
+_HTTP_URL = TypeAdapter(HttpUrl)
+_PRODUCTS = TypeAdapter(List[Product])
+
+def normalize_url(url: str) -> str:
+    """The URL exactly as the HttpUrl fields would store it (e.g. a trailing '/' on a bare host)"""
+    return str(_HTTP_URL.validate_python(url))
+
+
+class ProductRecord:
+    __slots__ = ('id', 'title', 'description', 'price', 'available', 'url', 'image_url')
+
+    def __init__(self, id: str, title: str, description: Optional[str], price: str, available: bool,
+                 url: Optional[str], image_url: Optional[str]):
+        self.id = id
+        self.title = title
+        self.description = description
+        self.price = price
+        self.available = available
+        self.url = url
+        self.image_url = image_url
+
+    def to_dict(self) -> dict:
+        return {
+            'id': self.id,
+            'title': self.title,
+            'description': self.description,
+            'price': self.price,
+            'available': self.available,
+            'url': self.url,
+            'image_url': self.image_url
+        }
+
+
+class FAQRecord:
+    __slots__ = ('question', 'answer')
+
+    def __init__(self, question: str, answer: str):
+        self.question = question
+        self.answer = answer
+
+    def to_dict(self) -> dict:
+        return {'question': self.question, 'answer': self.answer}
+
+
+class SocialRecord:
+    __slots__ = ('platform', 'url', 'handle')
+
+    def __init__(self, platform: str, url: str, handle: Optional[str] = None):
+        self.platform = platform
+        self.url = url
+        self.handle = handle
+
+    def to_dict(self) -> dict:
+        return {'platform': self.platform, 'url': self.url, 'handle': self.handle}
+
+
+class ContactRecord:
+    __slots__ = ('emails', 'phone_numbers', 'addresses')
+
+    def __init__(self, emails: List[str], phone_numbers: List[str], addresses: List[str]):
+        self.emails = emails
+        self.phone_numbers = phone_numbers
+        self.addresses = addresses
+
+    def to_dict(self) -> dict:
+        return {
+            'emails': list(self.emails),
+            'phone_numbers': list(self.phone_numbers),
+            'addresses': list(self.addresses)
+        }
+
+
+class InsightsRecord:
+    """One store's scrape result, mirroring BrandInsights field for field"""
+    __slots__ = ('store_url', 'product_catalog', 'hero_products', 'privacy_policy', 'return_refund_policy',
+                 'faqs', 'social_handles', 'contact_info', 'about_brand', 'important_links',
+                 'extracted_at', 'metadata')
+
+    def __init__(self, store_url: str, product_catalog: List[ProductRecord], hero_products: List[ProductRecord],
+                 privacy_policy: str, return_refund_policy: str, faqs: List[FAQRecord],
+                 social_handles: List[SocialRecord], contact_info: ContactRecord, about_brand: str,
+                 important_links: Dict[str, str], extracted_at: str, metadata: Optional[Dict] = None):
+        self.store_url = store_url
+        self.product_catalog = product_catalog
+        self.hero_products = hero_products
+        self.privacy_policy = privacy_policy
+        self.return_refund_policy = return_refund_policy
+        self.faqs = faqs
+        self.social_handles = social_handles
+        self.contact_info = contact_info
+        self.about_brand = about_brand
+        self.important_links = important_links
+        self.extracted_at = extracted_at
+        self.metadata = metadata if metadata is not None else {}
+
+    def to_dict(self) -> dict:
+        """JSON-ready dict in the shape BrandInsights serializes to, built without any validation"""
+        return {
+            'store_url': self.store_url,
+            'product_catalog': [p.to_dict() for p in self.product_catalog],
+            'hero_products': [p.to_dict() for p in self.hero_products],
+            'privacy_policy': self.privacy_policy,
+            'return_refund_policy': self.return_refund_policy,
+            'faqs': [f.to_dict() for f in self.faqs],
+            'social_handles': [s.to_dict() for s in self.social_handles],
+            'contact_info': self.contact_info.to_dict(),
+            'about_brand': self.about_brand,
+            'important_links': dict(self.important_links),
+            'extracted_at': self.extracted_at,
+            'metadata': dict(self.metadata)
+        }
+
+    def to_model(self) -> BrandInsights:
+        """Validate into the public BrandInsights model (raises pydantic.ValidationError)"""
+        return BrandInsights.model_validate(self.to_dict())
+
+
+def validate_products(products: List[ProductRecord]) -> List[Product]:
+    """Validate a page of catalog records into Product models (raises pydantic.ValidationError)"""
+    return _PRODUCTS.validate_python([p.to_dict() for p in products])
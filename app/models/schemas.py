@@ -1,9 +1,11 @@
 
 import sys
 import os
-sys.path.insert(0, os.path.dirname(__file__))
-from pydantic import BaseModel, HttpUrl
-from typing import List, Optional, Dict
+for _path in (os.path.dirname(__file__),):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+from pydantic import BaseModel, HttpUrl, Field
+from typing import List, Optional, Dict, Literal
 
 class FAQItem(BaseModel):
     question: str
@@ -40,4 +42,12 @@ class BrandInsights(BaseModel):
     about_brand: str
     important_links: Dict[str, HttpUrl]
     extracted_at: str
-    metadata: Optional[Dict] = {}
\ No newline at end of file
+    metadata: Optional[Dict] = {}
+
+class BatchInsightsRequest(BaseModel):
+    website_urls: List[str] = Field(..., min_length=1)
+    llm: Optional[Literal['off', 'partial', 'full']] = None
+
+class JobRequest(BaseModel):
+    website_url: str
+    llm: Optional[Literal['off', 'partial', 'full']] = None
@@ -1,32 +1,356 @@
 
 import sys
 import os
-sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models'))
-sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'services'))
+for _path in (os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models'),
+              os.path.join(os.path.dirname(os.path.dirname(__file__)), 'services'),
+              os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils')):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
 
-from fastapi import APIRouter, HTTPException
-from schemas import BrandInsights
-from scraper import ShopifyScraper, WebsiteNotFoundError, ScrapingError
-sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'llm'))
-sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'app'))
-from structurizer import structurize_website_data
-from db_insert import insert_brand_insights
+import asyncio
+import json
+import math
+from urllib.parse import urlparse
+from datetime import datetime
+from typing import Callable, Literal, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import ValidationError
+from schemas import BrandInsights, BatchInsightsRequest, JobRequest
+from records import normalize_url
+from scraper import WebsiteNotFoundError, ScrapingError, HostUnavailableError
+from pipeline import run_insights_pipeline, stream_insights_pipeline, pipeline_flights
+from storage import age_seconds, decode_cursor, decode_snapshot_cursor, get_store, response_cache
+from scheduler import get_scheduler
+from jobs import get_job_queue, get_job_store
+from host_policy import host_policies
+from competitors import competitor_seeds, get_competitor_index, index_stats
+from concurrency import HostLimiter, run_blocking
+from llm.cache import llm_cache
+import config
 
 router = APIRouter()
 
+batch_limiter = HostLimiter(config.BATCH_CONCURRENCY, config.BATCH_PER_HOST_CONCURRENCY)
+
+def _to_http_error(e: Exception) -> HTTPException:
+    if isinstance(e, HTTPException):
+        return e
+    if isinstance(e, WebsiteNotFoundError):
+        return HTTPException(status_code=404, detail="Website not found or inaccessible")
+    if isinstance(e, HostUnavailableError):
+        # down or throttling us after the retries: worth asking again later, unlike a 404
+        retry_after = math.ceil(e.retry_after or config.RETRY_BACKOFF_MAX)
+        return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(retry_after)})
+    if isinstance(e, ScrapingError):
+        return HTTPException(status_code=500, detail=str(e))
+    return HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@router.get("/stats")
+async def get_stats():
+    return {
+        "llm_cache": llm_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "scheduler": get_scheduler().stats(),
+        "pipeline": pipeline_flights.stats(),
+        "hosts": host_policies.stats(),
+        "competitor_index": index_stats(),
+        "jobs": get_job_queue().stats()
+    }
+
 @router.get("/insights")
-async def get_shopify_insights(website_url: str):
-    try:
-        scraper = ShopifyScraper(website_url)
-        insights = scraper.get_all_insights()
-        # Use LLM to structure the insights
-        structured = structurize_website_data(insights.__dict__ if hasattr(insights, '__dict__') else insights)
-        # Store in MySQL
-        insert_brand_insights(structured)
-        return structured
-    except WebsiteNotFoundError:
-        raise HTTPException(status_code=404, detail="Website not found or inaccessible")
-    except ScrapingError as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
\ No newline at end of file
+async def get_shopify_insights(website_url: str, llm: Optional[Literal['off', 'partial', 'full']] = None):
+    try:
+        return await run_insights_pipeline(website_url, llm_mode=llm)
+    except Exception as e:
+        raise _to_http_error(e)
+
+@router.post("/insights/jobs", status_code=202)
+async def create_insights_job(job: JobRequest, request: Request):
+    """
+    Queue the insights pipeline for a store and return at once with the job id; poll
+    /insights/jobs/{job_id} for per-stage progress and the result. A job already queued or
+    running for the same store and llm mode is returned instead of starting another.
+    """
+    try:
+        store_url = normalize_url(job.website_url)
+    except ValidationError:
+        raise HTTPException(status_code=422, detail=f"Invalid website_url: {job.website_url}")
+    try:
+        job_id, created = await get_job_queue().submit(store_url, job.llm)
+    except Exception as e:
+        raise _to_http_error(e)
+    status_url = str(request.url_for("get_insights_job", job_id=job_id))
+    return JSONResponse(
+        {"job_id": job_id, "created": created, "status_url": status_url},
+        status_code=202 if created else 200, headers={"Location": status_url},
+    )
+
+@router.get("/insights/jobs/{job_id}")
+async def get_insights_job(job_id: str):
+    """Status (queued, running, succeeded, failed), per-stage progress and, once finished, the result or error of a job"""
+    try:
+        job = await run_blocking(get_job_store().get, job_id)
+    except Exception as e:
+        raise _to_http_error(e)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job
+
+def _ndjson(event: dict) -> str:
+    return json.dumps(event, ensure_ascii=False, default=str) + "\n"
+
+@router.get("/insights/stream")
+async def stream_shopify_insights(website_url: str, llm: Optional[Literal['off', 'partial']] = None):
+    """
+    NDJSON stream for very large catalogs: a `metadata` line with the brand insights, then one
+    `products` line per catalog page as it is crawled, then an `end` line with the product count.
+    A failure after the first line is reported as an `error` line. Results are not persisted.
+    """
+    events = stream_insights_pipeline(website_url, llm_mode=llm)
+    try:
+        # the brand metadata comes first, so a missing store is still a plain 404
+        first = await anext(events)
+    except Exception as e:
+        await events.aclose()
+        raise _to_http_error(e)
+
+    async def stream():
+        try:
+            yield _ndjson(first)
+            async for event in events:
+                yield _ndjson(event)
+        except Exception as e:
+            error = _to_http_error(e)
+            yield _ndjson({"type": "error", "status_code": error.status_code, "error": error.detail})
+        finally:
+            await events.aclose()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+async def _batch_item(website_url: str, llm_mode: Optional[str]) -> dict:
+    try:
+        async with batch_limiter.limit(urlparse(website_url).netloc.lower()):
+            data = await run_insights_pipeline(website_url, llm_mode=llm_mode)
+        return {"website_url": website_url, "status": "ok", "data": data}
+    except Exception as e:
+        error = _to_http_error(e)
+        return {"website_url": website_url, "status": "error", "status_code": error.status_code, "error": error.detail}
+
+@router.post("/insights/batch")
+async def get_shopify_insights_batch(request: BatchInsightsRequest):
+    """
+    Scrape many stores concurrently and stream one NDJSON line per store as it finishes.
+    A failing store is reported on its own line and does not fail the batch.
+    """
+    website_urls = list(dict.fromkeys(request.website_urls))
+    if len(website_urls) > config.BATCH_MAX_URLS:
+        raise HTTPException(status_code=422, detail=f"At most {config.BATCH_MAX_URLS} stores per batch")
+
+    async def stream():
+        tasks = [asyncio.ensure_future(_batch_item(url, request.llm)) for url in website_urls]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield json.dumps(await finished, ensure_ascii=False, default=str) + "\n"
+        finally:
+            # client went away: stop scraping the rest of the batch
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+def _store_key(store_url: str) -> str:
+    # brand rows are keyed on the URL as HttpUrl normalizes it
+    try:
+        return normalize_url(store_url)
+    except ValidationError:
+        raise HTTPException(status_code=422, detail=f"Invalid store_url: {store_url}")
+
+def _is_fresh(extracted_at, max_age: float) -> bool:
+    age = age_seconds(extracted_at)
+    return age is not None and age <= max_age
+
+async def _serve_stored(store_url: str, max_age: Optional[float], llm: Optional[str],
+                        key: Tuple, render: Callable[[int, Optional[datetime]], dict]) -> dict:
+    """
+    Serve a stored-insights response from the response cache, else from MySQL (stale-while-revalidate).
+    Data older than `max_age` seconds is still returned at once, marked stale, while the scheduler
+    refreshes the store in the background; only a store with nothing stored yet waits for a scrape.
+    """
+    max_age = config.STORED_MAX_AGE if max_age is None else max_age
+    body = response_cache.get(key)
+    if body is None:
+        store = get_store()
+        state = await run_blocking(store.brand_state, store_url)
+        if state is None:
+            await run_insights_pipeline(store_url, llm_mode=llm)
+            state = await run_blocking(store.brand_state, store_url)
+            if state is None:
+                raise HTTPException(status_code=404, detail="No stored insights for this store")
+        body = await run_blocking(render, *state)
+        response_cache.put(key, body)
+    if _is_fresh(body["extracted_at"], max_age):
+        return body
+    get_scheduler().request_refresh(store_url)
+    return dict(body, stale=True)
+
+@router.get("/stored/insights")
+async def get_stored_insights(store_url: str, max_age: Optional[float] = Query(None, ge=0),
+                              llm: Optional[Literal['off', 'partial', 'full']] = None):
+    """Stored insights for a store (catalog excluded, see /stored/products); refreshed in the background when older than max_age seconds"""
+    try:
+        store_url = _store_key(store_url)
+        return await _serve_stored(
+            store_url, max_age, llm, (store_url, "insights"),
+            lambda brand_id, extracted_at: get_store().get_insights(store_url)
+        )
+    except Exception as e:
+        raise _to_http_error(e)
+
+async def _product_page(store_url: str, max_age: Optional[float], llm: Optional[str],
+                        limit: int, cursor: Optional[str], q: Optional[str]) -> dict:
+    store_url = _store_key(store_url)
+    try:
+        after = decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Invalid cursor")
+
+    def render(brand_id: int, extracted_at: Optional[datetime]) -> dict:
+        products, next_cursor = get_store().list_products(brand_id, limit, after, query=q)
+        return {
+            "store_url": store_url,
+            "products": products,
+            "next_cursor": next_cursor,
+            "extracted_at": extracted_at.isoformat() if extracted_at else None,
+        }
+
+    return await _serve_stored(store_url, max_age, llm, (store_url, "products", q, limit, after), render)
+
+@router.get("/stored/products")
+async def list_stored_products(store_url: str, limit: int = Query(config.STORED_PAGE_SIZE, ge=1, le=config.STORED_MAX_PAGE_SIZE),
+                               cursor: Optional[str] = None, max_age: Optional[float] = Query(None, ge=0),
+                               llm: Optional[Literal['off', 'partial', 'full']] = None):
+    """Stored product catalog, `limit` per page; pass the returned next_cursor to get the following page"""
+    try:
+        return await _product_page(store_url, max_age, llm, limit, cursor, None)
+    except Exception as e:
+        raise _to_http_error(e)
+
+@router.get("/stored/products/search")
+async def search_stored_products(store_url: str, q: str = Query(..., min_length=1),
+                                 limit: int = Query(config.STORED_PAGE_SIZE, ge=1, le=config.STORED_MAX_PAGE_SIZE),
+                                 cursor: Optional[str] = None, max_age: Optional[float] = Query(None, ge=0),
+                                 llm: Optional[Literal['off', 'partial', 'full']] = None):
+    """Full-text search over stored product titles and descriptions, paginated like /stored/products"""
+    try:
+        return await _product_page(store_url, max_age, llm, limit, cursor, q)
+    except Exception as e:
+        raise _to_http_error(e)
+
+def _snapshot_cursor(cursor: Optional[str]) -> Optional[Tuple[str, int]]:
+    try:
+        return decode_snapshot_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Invalid cursor")
+
+@router.get("/stored/products/history")
+async def get_product_history(store_url: str, product_id: str, since: Optional[datetime] = None,
+                              limit: int = Query(config.STORED_PAGE_SIZE, ge=1, le=config.STORED_MAX_PAGE_SIZE),
+                              cursor: Optional[str] = None):
+    """
+    Price and availability history of one stored product, oldest first (a snapshot per change,
+    listed=false once it left the catalog); paginated like /stored/products
+    """
+    try:
+        store_url = _store_key(store_url)
+        after = _snapshot_cursor(cursor)
+        store = get_store()
+        state = await run_blocking(store.brand_state, store_url)
+        if state is None:
+            raise HTTPException(status_code=404, detail="No stored insights for this store")
+        snapshots, next_cursor = await run_blocking(store.price_history, state[0], product_id, limit, after, since)
+        return {"store_url": store_url, "product_id": product_id, "snapshots": snapshots, "next_cursor": next_cursor}
+    except Exception as e:
+        raise _to_http_error(e)
+
+@router.get("/stored/changes")
+async def list_product_changes(since: datetime,
+                               limit: int = Query(config.STORED_PAGE_SIZE, ge=1, le=config.STORED_MAX_PAGE_SIZE),
+                               cursor: Optional[str] = None):
+    """Price and availability changes across all stored stores captured since a time (UTC unless it has an offset), oldest first"""
+    try:
+        after = _snapshot_cursor(cursor)
+        changes, next_cursor = await run_blocking(get_store().changes_since, since, limit, after)
+        return {"since": since.isoformat(), "changes": changes, "next_cursor": next_cursor}
+    except Exception as e:
+        raise _to_http_error(e)
+
+def _summary(data: dict) -> dict:
+    # same shape as /stored/insights: the catalog itself is left to /stored/products
+    summary = {k: v for k, v in data.items() if k != 'product_catalog'}
+    summary['product_count'] = len(data.get('product_catalog') or [])
+    return summary
+
+async def _recent_or_scrape(store_url: str, max_age: float, llm: Optional[str]) -> Tuple[dict, str]:
+    """Stored insights if the store was scraped within max_age seconds (shared with /stored/insights), else a fresh scrape"""
+    key = (store_url, "insights")
+    body = response_cache.get(key)
+    if body is None:
+        store = get_store()
+        state = await run_blocking(store.brand_state, store_url)
+        if state is not None and _is_fresh(state[1], max_age):
+            body = await run_blocking(store.get_insights, store_url)
+            if body is not None:
+                response_cache.put(key, body)
+    if body is not None and _is_fresh(body["extracted_at"], max_age):
+        return body, "stored"
+    return _summary(await run_insights_pipeline(store_url, llm_mode=llm)), "scraped"
+
+async def _competitor(store_url: str, score: float, shared_terms: list, max_age: float, llm: Optional[str]) -> dict:
+    item = {"store_url": store_url, "score": round(score, 4), "shared_terms": shared_terms}
+    try:
+        async with batch_limiter.limit(urlparse(store_url).netloc.lower()):
+            data, source = await _recent_or_scrape(store_url, max_age, llm)
+        item.update(status="ok", source=source, data=data)
+    except Exception as e:
+        error = _to_http_error(e)
+        item.update(status="error", status_code=error.status_code, error=error.detail)
+    return item
+
+def _has_stored_products(store_url: str) -> bool:
+    # a brand stored without any products never enters the index, so rebuilding for it is wasted
+    store = get_store()
+    state = store.brand_state(store_url)
+    return state is not None and bool(store.list_products(state[0], 1)[0])
+
+@router.get("/competitors")
+async def get_competitors(store_url: str,
+                          top_n: int = Query(config.COMPETITOR_TOP_N, ge=1, le=config.COMPETITOR_MAX_TOP_N),
+                          max_age: Optional[float] = Query(None, ge=0),
+                          llm: Optional[Literal['off', 'partial', 'full']] = None):
+    """
+    Rank the seed stores (COMPETITOR_SEEDS_FILE) by catalog similarity to a stored brand and return
+    insights for the closest `top_n`, scraped concurrently unless stored within max_age seconds.
+    Seeds whose catalog isn't stored yet can't be ranked and are listed under unindexed_seeds.
+    """
+    try:
+        store_url = _store_key(store_url)
+        max_age = config.COMPETITOR_MAX_AGE if max_age is None else max_age
+        index = await get_competitor_index()
+        if store_url not in index and await run_blocking(_has_stored_products, store_url):
+            # stored since the index was built
+            index = await get_competitor_index(max_age=0)
+        if store_url not in index:
+            raise HTTPException(status_code=404, detail="No stored products for this store; fetch its insights first")
+        seeds = competitor_seeds()
+        ranked = index.rank(store_url, seeds, top_n)
+        competitors = await asyncio.gather(*(
+            _competitor(url, score, terms, max_age, llm) for url, score, terms in ranked
+        ))
+        return {
+            "store_url": store_url,
+            "competitors": competitors,
+            "unindexed_seeds": [url for url in seeds if url not in index and url != store_url],
+        }
+    except Exception as e:
+        raise _to_http_error(e)
@@ -0,0 +1,48 @@
+
+import sys
+import os
+for _path in (os.path.join(os.path.dirname(os.path.dirname(__file__)), 'services'),
+              os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils')):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from metrics import registry
+from pipeline import pipeline_flights
+from storage import response_cache
+from host_policy import host_policies
+from jobs import get_job_queue
+from llm.cache import llm_cache
+
+router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+registry.callback("insights_pipeline_runs_total", "Pipeline runs actually executed", "counter",
+                  lambda: pipeline_flights.stats()['executions'])
+registry.callback("insights_pipeline_coalesced_total", "Requests that joined an in-flight run", "counter",
+                  lambda: pipeline_flights.stats()['coalesced'])
+registry.callback("insights_llm_cache_hits_total", "LLM cache hits (memory and disk)", "counter",
+                  lambda: llm_cache.memory_hits + llm_cache.disk_hits)
+registry.callback("insights_llm_cache_misses_total", "LLM cache misses", "counter",
+                  lambda: llm_cache.misses)
+registry.callback("insights_response_cache_hits_total", "Stored-insights response cache hits", "counter",
+                  lambda: response_cache.hits)
+registry.callback("insights_response_cache_misses_total", "Stored-insights response cache misses", "counter",
+                  lambda: response_cache.misses)
+
+registry.callback("insights_jobs_completed_total", "Scrape jobs that succeeded in this process", "counter",
+                  lambda: get_job_queue().completed)
+registry.callback("insights_jobs_failed_total", "Scrape jobs that failed in this process", "counter",
+                  lambda: get_job_queue().failed)
+registry.callback("insights_jobs_in_flight", "Scrape jobs running in this process", "gauge",
+                  lambda: get_job_queue().stats()['in_flight'])
+
+registry.callback("insights_open_circuits", "Store hosts currently refused by their circuit breaker", "gauge",
+                  lambda: host_policies.stats()['open_circuits'])
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Stage latency histograms, byte/item/token/row counters and cache stats in Prometheus text format"""
+    return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
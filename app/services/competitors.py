@@ -0,0 +1,159 @@
+
+import sys
+import os
+for _path in (os.path.dirname(os.path.dirname(__file__)),
+              os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models'),
+              os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils')):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+import asyncio
+import logging
+import math
+import re
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+from pydantic import ValidationError
+from records import normalize_url
+from db_insert import strip_html
+from storage import InsightsStore, get_store
+from concurrency import run_blocking
+import config
+
+logger = logging.getLogger(__name__)
+
+TOKEN = re.compile(r"[a-z][a-z0-9]+")
+# Words every catalog shares; they would only add noise to the similarity
+STOPWORDS = frozenset((
+    'and', 'the', 'for', 'with', 'you', 'your', 'our', 'are', 'this', 'that', 'from', 'all', 'any', 'can',
+    'has', 'have', 'its', 'not', 'off', 'one', 'out', 'set', 'was', 'will', 'buy', 'new', 'now', 'free',
+    'size', 'sizes', 'color', 'colour', 'pack', 'made', 'product', 'products', 'shop', 'sale', 'item',
+))
+# A product title says more about what a store sells than its (often boilerplate) description
+TITLE_WEIGHT = 3
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return [t for t in TOKEN.findall(strip_html(str(text)).lower()) if t not in STOPWORDS]
+
+def seed_url(line: str) -> Optional[str]:
+    """Normalized store URL for a seed line (bare domains get https://), None if it isn't one"""
+    line = line.split('#', 1)[0].strip()
+    if not line:
+        return None
+    if '://' not in line:
+        line = f"https://{line}"
+    try:
+        return normalize_url(line)
+    except ValidationError:
+        logger.warning("Ignoring invalid competitor seed %r", line)
+        return None
+
+
+class CompetitorIndex:
+    """
+    TF-IDF vectors of the stored stores, one document per store: the tokens of every product
+    title (weighted TITLE_WEIGHT) and description. Vectors use sublinear tf and are
+    L2-normalized, so the dot product of two stores is their cosine similarity.
+    """
+
+    def __init__(self, vectors: Dict[str, Dict[str, float]]):
+        self.vectors = vectors
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def build(cls, rows: Iterable[Tuple[str, Optional[str], Optional[str]]]) -> 'CompetitorIndex':
+        counts: Dict[str, Counter] = {}
+        for store_url, title, description in rows:
+            terms = counts.setdefault(store_url, Counter())
+            for token in tokenize(title):
+                terms[token] += TITLE_WEIGHT
+            terms.update(tokenize(description))
+        document_frequency = Counter()
+        for terms in counts.values():
+            document_frequency.update(terms.keys())
+        stores = len(counts)
+        vectors = {}
+        for store_url, terms in counts.items():
+            weights = {
+                term: (1 + math.log(count)) * (math.log((1 + stores) / (1 + document_frequency[term])) + 1)
+                for term, count in terms.items()
+            }
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            vectors[store_url] = {term: w / norm for term, w in weights.items()}
+        return cls(vectors)
+
+    def __contains__(self, store_url: str) -> bool:
+        return store_url in self.vectors
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    def similarity(self, a: str, b: str) -> Tuple[float, List[str]]:
+        """Cosine similarity of two indexed stores and the terms contributing most to it"""
+        va, vb = self.vectors[a], self.vectors[b]
+        if len(va) > len(vb):
+            va, vb = vb, va
+        contributions = {term: w * vb[term] for term, w in va.items() if term in vb}
+        top = sorted(contributions, key=contributions.get, reverse=True)[:5]
+        return sum(contributions.values()), top
+
+    def rank(self, store_url: str, candidates: Iterable[str], top_n: int) -> List[Tuple[str, float, List[str]]]:
+        """The `top_n` indexed candidates most similar to `store_url`, best first"""
+        scored = [
+            (candidate, *self.similarity(store_url, candidate))
+            for candidate in dict.fromkeys(candidates)
+            if candidate != store_url and candidate in self.vectors
+        ]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:top_n]
+
+
+_seeds: Tuple[Optional[float], List[str]] = (None, [])
+
+def competitor_seeds(path: Optional[str] = None) -> List[str]:
+    """Seed store URLs from COMPETITOR_SEEDS_FILE, re-read when the file changes"""
+    global _seeds
+    path = path or config.COMPETITOR_SEEDS_FILE
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        logger.warning("Competitor seed file %s not found", path)
+        return []
+    if _seeds[0] != mtime:
+        with open(path, encoding='utf-8') as f:
+            urls = (seed_url(line) for line in f)
+            _seeds = (mtime, list(dict.fromkeys(url for url in urls if url)))
+    return _seeds[1]
+
+def build_index(store: InsightsStore) -> CompetitorIndex:
+    return CompetitorIndex.build(store.iter_product_texts())
+
+_index: Optional[CompetitorIndex] = None
+_index_lock: Optional[asyncio.Lock] = None
+
+async def get_competitor_index(store: Optional[InsightsStore] = None, max_age: Optional[float] = None) -> CompetitorIndex:
+    """
+    The shared index, rebuilt on the executor once older than `max_age` seconds (default
+    COMPETITOR_INDEX_TTL); concurrent callers wait for a single rebuild.
+    """
+    global _index, _index_lock
+    max_age = config.COMPETITOR_INDEX_TTL if max_age is None else max_age
+    if _index is not None and time.monotonic() - _index.built_at < max_age:
+        return _index
+    if _index_lock is None:
+        _index_lock = asyncio.Lock()
+    seen = _index
+    async with _index_lock:
+        # unless whoever held the lock just rebuilt it
+        if _index is seen:
+            started = time.perf_counter()
+            _index = await run_blocking(build_index, store or get_store())
+            logger.info("Built competitor index over %d stores in %.2fs", len(_index), time.perf_counter() - started)
+    return _index
+
+def index_stats() -> dict:
+    if _index is None:
+        return {'stores': 0, 'age_seconds': None}
+    return {'stores': len(_index), 'age_seconds': round(time.monotonic() - _index.built_at, 1)}
@@ -0,0 +1,207 @@
+
+import sys
+import os
+for _path in (os.path.dirname(os.path.dirname(__file__)),
+              os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils')):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+import random
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import Optional
+from urllib.parse import urlparse
+from exceptions import HostUnavailableError
+from metrics import HOST_REJECTED, HTTP_RETRIES
+import config
+
+# Responses worth retrying: throttling and transient server errors
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After in seconds, from either delta-seconds or an HTTP date"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> Optional[float]:
+    """
+    Delay before retry number `attempt + 1`: the server's Retry-After when it sent one (None
+    if it asks for more than RETRY_AFTER_MAX), otherwise full-jitter exponential backoff
+    capped at RETRY_BACKOFF_MAX.
+    """
+    if retry_after is not None:
+        return retry_after if retry_after <= config.RETRY_AFTER_MAX else None
+    return random.uniform(0, min(config.RETRY_BACKOFF_MAX, config.RETRY_BACKOFF_BASE * 2 ** attempt))
+
+
+class HostPolicy:
+    """
+    Request pacing and health for one host, shared by every scrape that talks to it.
+
+    Token bucket: each request reserves a slot and is told how long to wait for it, so the
+    same object paces threads (time.sleep) and coroutines (asyncio.sleep). A 429 halves the
+    rate (down to HOST_MIN_RATE) and pauses the host for Retry-After; each success wins back
+    a twentieth of the configured rate.
+
+    Circuit breaker: CIRCUIT_FAILURES consecutive failures open the circuit, and requests fail
+    fast with HostUnavailableError for CIRCUIT_COOLDOWN seconds. After that one probe request
+    is let through; it closes the circuit on success and re-opens it on failure.
+    """
+
+    def __init__(self, rate: float, burst: int, min_rate: float, failures: int, cooldown: float):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min(max(min_rate, 0.01), rate) if rate > 0 else 0
+        self.burst = max(1, burst)
+        self.failure_threshold = failures
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._failures = 0
+        self._open_until = 0.0
+        self._probe_started: Optional[float] = None
+
+    def acquire(self) -> float:
+        """Reserve the next request slot and return how long to wait before sending it"""
+        with self._lock:
+            now = time.monotonic()
+            self._check_circuit(now)
+            if self.max_rate <= 0:
+                return max(0.0, self._paused_until - now)
+            start = max(now, self._paused_until)
+            if start > self._updated:
+                self._tokens = min(self.burst, self._tokens + (start - self._updated) * self.rate)
+                self._updated = start
+            self._tokens -= 1
+            return (start - now) + (-self._tokens / self.rate if self._tokens < 0 else 0.0)
+
+    def _check_circuit(self, now: float):
+        if not self._open_until:
+            return
+        if now < self._open_until:
+            HOST_REJECTED.inc()
+            raise HostUnavailableError(f"Host unavailable for another {self._open_until - now:.0f}s",
+                                       retry_after=self._open_until - now)
+        # half-open: one probe at a time (a probe that never reports back expires after a cooldown)
+        if self._probe_started is not None and now - self._probe_started < self.cooldown:
+            HOST_REJECTED.inc()
+            raise HostUnavailableError("Host unavailable, waiting on a probe request",
+                                       retry_after=self.cooldown - (now - self._probe_started))
+        self._probe_started = now
+
+    def record_success(self):
+        """The host answered (any status that isn't throttling or a server error)"""
+        with self._lock:
+            self._failures = 0
+            self._open_until = 0.0
+            self._probe_started = None
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+    def record_throttle(self, retry_after: Optional[float]):
+        """429 (or Retry-After on a 503): slow down and hold every request until Retry-After"""
+        with self._lock:
+            now = time.monotonic()
+            if self.max_rate > 0:
+                self.rate = max(self.min_rate, self.rate / 2)
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+            # no burst straight after the pause; the next requests are spaced at the new rate
+            self._updated = max(self._updated, self._paused_until, now)
+            self._tokens = min(self._tokens, 0.0)
+            # throttled isn't dead: the host answered
+            self._failures = 0
+            self._open_until = 0.0
+            self._probe_started = None
+
+    def record_failure(self):
+        """Server error or connection failure"""
+        with self._lock:
+            self._failures += 1
+            if self._probe_started is not None or self._failures >= self.failure_threshold:
+                self._open_until = time.monotonic() + self.cooldown
+                self._probe_started = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._open_until > time.monotonic()
+
+    def retry_after(self) -> float:
+        """Seconds until the host takes requests again: an open circuit or a Retry-After pause"""
+        with self._lock:
+            return max(0.0, self._open_until - time.monotonic(), self._paused_until - time.monotonic())
+
+
+def retry_delay(policy: HostPolicy, attempt: int, retries: Optional[int] = None, response=None,
+                connect_error: bool = False) -> Optional[float]:
+    """
+    Record a failed attempt against the host and return the delay before retrying it, or None
+    to give up. `response` is the 429/5xx response (requests or httpx); without one the request
+    raised: a connection error counts towards the circuit breaker, a read timeout (slow, not
+    dead) doesn't.
+    """
+    retry_after = None
+    if response is not None:
+        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+        if response.status_code == 429 or retry_after is not None:
+            policy.record_throttle(retry_after)
+            reason = 'throttled'
+        else:
+            policy.record_failure()
+            reason = 'server_error'
+    elif connect_error:
+        policy.record_failure()
+        reason = 'connect_error'
+    else:
+        reason = 'timeout'
+    if attempt >= (config.HTTP_RETRIES if retries is None else retries):
+        return None
+    delay = backoff_delay(attempt, retry_after)
+    if delay is not None:
+        HTTP_RETRIES.inc(reason=reason)
+    return delay
+
+
+class HostPolicies:
+    """HostPolicy per host (netloc), least recently used hosts dropped beyond `max_hosts`"""
+
+    def __init__(self, max_hosts: int):
+        self.max_hosts = max_hosts
+        self._policies: "OrderedDict[str, HostPolicy]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> HostPolicy:
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            policy = self._policies.get(host)
+            if policy is None:
+                policy = HostPolicy(config.HOST_RATE, config.HOST_BURST, config.HOST_MIN_RATE,
+                                    config.CIRCUIT_FAILURES, config.CIRCUIT_COOLDOWN)
+                self._policies[host] = policy
+                while len(self._policies) > self.max_hosts:
+                    self._policies.popitem(last=False)
+            else:
+                self._policies.move_to_end(host)
+            return policy
+
+    def stats(self) -> dict:
+        with self._lock:
+            policies = list(self._policies.values())
+        return {
+            'hosts': len(policies),
+            'open_circuits': sum(p.is_open for p in policies),
+            'throttled_hosts': sum(p.rate < p.max_rate for p in policies),
+        }
+
+
+host_policies = HostPolicies(config.HOST_POLICY_MAX_HOSTS)
@@ -0,0 +1,180 @@
+
+import sys
+import os
+for _path in (os.path.dirname(os.path.dirname(__file__)),):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlencode
+import config
+
+logger = logging.getLogger(__name__)
+
+class CachedResponse:
+    __slots__ = ('url', 'body', 'etag', 'last_modified', 'stored_at')
+
+    def __init__(self, url: str, body: bytes, etag: Optional[str], last_modified: Optional[str], stored_at: float):
+        self.url = url
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Validators to send so the server can answer 304 Not Modified"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class HttpCache:
+    """
+    On-disk HTTP cache keyed by URL. Only responses carrying an ETag or Last-Modified
+    validator are stored; they are revalidated with a conditional request on every use
+    and the cached body is reused on 304. Entries older than `ttl` seconds are dropped,
+    and the least recently used entries are evicted once the cache exceeds `max_bytes`.
+    The cache is optional: filesystem errors are logged and read as a miss, never raised.
+    """
+
+    def __init__(self, directory: str, ttl: float, max_bytes: int):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # key -> (size in bytes, last access time); loaded lazily from disk
+        self._index: Optional[Dict[str, Tuple[int, float]]] = None
+        self._size = 0
+
+    @staticmethod
+    def key_for(url: str, params: Optional[Dict] = None) -> str:
+        if params:
+            url = f"{url}{'&' if '?' in url else '?'}{urlencode(sorted(params.items()))}"
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _paths(self, key: str) -> Tuple[str, str]:
+        base = os.path.join(self.directory, key[:2], key)
+        return base + '.json', base + '.body'
+
+    def _load_index(self):
+        if self._index is not None:
+            return
+        self._index = {}
+        self._size = 0
+        if not os.path.isdir(self.directory):
+            return
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith('.body'):
+                    continue
+                stat = os.stat(os.path.join(root, name))
+                self._index[name[:-5]] = (stat.st_size, stat.st_mtime)
+                self._size += stat.st_size
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            try:
+                self._load_index()
+            except OSError as e:
+                logger.warning("HTTP cache unreadable, treating as a miss: %s", e)
+                self._index = None
+                return None
+            if key not in self._index:
+                return None
+            meta_path, body_path = self._paths(key)
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+                if time.time() - meta['stored_at'] > self.ttl:
+                    self._remove(key)
+                    return None
+                with open(body_path, 'rb') as f:
+                    body = f.read()
+            except (OSError, ValueError, KeyError):
+                self._remove(key)
+                return None
+            self._index[key] = (self._index[key][0], time.time())
+            return CachedResponse(meta['url'], body, meta.get('etag'), meta.get('last_modified'), meta['stored_at'])
+
+    def put(self, key: str, url: str, headers, body: bytes):
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+        if len(body) > self.max_bytes:
+            return
+        meta = {'url': url, 'etag': etag, 'last_modified': last_modified, 'stored_at': time.time()}
+        meta_path, body_path = self._paths(key)
+        with self._lock:
+            try:
+                self._load_index()
+                os.makedirs(os.path.dirname(body_path), exist_ok=True)
+                self._write_atomic(body_path, body)
+                self._write_atomic(meta_path, json.dumps(meta).encode('utf-8'))
+            except OSError as e:
+                logger.warning("HTTP cache write failed, response not cached: %s", e)
+                if self._index is not None:
+                    self._remove(key)
+                return
+            previous = self._index.get(key)
+            if previous:
+                self._size -= previous[0]
+            self._index[key] = (len(body), time.time())
+            self._size += len(body)
+            self._evict()
+
+    def touch(self, key: str, headers):
+        """Refresh stored_at (and any new validators) after a 304 revalidation"""
+        meta_path, _ = self._paths(key)
+        with self._lock:
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+                meta['stored_at'] = time.time()
+                meta['etag'] = headers.get('ETag') or meta.get('etag')
+                meta['last_modified'] = headers.get('Last-Modified') or meta.get('last_modified')
+                self._write_atomic(meta_path, json.dumps(meta).encode('utf-8'))
+            except (OSError, ValueError) as e:
+                logger.warning("HTTP cache revalidation not recorded: %s", e)
+
+    def _evict(self):
+        if self._size <= self.max_bytes:
+            return
+        for key, _ in sorted(self._index.items(), key=lambda item: item[1][1]):
+            self._remove(key)
+            if self._size <= self.max_bytes:
+                break
+
+    def _remove(self, key: str):
+        entry = self._index.pop(key, None)
+        if entry:
+            self._size -= entry[0]
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes):
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+
+_http_cache: Optional[HttpCache] = None
+
+def get_http_cache() -> Optional[HttpCache]:
+    """Return the shared HTTP cache, or None when HTTP_CACHE_DIR is empty"""
+    global _http_cache
+    if _http_cache is None and config.HTTP_CACHE_DIR:
+        _http_cache = HttpCache(config.HTTP_CACHE_DIR, config.HTTP_CACHE_TTL, config.HTTP_CACHE_MAX_BYTES)
+    return _http_cache
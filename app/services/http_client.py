@@ -0,0 +1,45 @@
+
+import sys
+import os
+for _path in (os.path.dirname(os.path.dirname(__file__)),):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+from typing import Optional
+import httpx
+import requests
+import config
+
+_async_client: Optional[httpx.AsyncClient] = None
+_session: Optional[requests.Session] = None
+
+def get_session() -> requests.Session:
+    """Return the shared blocking requests session so connections are reused across scrapes"""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        _session.headers.update({
+            'User-Agent': config.USER_AGENT
+        })
+    return _session
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the shared async HTTP client, creating it on first use"""
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            headers={'User-Agent': config.USER_AGENT},
+            timeout=config.HTTP_TIMEOUT,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=config.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=config.HTTP_MAX_KEEPALIVE
+            )
+        )
+    return _async_client
+
+async def close_async_client():
+    """Close the shared async HTTP client and release its connection pool"""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
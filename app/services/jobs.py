@@ -0,0 +1,438 @@
+
+import sys
+import os
+for _path in (os.path.dirname(os.path.dirname(__file__)),
+              os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils')):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+import asyncio
+import json
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from db_insert import get_connection
+from pipeline import run_insights_pipeline
+from scraper import WebsiteNotFoundError, HostUnavailableError
+from concurrency import run_blocking
+import config
+
+logger = logging.getLogger(__name__)
+
+JOB_STAGES = ('scrape', 'llm', 'persist')
+ACTIVE_STATUSES = ('queued', 'running')
+
+JOB_COLUMNS = ["id", "store_url", "llm_mode", "status", "progress", "result", "error", "attempts",
+               "created_at", "started_at", "finished_at", "updated_at"]
+
+def _active_key(store_url: str, llm_mode: str) -> str:
+    """scrape_jobs.active_key of a queued or running job; its unique index allows one per store and llm mode"""
+    return f"{llm_mode} {store_url}"
+
+def _timestamp(seconds_ago: float = 0.0) -> str:
+    # naive UTC like brand_insights.extracted_at; the space separator sorts the same in MySQL and SQLite
+    return (datetime.utcnow() - timedelta(seconds=seconds_ago)).isoformat(sep=' ', timespec='seconds')
+
+def _load(value):
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode('utf-8')
+    return json.loads(value) if isinstance(value, str) else value
+
+def _dump(value) -> Optional[str]:
+    return None if value is None else json.dumps(value, ensure_ascii=False, default=str)
+
+def _iso(value) -> Optional[str]:
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    return value
+
+def job_error(e: Exception) -> dict:
+    """The error a failed job reports, as the synchronous endpoint would have answered"""
+    if isinstance(e, WebsiteNotFoundError):
+        return {'status_code': 404, 'detail': "Website not found or inaccessible"}
+    if isinstance(e, HostUnavailableError):
+        return {'status_code': 503, 'detail': str(e), 'retry_after': e.retry_after}
+    return {'status_code': 500, 'detail': str(e)}
+
+
+class JobProgress:
+    """Per-stage state of one job run: pending, running, then done (with its duration), failed or skipped"""
+
+    def __init__(self):
+        self.stages: Dict[str, dict] = {stage: {'status': 'pending'} for stage in JOB_STAGES}
+        self.current: Optional[str] = None
+        self._started = 0.0
+
+    def _close(self, status: str):
+        if self.current is not None:
+            self.stages[self.current] = {
+                'status': status, 'ms': round((time.perf_counter() - self._started) * 1000, 1)}
+            self.current = None
+
+    def start(self, stage: str):
+        self._close('done')
+        self.current = stage
+        self._started = time.perf_counter()
+        self.stages[stage] = {'status': 'running'}
+
+    def finish(self, failed: bool = False):
+        """Close the current stage; stages never reached are skipped (e.g. persist with PERSIST_INSIGHTS off)"""
+        self._close('failed' if failed else 'done')
+        for state in self.stages.values():
+            if state['status'] == 'pending':
+                state['status'] = 'skipped'
+
+
+class JobStore:
+    """
+    Job state in the scrape_jobs table, which doubles as the queue: a worker claims a queued job
+    with a conditional UPDATE, so several processes can share it. Takes a `connect` callable like
+    InsightsStore, so it also runs against sqlite3 (placeholder='?', dialect='sqlite').
+    """
+
+    def __init__(self, connect: Callable, placeholder: str = "%s", dialect: str = "mysql"):
+        self.connect = connect
+        self.placeholder = placeholder
+        self.dialect = dialect
+
+    @contextmanager
+    def _cursor(self):
+        cnx = self.connect()
+        cursor = cnx.cursor()
+        try:
+            yield cursor
+            cnx.commit()
+        except Exception:
+            cnx.rollback()
+            raise
+        finally:
+            cursor.close()
+            cnx.close()
+
+    def _in(self, values) -> str:
+        return f"({', '.join([self.placeholder] * len(values))})"
+
+    def create(self, store_url: str, llm_mode: str) -> Optional[str]:
+        """Queue a job; None if one for the same store and llm mode is already queued or running"""
+        job_id = uuid.uuid4().hex
+        now = _timestamp()
+        progress = JobProgress().stages
+        # the unique active_key decides between concurrent submits; the loser inserts nothing
+        insert = "INSERT OR IGNORE" if self.dialect == "sqlite" else "INSERT IGNORE"
+        with self._cursor() as cursor:
+            cursor.execute(
+                f"{insert} INTO scrape_jobs (id, store_url, llm_mode, status, progress, attempts, created_at,"
+                f" updated_at, active_key) VALUES ({', '.join([self.placeholder] * 9)})",
+                (job_id, store_url, llm_mode, 'queued', _dump(progress), 0, now, now, _active_key(store_url, llm_mode))
+            )
+            created = cursor.rowcount == 1
+        return job_id if created else None
+
+    def active(self, store_url: str, llm_mode: str) -> Optional[str]:
+        """Id of a queued or running job for the same store and llm mode, if there is one"""
+        p = self.placeholder
+        with self._cursor() as cursor:
+            cursor.execute(
+                f"SELECT id FROM scrape_jobs WHERE store_url={p} AND status IN {self._in(ACTIVE_STATUSES)}"
+                f" AND llm_mode={p} ORDER BY created_at LIMIT 1",
+                (store_url, *ACTIVE_STATUSES, llm_mode)
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._cursor() as cursor:
+            cursor.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM scrape_jobs WHERE id={self.placeholder}", (job_id,))
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        job = dict(zip(JOB_COLUMNS, row))
+        return {
+            'job_id': job['id'],
+            'store_url': job['store_url'],
+            'llm': job['llm_mode'],
+            'status': job['status'],
+            'progress': _load(job['progress']) or {},
+            'attempts': job['attempts'],
+            'created_at': _iso(job['created_at']),
+            'started_at': _iso(job['started_at']),
+            'finished_at': _iso(job['finished_at']),
+            'error': _load(job['error']),
+            'result': _load(job['result']),
+        }
+
+    def queued(self, limit: int) -> List[Tuple[str, str, str]]:
+        """(id, store_url, llm_mode) of the oldest queued jobs"""
+        with self._cursor() as cursor:
+            cursor.execute(
+                f"SELECT id, store_url, llm_mode FROM scrape_jobs WHERE status='queued'"
+                f" ORDER BY created_at LIMIT {self.placeholder}",
+                (limit,)
+            )
+            return [tuple(row) for row in cursor.fetchall()]
+
+    def claim(self, job_id: str) -> bool:
+        """Mark a queued job running; False if another worker got to it first"""
+        p = self.placeholder
+        now = _timestamp()
+        with self._cursor() as cursor:
+            cursor.execute(
+                f"UPDATE scrape_jobs SET status='running', attempts=attempts+1, progress={p},"
+                f" started_at={p}, updated_at={p} WHERE id={p} AND status='queued'",
+                (_dump(JobProgress().stages), now, now, job_id)
+            )
+            return cursor.rowcount == 1
+
+    def update_progress(self, job_id: str, progress: dict):
+        p = self.placeholder
+        with self._cursor() as cursor:
+            cursor.execute(
+                f"UPDATE scrape_jobs SET progress={p}, updated_at={p} WHERE id={p}",
+                (_dump(progress), _timestamp(), job_id)
+            )
+
+    def heartbeat(self, job_ids: List[str]):
+        """Mark running jobs as alive, so they aren't requeued as stale"""
+        if not job_ids:
+            return
+        with self._cursor() as cursor:
+            cursor.execute(
+                f"UPDATE scrape_jobs SET updated_at={self.placeholder}"
+                f" WHERE status='running' AND id IN {self._in(job_ids)}",
+                (_timestamp(), *job_ids)
+            )
+
+    def finish(self, job_id: str, progress: dict, result: Optional[dict] = None, error: Optional[dict] = None):
+        p = self.placeholder
+        now = _timestamp()
+        with self._cursor() as cursor:
+            cursor.execute(
+                f"UPDATE scrape_jobs SET status={p}, progress={p}, result={p}, error={p}, finished_at={p}, updated_at={p},"
+                f" active_key=NULL WHERE id={p}",
+                ('failed' if error else 'succeeded', _dump(progress), _dump(result), _dump(error), now, now, job_id)
+            )
+
+    def release(self, job_ids: List[str]):
+        """Put jobs this process stopped working on back in the queue, without counting the attempt"""
+        if not job_ids:
+            return
+        with self._cursor() as cursor:
+            cursor.execute(
+                f"UPDATE scrape_jobs SET status='queued', attempts=attempts-1, updated_at={self.placeholder}"
+                f" WHERE status='running' AND id IN {self._in(job_ids)}",
+                (_timestamp(), *job_ids)
+            )
+
+    def requeue_stale(self, stale_after: float, max_attempts: int) -> Tuple[int, int]:
+        """
+        Running jobs without a heartbeat for `stale_after` seconds lost their worker (a restart or a
+        crash): requeue them, or fail them once they were started `max_attempts` times. Returns (requeued, failed).
+        """
+        p = self.placeholder
+        now = _timestamp()
+        stale_before = _timestamp(stale_after)
+        error = _dump({'status_code': 500, 'detail': f"Job interrupted {max_attempts} times"})
+        with self._cursor() as cursor:
+            cursor.execute(
+                f"UPDATE scrape_jobs SET status='failed', error={p}, finished_at={p}, updated_at={p}, active_key=NULL"
+                f" WHERE status='running' AND updated_at < {p} AND attempts >= {p}",
+                (error, now, now, stale_before, max_attempts)
+            )
+            failed = max(cursor.rowcount, 0)
+            cursor.execute(
+                f"UPDATE scrape_jobs SET status='queued', updated_at={p} WHERE status='running' AND updated_at < {p}",
+                (now, stale_before)
+            )
+            requeued = max(cursor.rowcount, 0)
+        return requeued, failed
+
+    def purge(self, older_than: float) -> int:
+        """Delete jobs that finished more than `older_than` seconds ago"""
+        p = self.placeholder
+        with self._cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM scrape_jobs WHERE status IN ('succeeded', 'failed') AND finished_at < {p}",
+                (_timestamp(older_than),)
+            )
+            return max(cursor.rowcount, 0)
+
+
+_job_store: Optional[JobStore] = None
+
+def get_job_store() -> JobStore:
+    """Return the shared JobStore writing through the MySQL connection pool"""
+    global _job_store
+    if _job_store is None:
+        _job_store = JobStore(get_connection)
+    return _job_store
+
+
+class JobQueue:
+    """
+    Runs scrape jobs in the background with at most `workers` at once. Every poll (or right away
+    when a job is submitted or one finishes) it requeues stale jobs, heartbeats its own and claims
+    the oldest queued ones for its free workers; each job runs the insights pipeline and records
+    per-stage progress and the result in scrape_jobs.
+    """
+
+    def __init__(self, run: Optional[Callable[..., Awaitable]] = None, store: Optional[JobStore] = None,
+                 workers: Optional[int] = None, poll_interval: Optional[float] = None,
+                 heartbeat: Optional[float] = None, stale_after: Optional[float] = None,
+                 max_attempts: Optional[int] = None, retention: Optional[float] = None):
+        self._run = run or run_insights_pipeline
+        self._store = store
+        self.workers = config.JOB_WORKERS if workers is None else workers
+        self.poll_interval = poll_interval or config.JOB_POLL_INTERVAL
+        self.heartbeat_interval = heartbeat or config.JOB_HEARTBEAT
+        self.stale_after = stale_after or config.JOB_STALE_AFTER
+        self.max_attempts = max_attempts or config.JOB_MAX_ATTEMPTS
+        self.retention = retention or config.JOB_RETENTION
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._loop_task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._last_heartbeat = 0.0
+        self._last_purge = 0.0
+        self.completed = 0
+        self.failed = 0
+        self.requeued = 0
+
+    @property
+    def store(self) -> JobStore:
+        return self._store or get_job_store()
+
+    def _notify(self):
+        if self._wake is not None:
+            self._wake.set()
+
+    async def submit(self, store_url: str, llm_mode: Optional[str] = None) -> Tuple[str, bool]:
+        """Queue a job for a store; (job id, False) if one for the same store and llm mode is already pending"""
+        llm_mode = llm_mode or config.LLM_MODE
+        for _ in range(3):
+            job_id = await run_blocking(self.store.active, store_url, llm_mode)
+            if job_id is not None:
+                return job_id, False
+            # a concurrent submit can get in between; then create() loses and the winner is looked up
+            job_id = await run_blocking(self.store.create, store_url, llm_mode)
+            if job_id is not None:
+                self._notify()
+                return job_id, True
+        raise RuntimeError(f"Could not queue a job for {store_url}: its active_key is held by no active job")
+
+    async def _run_job(self, job_id: str, store_url: str, llm_mode: str):
+        progress = JobProgress()
+
+        async def on_stage(stage: str):
+            progress.start(stage)
+            await run_blocking(self.store.update_progress, job_id, progress.stages)
+
+        started = time.perf_counter()
+        try:
+            result = await self._run(store_url, llm_mode=llm_mode, on_stage=on_stage)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failed += 1
+            logger.warning("Job %s for %s failed: %s", job_id, store_url, e)
+            progress.finish(failed=True)
+            await run_blocking(self.store.finish, job_id, progress.stages, error=job_error(e))
+            return
+        progress.finish()
+        await run_blocking(self.store.finish, job_id, progress.stages, result=result)
+        self.completed += 1
+        logger.info("Job %s for %s done in %.1fs", job_id, store_url, time.perf_counter() - started)
+
+    def _job_done(self, job_id: str, task: asyncio.Task):
+        self._in_flight.pop(job_id, None)
+        if not task.cancelled() and task.exception() is not None:
+            # recording the outcome failed; the job is requeued once its heartbeat goes stale
+            logger.error("Job %s could not be recorded", job_id, exc_info=task.exception())
+        self._notify()
+
+    def _start_job(self, job_id: str, store_url: str, llm_mode: str):
+        task = asyncio.ensure_future(self._run_job(job_id, store_url, llm_mode))
+        self._in_flight[job_id] = task
+        task.add_done_callback(lambda t: self._job_done(job_id, t))
+
+    async def run_once(self) -> int:
+        """One poll: housekeeping, then claim queued jobs for the free workers; returns how many were started"""
+        store = self.store
+        now = time.monotonic()
+        if self._in_flight and now - self._last_heartbeat >= self.heartbeat_interval:
+            await run_blocking(store.heartbeat, list(self._in_flight))
+            self._last_heartbeat = now
+        requeued, failed = await run_blocking(store.requeue_stale, self.stale_after, self.max_attempts)
+        if requeued or failed:
+            self.requeued += requeued
+            logger.warning("Requeued %d interrupted jobs, failed %d", requeued, failed)
+        if now - self._last_purge >= 3600:
+            await run_blocking(store.purge, self.retention)
+            self._last_purge = now
+        free = self.workers - len(self._in_flight)
+        if free <= 0:
+            return 0
+        started = 0
+        for job_id, store_url, llm_mode in await run_blocking(store.queued, free):
+            if await run_blocking(store.claim, job_id):
+                if not self._in_flight:
+                    self._last_heartbeat = now
+                self._start_job(job_id, store_url, llm_mode)
+                started += 1
+        return started
+
+    async def run_forever(self):
+        self._wake = asyncio.Event()
+        while True:
+            self._wake.clear()
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Job queue poll failed")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        """Run the workers as tasks on the current event loop"""
+        if self._loop_task is None and self.workers > 0:
+            self._loop_task = asyncio.ensure_future(self.run_forever())
+
+    async def stop(self):
+        """Stop claiming jobs, cancel the running ones and put them back in the queue for the next process"""
+        tasks = list(self._in_flight.values())
+        interrupted = list(self._in_flight)
+        if self._loop_task is not None:
+            tasks.append(self._loop_task)
+            self._loop_task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if interrupted:
+            try:
+                await run_blocking(self.store.release, interrupted)
+            except Exception:
+                logger.exception("Could not requeue %d interrupted jobs", len(interrupted))
+
+    def stats(self) -> dict:
+        return {
+            'running': self._loop_task is not None,
+            'workers': self.workers,
+            'in_flight': len(self._in_flight),
+            'completed': self.completed,
+            'failed': self.failed,
+            'requeued': self.requeued,
+        }
+
+
+_job_queue: Optional[JobQueue] = None
+
+def get_job_queue() -> JobQueue:
+    """Return the process-wide job queue (running jobs only once start() is called)"""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue()
+    return _job_queue
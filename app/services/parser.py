@@ -0,0 +1,228 @@
+
+import sys
+import os
+for _path in (os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils'),):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+import threading
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+from helpers import clean_text
+
+# Top-level blocks are located by class / tag lookups during a single walk over the tree;
+# the compiled XPaths only run inside the (small) blocks that walk found. lxml and the XPaths
+# are loaded once, on the first parse (_compile), so a cold start doesn't pay for them.
+
+# Hero product containers, in the priority order the results are reported in
+HERO_CLASSES = ('hero__product', 'featured-product', 'product-slider__slide')
+HERO_SECTION_TYPE = 'featured-product'
+ADDRESS_CLASSES = frozenset(('footer-address', 'contact-address'))
+FAQ_ITEM_CLASSES = frozenset(('faq-item', 'accordion__item'))
+ABOUT_CLASSES = frozenset(('about-content', 'about', 'about-us', 'rte', 'page-content'))
+FAQ_HEADINGS = frozenset(('h3', 'h4'))
+# Main-content containers, best first: Shopify's policy body, <main> / #MainContent, <article>
+POLICY_BODY_CLASS = 'shopify-policy__body'
+MAIN_CONTENT_ID = 'MainContent'
+
+SOCIAL_PLATFORMS = {
+    'facebook.com': 'facebook',
+    'twitter.com': 'twitter',
+    'instagram.com': 'instagram',
+    'pinterest.com': 'pinterest',
+    'tiktok.com': 'tiktok',
+    'youtube.com': 'youtube'
+}
+
+def _has_class(*classes: str) -> str:
+    return ' or '.join(f"contains(concat(' ', normalize-space(@class), ' '), ' {c} ')" for c in classes)
+
+etree = lxml_html = None
+_HERO_TITLE = _HERO_PRICE = _FAQ_QUESTION = _FAQ_ANSWER = None
+_FIRST_LINK = _FIRST_IMAGE = _LINKS = _TEXT = _CONTENT_TEXT = None
+_compiled = False
+_compile_lock = threading.Lock()
+
+def _compile():
+    """Import lxml and compile the XPaths, once per process"""
+    global etree, lxml_html, _HERO_TITLE, _HERO_PRICE, _FAQ_QUESTION, _FAQ_ANSWER
+    global _FIRST_LINK, _FIRST_IMAGE, _LINKS, _TEXT, _CONTENT_TEXT, _compiled
+    with _compile_lock:
+        if _compiled:
+            return
+        from lxml import etree, html as lxml_html
+        _HERO_TITLE = etree.XPath(f".//*[{_has_class('product-title', 'product__title')}]")
+        _HERO_PRICE = etree.XPath(f".//*[{_has_class('product-price', 'price__regular')}]")
+        _FAQ_QUESTION = etree.XPath(f".//*[{_has_class('faq-question', 'accordion__title')}]")
+        _FAQ_ANSWER = etree.XPath(f".//*[{_has_class('faq-answer', 'accordion__content')}]")
+        _FIRST_LINK = etree.XPath(".//a[@href][1]")
+        _FIRST_IMAGE = etree.XPath(".//img[@src][1]")
+        _LINKS = etree.XPath(".//a[@href]")
+        # text() nodes only, so comments are skipped just like BeautifulSoup's get_text()
+        _TEXT = etree.XPath(".//text()")
+        # Readable text of a content block: no scripts, styles or site chrome
+        _CONTENT_TEXT = etree.XPath(
+            ".//text()[not(ancestor::script or ancestor::style or ancestor::noscript or ancestor::template"
+            " or ancestor::header or ancestor::nav or ancestor::footer)]"
+        )
+        _compiled = True
+
+def _text(element) -> str:
+    return ''.join(_TEXT(element))
+
+def _text_strip(element) -> str:
+    # BeautifulSoup get_text(strip=True): every string stripped, empties dropped, no separator
+    return ''.join(s.strip() for s in _TEXT(element) if s.strip())
+
+
+class PageExtract:
+    """Everything the scraper needs from one HTML page, pulled out in a single pass"""
+    __slots__ = ('text', 'hero_products', 'addresses', 'faqs', 'about_brand',
+                 'important_links', 'social_links', 'main_content', 'url')
+
+    def __init__(self, url: str = ""):
+        self.url = url
+        self.text = ""
+        self.hero_products: List[Dict[str, Optional[str]]] = []
+        self.addresses: List[str] = []
+        self.faqs: List[Tuple[str, str]] = []
+        self.about_brand = ""
+        self.important_links: Dict[str, str] = {}
+        self.social_links: List[Tuple[str, str]] = []
+        self.main_content = ""
+
+
+def _image_url(element, base_url: str) -> Optional[str]:
+    images = _FIRST_IMAGE(element)
+    if not images:
+        return None
+    src = images[0].get('src')
+    if src.startswith('//'):
+        return f"https:{src}"
+    elif not src.startswith('http'):
+        return urljoin(base_url, src)
+    return src
+
+def _hero_product(element, base_url: str) -> Optional[Dict[str, Optional[str]]]:
+    titles, prices, links = _HERO_TITLE(element), _HERO_PRICE(element), _FIRST_LINK(element)
+    if not titles or not prices or not links:
+        return None
+    url = links[0].get('href')
+    if not url.startswith('http'):
+        url = urljoin(base_url, url)
+    return {
+        'title': _text_strip(titles[0]),
+        'price': _text_strip(prices[0]),
+        'url': url,
+        'image_url': _image_url(element, base_url)
+    }
+
+def _heading_faq(heading) -> Optional[Tuple[str, str]]:
+    question = _text_strip(heading)
+    answer = []
+    for sibling in heading.itersiblings():
+        if sibling.tag in FAQ_HEADINGS:
+            break
+        if sibling.tag == 'p':
+            answer.append(_text_strip(sibling))
+    if question and answer:
+        return question, ' '.join(answer)
+    return None
+
+def parse_page(content, base_url: str) -> PageExtract:
+    """Parse HTML (bytes or str) with lxml and extract every field in one walk over the tree"""
+    page = PageExtract(base_url)
+    if not content:
+        return page
+    if not _compiled:
+        _compile()
+    try:
+        root = lxml_html.document_fromstring(content)
+    except (etree.ParserError, ValueError):
+        return page
+
+    heroes: Dict[str, list] = {cls: [] for cls in HERO_CLASSES}
+    hero_sections, addresses, faq_items, about_blocks, headings, anchors = [], [], [], [], [], []
+    footer = None
+    # first policy body, first <main>-like container and first <article>
+    main_blocks = [None, None, None]
+
+    for element in root.iter():
+        tag = element.tag
+        if not isinstance(tag, str):
+            continue  # comments and processing instructions
+        classes = element.get('class')
+        classes = classes.split() if classes else ()
+        if tag == 'a':
+            if element.get('href') is not None:
+                anchors.append(element)
+        elif tag in FAQ_HEADINGS:
+            headings.append(element)
+        elif tag == 'footer' and footer is None:
+            footer = element
+        elif tag == 'section' and element.get('data-section-type') == HERO_SECTION_TYPE:
+            hero_sections.append(element)
+        elif tag == 'article' and main_blocks[2] is None:
+            main_blocks[2] = element
+        if main_blocks[1] is None and (
+                tag == 'main' or element.get('role') == 'main' or element.get('id') == MAIN_CONTENT_ID):
+            main_blocks[1] = element
+        if tag == 'address' or not ADDRESS_CLASSES.isdisjoint(classes):
+            addresses.append(element)
+        if not classes:
+            continue
+        for cls in classes:
+            if cls in heroes:
+                heroes[cls].append(element)
+        if main_blocks[0] is None and POLICY_BODY_CLASS in classes:
+            main_blocks[0] = element
+        if not FAQ_ITEM_CLASSES.isdisjoint(classes):
+            faq_items.append(element)
+        if not ABOUT_CLASSES.isdisjoint(classes):
+            about_blocks.append(element)
+
+    page.text = _text(root)
+    main = next((block for block in main_blocks if block is not None), None)
+    if main is None:
+        main = root.find('body')
+    if main is not None:
+        page.main_content = clean_text(''.join(_CONTENT_TEXT(main)))
+    # Hero products, grouped by selector like the original select() loop
+    for elements in [*heroes.values(), hero_sections]:
+        for element in elements:
+            product = _hero_product(element, base_url)
+            if product:
+                page.hero_products.append(product)
+    for element in addresses:
+        address = clean_text(_text(element))
+        if address and len(address.split()) > 3:
+            page.addresses.append(address)
+    for item in faq_items:
+        questions, answers = _FAQ_QUESTION(item), _FAQ_ANSWER(item)
+        if questions and answers:
+            page.faqs.append((_text_strip(questions[0]), _text_strip(answers[0])))
+    for heading in headings:
+        faq = _heading_faq(heading)
+        if faq:
+            page.faqs.append(faq)
+    for block in about_blocks:
+        text_block = clean_text(_text(block))
+        if text_block and len(text_block.split()) > 10:
+            page.about_brand = text_block
+            break
+    for anchor in anchors:
+        href = anchor.get('href').lower()
+        for domain, platform in SOCIAL_PLATFORMS.items():
+            if domain in href:
+                page.social_links.append((platform, href))
+                break
+    if footer is not None:
+        # Important links: collect all footer links, only http/https
+        for anchor in _LINKS(footer):
+            text_link = clean_text(_text(anchor))
+            if text_link and len(text_link) > 2:
+                href = anchor.get('href')
+                if not href.startswith('http'):
+                    # skip mailto:, tel:, javascript:, etc.
+                    continue
+                page.important_links[text_link.lower().replace(' ', '_')] = href
+    return page
@@ -0,0 +1,134 @@
+
+import sys
+import os
+for _path in (os.path.dirname(os.path.dirname(__file__)),
+              os.path.join(os.path.dirname(os.path.dirname(__file__)), 'llm'),
+              os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models'),
+              os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils')):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Optional
+from pydantic import ValidationError
+from scraper import AsyncShopifyScraper
+from structurizer import astructurize_website_data
+from db_insert import ainsert_brand_insights
+from storage import response_cache
+from records import normalize_url
+from concurrency import SingleFlight, run_blocking
+from metrics import track
+import config
+
+# One scrape per (store, llm mode) at a time; concurrent requests share its result
+pipeline_flights = SingleFlight()
+
+# Awaited with the name of each pipeline stage (scrape, llm, persist) as it starts
+StageCallback = Callable[[str], Awaitable[None]]
+
+def _flight_key(website_url: str, llm_mode: Optional[str]) -> tuple:
+    try:
+        store_url = normalize_url(website_url)
+    except ValidationError:
+        store_url = website_url  # the scrape itself reports the bad URL
+    return store_url, llm_mode or config.LLM_MODE
+
+async def run_insights_pipeline(website_url: str, llm_mode: Optional[str] = None,
+                                on_stage: Optional[StageCallback] = None) -> dict:
+    """
+    Scrape a store, structure the result with the LLM and persist it.
+    Concurrent calls for the same store and llm mode are coalesced into one run, except calls
+    following its progress through `on_stage`, which get a run of their own.
+    """
+    if on_stage is not None:
+        return await _run_pipeline(website_url, llm_mode, on_stage)
+    return await pipeline_flights.do(_flight_key(website_url, llm_mode), _run_pipeline, website_url, llm_mode)
+
+async def _run_pipeline(website_url: str, llm_mode: Optional[str] = None,
+                        on_stage: Optional[StageCallback] = None) -> dict:
+    """The pipeline proper; per-stage latency is reported under metadata.timings_ms"""
+    async def starting(stage: str):
+        if on_stage is not None:
+            await on_stage(stage)
+
+    timings = {}
+    with track('pipeline') as total:
+        scraper = AsyncShopifyScraper(website_url)
+        # The scrape travels as unvalidated records; this is the API boundary, where it is checked
+        # against BrandInsights once (the LLM and the writer keep using the record)
+        await starting('scrape')
+        with track('scrape') as stage:
+            insights = await scraper.scrape()
+            with track('validate'):
+                await run_blocking(scraper.validate, insights)
+        timings['scrape'] = stage.ms
+        # Use LLM to structure the insights
+        await starting('llm')
+        with track('structurize') as stage:
+            structured = await astructurize_website_data(insights, mode=llm_mode)
+        timings['llm'] = stage.ms
+        # Store in MySQL
+        db_changes = None
+        if config.PERSIST_INSIGHTS:
+            await starting('persist')
+            with track('persist') as stage:
+                db_changes = await ainsert_brand_insights(structured)
+            timings['persist'] = stage.ms
+            # stored-insights responses for this store are out of date now
+            response_cache.invalidate(structured.get('store_url'))
+    timings['total'] = total.ms
+    metadata = structured.setdefault('metadata', {})
+    metadata['timings_ms'] = timings
+    metadata['db_changes'] = db_changes
+    return structured
+
+async def _close_catalog(pages: AsyncIterator, pending: asyncio.Future):
+    # the generator can only be closed once the task reading from it has stopped
+    pending.cancel()
+    await asyncio.wait([pending])
+    await pages.aclose()
+
+async def stream_insights_pipeline(website_url: str, llm_mode: Optional[str] = None) -> AsyncIterator[dict]:
+    """
+    Streaming variant for very large catalogs. Yields the brand metadata first (everything but
+    the catalog), then the catalog one /products.json page at a time as the crawl returns it,
+    then a summary. Only the pages in flight are ever held in memory, so the result is not
+    persisted (the writer needs the whole catalog) and only llm=partial structuring applies.
+    """
+    mode = 'off' if (llm_mode or config.LLM_MODE) == 'off' else 'partial'
+    timings = {}
+    with track('stream_metadata') as stage:
+        scraper = AsyncShopifyScraper(website_url)
+        pages = scraper.iter_product_pages()
+        # start on the catalog now, so its first page downloads alongside the homepage and secondary pages
+        first_page = asyncio.ensure_future(anext(pages, None))
+        try:
+            record = await scraper.scrape_site()
+            await run_blocking(scraper.validate, record)
+            metadata = await astructurize_website_data(record, mode=mode)
+        except BaseException:
+            await _close_catalog(pages, first_page)
+            raise
+    timings['metadata'] = stage.ms
+    metadata.pop('product_catalog', None)
+    product_count = 0
+    with track('stream_products') as stage:
+        try:
+            yield {'type': 'metadata', 'data': metadata}
+            products = await first_page
+            while products:
+                await run_blocking(scraper.validate_products, products)
+                product_count += len(products)
+                yield {'type': 'products', 'data': [p.to_dict() for p in products]}
+                products = await anext(pages, None)
+        finally:
+            await _close_catalog(pages, first_page)
+    timings['products'] = stage.ms
+    yield {
+        'type': 'end',
+        'product_count': product_count,
+        'metadata': {
+            'fetch_count': scraper.fetch_count,
+            'not_modified_count': scraper.not_modified_count,
+            'timings_ms': timings,
+        },
+    }
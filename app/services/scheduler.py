@@ -0,0 +1,155 @@
+
+import sys
+import os
+for _path in (os.path.dirname(os.path.dirname(__file__)),
+              os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils')):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+import asyncio
+import logging
+import time
+import zlib
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from concurrency import run_blocking
+from pipeline import run_insights_pipeline
+from storage import InsightsStore, age_seconds, get_store
+import config
+
+logger = logging.getLogger(__name__)
+
+def _jitter(store_url: str, extracted_at: Optional[datetime]) -> float:
+    """
+    Deterministic factor in [-1, 1) per store and scrape, so stores scraped together drift
+    apart and a store doesn't flip between due and not due from one poll to the next.
+    """
+    seed = f"{store_url}|{extracted_at.isoformat() if extracted_at else ''}".encode('utf-8')
+    return zlib.crc32(seed) / 2**31 - 1
+
+
+class RefreshScheduler:
+    """
+    Keeps stored insights fresh in the background. Every poll it reads the known stores from
+    brand_insights, picks the ones past their (jittered) refresh interval, most overdue first,
+    and re-runs the pipeline for them with at most `concurrency` refreshes at once.
+    API handlers call request_refresh() to revalidate a stale store without waiting for it.
+    """
+
+    def __init__(self, refresh: Optional[Callable[..., Awaitable]] = None, store: Optional[InsightsStore] = None,
+                 concurrency: Optional[int] = None, poll_interval: Optional[float] = None,
+                 default_interval: Optional[float] = None, jitter: Optional[float] = None,
+                 llm_mode: Optional[str] = None):
+        self._refresh = refresh or run_insights_pipeline
+        self._store = store
+        self.concurrency = concurrency or config.REFRESH_CONCURRENCY
+        self.poll_interval = poll_interval or config.REFRESH_POLL_INTERVAL
+        self.default_interval = default_interval or config.REFRESH_INTERVAL
+        self.jitter = config.REFRESH_JITTER if jitter is None else jitter
+        self.llm_mode = llm_mode or config.REFRESH_LLM_MODE
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._loop_task: Optional[asyncio.Task] = None
+        self.completed = 0
+        self.failed = 0
+        self.last_poll: Optional[float] = None
+
+    @property
+    def store(self) -> InsightsStore:
+        return self._store or get_store()
+
+    async def _run_refresh(self, store_url: str):
+        async with self._slots:
+            started = time.perf_counter()
+            try:
+                await self._refresh(store_url, llm_mode=self.llm_mode)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.failed += 1
+                logger.exception("Background refresh of %s failed", store_url)
+                return
+            self.completed += 1
+            logger.info("Refreshed %s in %.1fs", store_url, time.perf_counter() - started)
+
+    def request_refresh(self, store_url: str) -> bool:
+        """Refresh a store in the background unless it is already being refreshed; True if one was started"""
+        if store_url in self._in_flight:
+            return False
+        task = asyncio.ensure_future(self._run_refresh(store_url))
+        self._in_flight[store_url] = task
+        task.add_done_callback(lambda _: self._in_flight.pop(store_url, None))
+        return True
+
+    def due_stores(self, states: List[Tuple[str, Optional[datetime], Optional[int]]]) -> List[str]:
+        """Stores past their jittered interval, most overdue (relative to their interval) first"""
+        due = []
+        for store_url, extracted_at, interval in states:
+            interval = float(interval or self.default_interval)
+            age = age_seconds(extracted_at)
+            if age is None:
+                due.append((float('inf'), store_url))  # never scraped successfully
+                continue
+            threshold = interval * (1 + self.jitter * _jitter(store_url, extracted_at))
+            if age >= threshold:
+                due.append((age / threshold, store_url))
+        due.sort(reverse=True)
+        return [store_url for _, store_url in due]
+
+    async def run_once(self) -> int:
+        """One poll: start refreshes for as many due stores as there are free slots; returns how many"""
+        self.last_poll = time.time()
+        states = await run_blocking(self.store.refresh_states)
+        free = self.concurrency - len(self._in_flight)
+        started = 0
+        for store_url in self.due_stores(states):
+            if started >= free:
+                break  # the rest are picked up by a later poll, still in staleness order
+            if self.request_refresh(store_url):
+                started += 1
+        return started
+
+    async def run_forever(self):
+        while True:
+            try:
+                started = await self.run_once()
+                if started:
+                    logger.info("Scheduled %d store refreshes", started)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Refresh scheduler poll failed")
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        """Run the polling loop as a task on the current event loop"""
+        if self._loop_task is None:
+            self._loop_task = asyncio.ensure_future(self.run_forever())
+
+    async def stop(self):
+        """Stop polling and cancel the refreshes still running"""
+        tasks = list(self._in_flight.values())
+        if self._loop_task is not None:
+            tasks.append(self._loop_task)
+            self._loop_task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            'running': self._loop_task is not None,
+            'in_flight': len(self._in_flight),
+            'completed': self.completed,
+            'failed': self.failed,
+            'last_poll': self.last_poll,
+        }
+
+
+_scheduler: Optional[RefreshScheduler] = None
+
+def get_scheduler() -> RefreshScheduler:
+    """Return the process-wide scheduler (polling only once start() is called)"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = RefreshScheduler()
+    return _scheduler
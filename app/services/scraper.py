@@ -1,57 +1,267 @@
 
 import sys
 import os
-sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models'))
-sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils'))
+for _path in (os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models'),
+              os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils'),
+              os.path.dirname(os.path.dirname(__file__))):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+import asyncio
+import itertools
 import json
 import re
-from typing import Optional, Dict, List
+import socket
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Optional, Dict, List, Iterator, AsyncIterator, Tuple
+import httpx
 import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlparse
 from datetime import datetime
-from schemas import BrandInsights, Product, FAQItem, SocialHandle, ContactInfo
-from exceptions import WebsiteNotFoundError, ScrapingError
-from helpers import clean_text, extract_emails, extract_phone_numbers
+from pydantic import ValidationError
+from schemas import BrandInsights, Product
+from records import (InsightsRecord, ProductRecord, FAQRecord, SocialRecord, ContactRecord,
+                     normalize_url, validate_products)
+from exceptions import WebsiteNotFoundError, ScrapingError, HostUnavailableError
+from helpers import clean_text
+from contacts import country_code_for, mine_contacts
+from parser import PageExtract, parse_page
+from concurrency import run_blocking
+from metrics import track, FETCHED_BYTES, ITEMS
+from http_client import get_async_client, get_session
+from http_cache import HttpCache, get_http_cache
+from host_policy import RETRY_STATUSES, host_policies, retry_delay
+import config
+
+# Secondary pages: the standard Shopify path for each insight field they fill
+SECONDARY_PATHS = {
+    'privacy_policy': '/policies/privacy-policy',
+    'return_refund_policy': '/policies/refund-policy',
+    'faqs': '/pages/faq',
+    'about_brand': '/pages/about',
+    'contact_info': '/pages/contact',
+}
+# Same-site footer links whose label or URL contains one of these are candidates for the field too
+SECONDARY_KEYWORDS = {
+    'privacy_policy': ('privacy',),
+    'return_refund_policy': ('refund', 'return'),
+    'faqs': ('faq', 'frequently'),
+    'about_brand': ('about', 'our-story', 'our_story'),
+    'contact_info': ('contact',),
+}
+
+def _site(url: str) -> str:
+    host = urlparse(url).netloc.lower()
+    return host[4:] if host.startswith('www.') else host
+
+def _secondary_urls(candidates: Dict[str, List[str]]) -> List[str]:
+    """Every candidate once, standard paths first, capped at SECONDARY_MAX_PAGES"""
+    ordered = [urls[0] for urls in candidates.values()]
+    ordered += [url for urls in candidates.values() for url in urls[1:]]
+    return list(dict.fromkeys(ordered))[:config.SECONDARY_MAX_PAGES]
+
+def _parse(body: bytes, url: str) -> PageExtract:
+    FETCHED_BYTES.inc(len(body), kind='html')
+    with track('parse_html'):
+        return parse_page(body, url)
+
+def _unresolvable(e: BaseException) -> bool:
+    """The host name doesn't resolve: the store doesn't exist, however often it is retried"""
+    while e is not None:
+        if isinstance(e, socket.gaierror):
+            return True
+        e = e.__cause__ or e.__context__
+    return False
+
+def _transient(e: Exception) -> bool:
+    """Throttling, server errors and unreachable hosts that outlasted the retries, as opposed to a missing page"""
+    if isinstance(e, (HostUnavailableError, httpx.TransportError,
+                      requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return not _unresolvable(e)
+    response = getattr(e, 'response', None)
+    return response is not None and response.status_code in RETRY_STATUSES
+
+def _unavailable(e: Exception, url: str, what: str) -> HostUnavailableError:
+    """A transient failure as HostUnavailableError, with the host's pause or open circuit as the retry hint"""
+    if isinstance(e, HostUnavailableError):
+        return e
+    return HostUnavailableError(f"{what} unavailable: {str(e)}", retry_after=host_policies.get(url).retry_after() or None)
+
+def _has_content(field: str, page: Optional[PageExtract]) -> bool:
+    if page is None:
+        return False
+    if field == 'faqs':
+        return bool(page.faqs)
+    return bool(page.main_content)
 
 class ShopifyScraper:
     def __init__(self, website_url: str):
         self.base_url = website_url
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
-        
-    def fetch_website_content(self, url_suffix: str = "") -> Optional[BeautifulSoup]:
+        self.session = get_session()
+        self.http_cache = get_http_cache()
+        # Per-scrape page cache: every URL is fetched and parsed at most once
+        self._pages: Dict[str, PageExtract] = {}
+        # Network requests issued by this scraper, for spotting refetch regressions
+        self.fetch_count = 0
+        # Requests answered 304 Not Modified from the HTTP cache
+        self.not_modified_count = 0
+
+    def _get(self, url: str, params: Optional[Dict] = None, timeout: Optional[float] = None,
+             retries: Optional[int] = None) -> bytes:
+        """
+        GET through the HTTP cache: send stored validators and reuse the cached body on 304.
+        Requests are paced per host and transient failures retried (see host_policy).
+        """
+        key = HttpCache.key_for(url, params)
+        cached = self.http_cache.get(key) if self.http_cache else None
+        headers = cached.conditional_headers() if cached else {}
+        policy = host_policies.get(url)
+        for attempt in itertools.count():
+            time.sleep(policy.acquire())
+            self.fetch_count += 1
+            try:
+                response = self.session.get(url, params=params, headers=headers, timeout=timeout or config.HTTP_TIMEOUT)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if _unresolvable(e):
+                    raise  # nothing to retry, and no reason to count it against the host
+                delay = retry_delay(policy, attempt, retries,
+                                    connect_error=isinstance(e, requests.exceptions.ConnectionError))
+                if delay is None:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    policy.record_success()
+                    break
+                delay = retry_delay(policy, attempt, retries, response)
+                if delay is None:
+                    break
+            time.sleep(delay)
+        if response.status_code == 304 and cached:
+            self.not_modified_count += 1
+            self.http_cache.touch(key, response.headers)
+            return cached.body
+        response.raise_for_status()
+        if self.http_cache:
+            self.http_cache.put(key, response.url, response.headers, response.content)
+        return response.content
+
+    def fetch_website_content(self, url_suffix: str = "") -> Optional[PageExtract]:
+        url = urljoin(self.base_url, url_suffix)
+        if url in self._pages:
+            return self._pages[url]
         try:
-            url = urljoin(self.base_url, url_suffix)
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            return BeautifulSoup(response.text, 'html.parser')
-        except requests.exceptions.RequestException as e:
+            with track('fetch_html'):
+                body = self._get(url)
+        except (requests.exceptions.RequestException, HostUnavailableError) as e:
+            # a store that is down or throttling us exists; only a missing one is not found
+            if _transient(e):
+                raise _unavailable(e, url, "Website")
             raise WebsiteNotFoundError(f"Failed to fetch website: {str(e)}")
+        page = _parse(body, url)
+        self._pages[url] = page
+        return page
 
-    def get_products_json(self) -> List[Dict]:
+    def _secondary_candidates(self, page: Optional[PageExtract]) -> Dict[str, List[str]]:
+        """Candidate URLs per field: the standard Shopify path, then matching same-site footer links"""
+        candidates = {field: [urljoin(self.base_url, path)] for field, path in SECONDARY_PATHS.items()}
+        site = _site(self.base_url)
+        for label, href in (page.important_links if page else {}).items():
+            if _site(href) != site:
+                continue
+            target = f"{label} {urlparse(href).path}".lower()
+            for field, keywords in SECONDARY_KEYWORDS.items():
+                if any(keyword in target for keyword in keywords):
+                    if href not in candidates[field]:
+                        candidates[field].append(href)
+                    break
+        return candidates
+
+    @staticmethod
+    def _pick_secondary(candidates: Dict[str, List[str]], pages: Dict[str, Optional[PageExtract]]) -> Dict[str, PageExtract]:
+        # first candidate per field that was fetched in time and actually has something to offer
+        picked = {}
+        for field, urls in candidates.items():
+            for url in urls:
+                if _has_content(field, pages.get(url)):
+                    picked[field] = pages[url]
+                    break
+        return picked
+
+    def _fetch_secondary(self, url: str) -> Optional[PageExtract]:
+        try:
+            with track('fetch_secondary'):
+                body = self._get(url, timeout=config.SECONDARY_PAGE_TIMEOUT, retries=0)
+        except (requests.exceptions.RequestException, HostUnavailableError):
+            # most stores don't have every page; a missing one just leaves its field empty
+            return None
+        return _parse(body, url)
+
+    def fetch_secondary_pages(self, page: Optional[PageExtract]) -> Dict[str, PageExtract]:
+        """
+        Fetch the policy, FAQ, about and contact pages concurrently, each with SECONDARY_PAGE_TIMEOUT.
+        Pages not back within SECONDARY_BUDGET are dropped. Returns the chosen page per insight field.
+        """
+        candidates = self._secondary_candidates(page)
+        urls = _secondary_urls(candidates)
+        if not urls:
+            return {}
+        pool = ThreadPoolExecutor(max_workers=len(urls), thread_name_prefix="secondary")
+        try:
+            futures = {url: pool.submit(self._fetch_secondary, url) for url in urls}
+            wait(futures.values(), timeout=config.SECONDARY_BUDGET)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        pages = {
+            url: future.result() for url, future in futures.items()
+            if future.done() and not future.cancelled() and future.exception() is None
+        }
+        return self._pick_secondary(candidates, pages)
+
+    def _products_params(self, page: int) -> Dict:
+        return {'limit': config.PRODUCTS_PAGE_LIMIT, 'page': page}
+
+    def get_products_json(self, page: int = 1) -> List[Dict]:
         try:
             products_url = urljoin(self.base_url, "/products.json")
-            response = self.session.get(products_url, timeout=10)
-            response.raise_for_status()
-            return response.json().get('products', [])
-        except (requests.exceptions.RequestException, json.JSONDecodeError):
+            with track('fetch_products'):
+                body = self._get(products_url, params=self._products_params(page))
+            FETCHED_BYTES.inc(len(body), kind='products')
+            return json.loads(body).get('products', [])
+        except (requests.exceptions.RequestException, HostUnavailableError, json.JSONDecodeError) as e:
+            # a store without /products.json has no catalog, but a throttled one would be cut short
+            if _transient(e):
+                raise _unavailable(e, self.base_url, f"Product catalog page {page}")
             return []
 
-    def extract_product_catalog(self) -> List[Product]:
-        products_data = self.get_products_json()
+    def iter_product_pages(self) -> Iterator[List[ProductRecord]]:
+        """Yield the catalog one /products.json page at a time, stopping after the first short page"""
+        for page in range(1, config.PRODUCTS_MAX_PAGES + 1):
+            products_data = self.get_products_json(page)
+            if not products_data:
+                return
+            yield self._build_products(products_data)
+            if len(products_data) < config.PRODUCTS_PAGE_LIMIT:
+                return
+
+    def extract_product_catalog(self) -> List[ProductRecord]:
         products = []
-        
+        for page_products in self.iter_product_pages():
+            products.extend(page_products)
+        return products
+
+    def _build_products(self, products_data: List[Dict]) -> List[ProductRecord]:
+        products = []
+        # handles are URL slugs, so one urljoin for the prefix covers every product
+        products_base = urljoin(self.base_url, "/products/")
         for product in products_data:
-            products.append(Product(
+            products.append(ProductRecord(
                 id=str(product.get('id', '')),
                 title=product.get('title', ''),
                 description=clean_text(product.get('body_html', '')),
                 price=self._get_product_price(product),
                 available=product.get('available', False),
-                url=urljoin(self.base_url, f"/products/{product.get('handle', '')}"),
+                url=products_base + (product.get('handle') or ''),
                 image_url=self._get_product_image(product)
             ))
         
@@ -69,155 +279,344 @@ class ShopifyScraper:
             return images[0].get('src')
         return None
 
-    def extract_hero_products(self) -> List[Product]:
-        soup = self.fetch_website_content()
-        if not soup:
+    def extract_hero_products(self) -> List[ProductRecord]:
+        return self._parse_hero_products(self.fetch_website_content())
+
+    def extract_contact_info(self) -> ContactRecord:
+        return self._parse_contact_info(self.fetch_website_content())
+
+    def extract_social_handles(self) -> List[SocialRecord]:
+        return self._parse_social_handles(self.fetch_website_content())
+
+    def extract_faqs(self) -> List[FAQRecord]:
+        return self._parse_faqs(self.fetch_website_content())
+
+    def extract_about_brand(self) -> str:
+        return self._parse_about_brand(self.fetch_website_content())
+
+    def extract_important_links(self) -> Dict[str, str]:
+        return self._parse_important_links(self.fetch_website_content())
+
+    def _parse_hero_products(self, page: Optional[PageExtract]) -> List[ProductRecord]:
+        if not page:
             return []
-            
-        hero_products = []
-        # Common patterns for hero products
-        selectors = [
-            '.hero__product', 
-            '.featured-product', 
-            '.product-slider__slide',
-            'section[data-section-type="featured-product"]'
+        return [
+            ProductRecord(
+                id='hero-' + re.sub(r'\W+', '-', hero['title'].lower()),
+                title=hero['title'],
+                description='',
+                price=hero['price'],
+                available=True,
+                url=hero['url'],
+                image_url=hero['image_url']
+            )
+            for hero in page.hero_products
         ]
-        
-        for selector in selectors:
-            elements = soup.select(selector)
-            for element in elements:
-                try:
-                    title = element.select_one('.product-title, .product__title').get_text(strip=True)
-                    price = element.select_one('.product-price, .price__regular').get_text(strip=True)
-                    url = element.find('a', href=True)['href']
-                    if not url.startswith('http'):
-                        url = urljoin(self.base_url, url)
-                    
-                    hero_products.append(Product(
-                        id='hero-' + re.sub(r'\W+', '-', title.lower()),
-                        title=title,
-                        description='',
-                        price=price,
-                        available=True,
-                        url=url,
-                        image_url=self._get_hero_product_image(element)
-                    ))
-                except (AttributeError, KeyError):
+
+    def _parse_contact_info(self, page: Optional[PageExtract], *more_pages: Optional[PageExtract]) -> ContactRecord:
+        # the same page can fill several secondary fields; mine each one once
+        pages = list({id(p): p for p in (page, *more_pages) if p}.values())
+        # Emails and phone numbers from every fetched page, normalized and deduplicated in one pass
+        emails, phone_numbers = mine_contacts((p.text for p in pages), country_code=country_code_for(self.base_url))
+        addresses = list(dict.fromkeys(address for p in pages for address in p.addresses))
+        return ContactRecord(emails=emails, phone_numbers=phone_numbers, addresses=addresses)
+
+    def _parse_social_handles(self, page: Optional[PageExtract]) -> List[SocialRecord]:
+        if not page:
+            return []
+        return [SocialRecord(platform=platform, url=href, handle=None) for platform, href in page.social_links]
+
+    def _parse_faqs(self, page: Optional[PageExtract], *more_pages: Optional[PageExtract]) -> List[FAQRecord]:
+        faqs, seen = [], set()
+        for p in (page, *more_pages):
+            if not p:
+                continue
+            for question, answer in p.faqs:
+                if question.lower() in seen:
                     continue
-        
-        return hero_products
-
-    def _get_hero_product_image(self, element) -> Optional[str]:
-        img = element.find('img', src=True)
-        if img:
-            src = img['src']
-            if src.startswith('//'):
-                return f"https:{src}"
-            elif not src.startswith('http'):
-                return urljoin(self.base_url, src)
-            return src
-        return None
+                seen.add(question.lower())
+                faqs.append(FAQRecord(question=question, answer=answer))
+        return faqs
 
+    def _parse_about_brand(self, page: Optional[PageExtract], about_page: Optional[PageExtract] = None) -> str:
+        # a dedicated about page beats whatever about-ish block the homepage has
+        if about_page:
+            return about_page.about_brand or about_page.main_content
+        return page.about_brand if page else ""
 
+    @staticmethod
+    def _parse_policy(page: Optional[PageExtract]) -> str:
+        return page.main_content if page else ""
 
-    def get_all_insights(self) -> BrandInsights:
+    def _parse_important_links(self, page: Optional[PageExtract]) -> Dict[str, str]:
+        return dict(page.important_links) if page else {}
+
+    def scrape(self) -> InsightsRecord:
+        """Scrape the store into an unvalidated InsightsRecord (the fast path the pipeline uses)"""
         try:
+            # Hero products, contacts, socials, FAQs, about text and footer links
+            # all read from the same cached homepage document; fetched first, so an
+            # unreachable store is reported as not found rather than as a failed crawl
+            page = self.fetch_website_content()
             product_catalog = self.extract_product_catalog()
-            hero_products = self.extract_hero_products()
-            # Scrape the main page for all info
-            soup = self.fetch_website_content()
-            text = soup.get_text() if soup else ""
-            # Extract emails and phone numbers from the main page
-            emails = list(set(extract_emails(text)))
-            phone_numbers = list(set(extract_phone_numbers(text)))
-            # Try to find addresses in the main page
-            addresses = []
-            if soup:
-                address_elements = soup.select('.footer-address, .contact-address, address')
-                for elem in address_elements:
-                    address = clean_text(elem.get_text())
-                    if address and len(address.split()) > 3:
-                        addresses.append(address)
-            # Extract social links from the main page
-            social_links = []
-            platforms = {
-                'facebook.com': 'facebook',
-                'twitter.com': 'twitter',
-                'instagram.com': 'instagram',
-                'pinterest.com': 'pinterest',
-                'tiktok.com': 'tiktok',
-                'youtube.com': 'youtube'
+            secondary = self.fetch_secondary_pages(page)
+            return self._build_insights(product_catalog, page, secondary)
+        except (WebsiteNotFoundError, HostUnavailableError):
+            raise
+        except Exception as e:
+            raise ScrapingError(f"Error while scraping website: {str(e)}")
+
+    @staticmethod
+    def validate(record: InsightsRecord) -> BrandInsights:
+        """The API-boundary check of a scrape against BrandInsights; a record that fails it is a ScrapingError"""
+        try:
+            return record.to_model()
+        except ValidationError as e:
+            raise ScrapingError(f"Error while scraping website: {str(e)}")
+
+    @staticmethod
+    def validate_products(products: List[ProductRecord]) -> List[Product]:
+        """validate() for one catalog page, for callers that stream the catalog"""
+        try:
+            return validate_products(products)
+        except ValidationError as e:
+            raise ScrapingError(f"Error while scraping website: {str(e)}")
+
+    def get_all_insights(self) -> BrandInsights:
+        return self.validate(self.scrape())
+
+    @staticmethod
+    def _extract(field: str, parse, *args):
+        with track(f'extract_{field}'):
+            return parse(*args)
+
+    @staticmethod
+    def _count_items(record: InsightsRecord):
+        for kind in ('product_catalog', 'hero_products', 'faqs', 'social_handles'):
+            ITEMS.inc(len(getattr(record, kind)), kind=kind)
+        ITEMS.inc(len(record.contact_info.emails), kind='emails')
+        ITEMS.inc(len(record.contact_info.phone_numbers), kind='phone_numbers')
+
+    def _build_insights(self, product_catalog: List[ProductRecord], page: Optional[PageExtract],
+                        secondary: Optional[Dict[str, PageExtract]] = None) -> InsightsRecord:
+        secondary = secondary or {}
+        extract = self._extract
+        record = InsightsRecord(
+            store_url=normalize_url(self.base_url),
+            product_catalog=product_catalog,
+            hero_products=extract('hero_products', self._parse_hero_products, page),
+            privacy_policy=extract('privacy_policy', self._parse_policy, secondary.get('privacy_policy')),
+            return_refund_policy=extract('return_refund_policy', self._parse_policy, secondary.get('return_refund_policy')),
+            faqs=extract('faqs', self._parse_faqs, page, secondary.get('faqs')),
+            social_handles=extract('social_handles', self._parse_social_handles, page),
+            contact_info=extract('contact_info', self._parse_contact_info, page, *secondary.values()),
+            about_brand=extract('about_brand', self._parse_about_brand, page, secondary.get('about_brand')),
+            important_links=extract('important_links', self._parse_important_links, page),
+            extracted_at=datetime.utcnow().isoformat(),
+            metadata={
+                'fetch_count': self.fetch_count,
+                'not_modified_count': self.not_modified_count,
+                'secondary_pages': {field: p.url for field, p in secondary.items()}
             }
-            if soup:
-                for a in soup.find_all('a', href=True):
-                    href = a['href'].lower()
-                    for domain, platform in platforms.items():
-                        if domain in href:
-                            social_links.append(SocialHandle(
-                                platform=platform,
-                                url=href,
-                                handle=None
-                            ))
-                            break
-            # Extract FAQs from the main page
-            faqs = []
-            if soup:
-                items = soup.select('.faq-item, .accordion__item')
-                for item in items:
-                    try:
-                        question = item.select_one('.faq-question, .accordion__title').get_text(strip=True)
-                        answer = item.select_one('.faq-answer, .accordion__content').get_text(strip=True)
-                        faqs.append(FAQItem(question=question, answer=answer))
-                    except AttributeError:
-                        continue
-                headings = soup.select('h3, h4')
-                for heading in headings:
-                    question = heading.get_text(strip=True)
-                    answer = []
-                    next_sib = heading.next_sibling
-                    while next_sib and getattr(next_sib, 'name', None) not in ['h3', 'h4']:
-                        if getattr(next_sib, 'name', None) == 'p':
-                            answer.append(next_sib.get_text(strip=True))
-                        next_sib = next_sib.next_sibling
-                    if question and answer:
-                        faqs.append(FAQItem(
-                            question=question,
-                            answer=' '.join(answer)
-                        ))
-            # About brand: try to get from main page content blocks
-            about_brand = ""
-            if soup:
-                about_blocks = soup.select('.about-content, .about, .about-us, .rte, .page-content')
-                for block in about_blocks:
-                    text_block = clean_text(block.get_text())
-                    if text_block and len(text_block.split()) > 10:
-                        about_brand = text_block
-                        break
-            # Important links: collect all footer links, only http/https
-            important_links = {}
-            if soup:
-                footer = soup.find('footer')
-                if footer:
-                    for a in footer.find_all('a', href=True):
-                        text_link = clean_text(a.get_text())
-                        if text_link and len(text_link) > 2:
-                            href = a['href']
-                            if not href.startswith('http') and not href.startswith('https'):
-                                # skip mailto:, tel:, javascript:, etc.
-                                continue
-                            important_links[text_link.lower().replace(' ', '_')] = href
-            return BrandInsights(
-                store_url=self.base_url,
-                product_catalog=product_catalog,
-                hero_products=hero_products,
-                privacy_policy="",  # Not scraping specific policy pages
-                return_refund_policy="",  # Not scraping specific policy pages
-                faqs=faqs,
-                social_handles=social_links,
-                contact_info=ContactInfo(emails=emails, phone_numbers=phone_numbers, addresses=addresses),
-                about_brand=about_brand,
-                important_links=important_links,
-                extracted_at=datetime.utcnow().isoformat()
+        )
+        self._count_items(record)
+        return record
+
+
+class AsyncShopifyScraper(ShopifyScraper):
+    """asyncio-native scraper: network I/O goes through the shared async client and
+    CPU-bound parsing runs on the bounded executor, so the event loop never blocks."""
+
+    def __init__(self, website_url: str, client: Optional[httpx.AsyncClient] = None):
+        self.base_url = website_url
+        self.client = client or get_async_client()
+        self.http_cache = get_http_cache()
+        # Concurrent callers for the same URL await one shared fetch-and-parse task
+        self._pages: Dict[str, asyncio.Task] = {}
+        self.fetch_count = 0
+        self.not_modified_count = 0
+
+    async def _get(self, url: str, params: Optional[Dict] = None, timeout: Optional[float] = None,
+                   retries: Optional[int] = None) -> bytes:
+        key = HttpCache.key_for(url, params)
+        cached = await run_blocking(self.http_cache.get, key) if self.http_cache else None
+        headers = cached.conditional_headers() if cached else {}
+        # httpx reads timeout=None as "no timeout", so only pass an explicit override
+        extra = {'timeout': timeout} if timeout else {}
+        policy = host_policies.get(url)
+        for attempt in itertools.count():
+            wait_for = policy.acquire()
+            if wait_for:
+                await asyncio.sleep(wait_for)
+            self.fetch_count += 1
+            try:
+                response = await self.client.get(url, params=params, headers=headers, **extra)
+            except httpx.TransportError as e:
+                if _unresolvable(e):
+                    raise
+                delay = retry_delay(policy, attempt, retries,
+                                    connect_error=isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout)))
+                if delay is None:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    policy.record_success()
+                    break
+                delay = retry_delay(policy, attempt, retries, response)
+                if delay is None:
+                    break
+            await asyncio.sleep(delay)
+        if response.status_code == 304 and cached:
+            self.not_modified_count += 1
+            await run_blocking(self.http_cache.touch, key, response.headers)
+            return cached.body
+        response.raise_for_status()
+        if self.http_cache:
+            await run_blocking(self.http_cache.put, key, str(response.url), response.headers, response.content)
+        return response.content
+
+    async def fetch_website_content(self, url_suffix: str = "") -> Optional[PageExtract]:
+        url = urljoin(self.base_url, url_suffix)
+        if url not in self._pages:
+            self._pages[url] = asyncio.ensure_future(self._fetch_and_parse(url))
+        return await self._pages[url]
+
+    async def _fetch_and_parse(self, url: str) -> PageExtract:
+        try:
+            with track('fetch_html'):
+                body = await self._get(url)
+        except (httpx.HTTPError, HostUnavailableError) as e:
+            if _transient(e):
+                raise _unavailable(e, url, "Website")
+            raise WebsiteNotFoundError(f"Failed to fetch website: {str(e)}")
+        return await run_blocking(_parse, body, url)
+
+    async def _fetch_secondary(self, url: str) -> Optional[PageExtract]:
+        try:
+            with track('fetch_secondary'):
+                body = await self._get(url, timeout=config.SECONDARY_PAGE_TIMEOUT, retries=0)
+        except (httpx.HTTPError, HostUnavailableError):
+            return None
+        return await run_blocking(_parse, body, url)
+
+    async def fetch_secondary_pages(self, page: Optional[PageExtract]) -> Dict[str, PageExtract]:
+        candidates = self._secondary_candidates(page)
+        tasks = {url: asyncio.ensure_future(self._fetch_secondary(url)) for url in _secondary_urls(candidates)}
+        try:
+            await asyncio.wait(tasks.values(), timeout=config.SECONDARY_BUDGET)
+        finally:
+            for task in tasks.values():
+                task.cancel()
+        pages = {
+            url: task.result() for url, task in tasks.items()
+            if task.done() and not task.cancelled() and task.exception() is None
+        }
+        return self._pick_secondary(candidates, pages)
+
+    async def fetch_site_pages(self) -> Tuple[Optional[PageExtract], Dict[str, PageExtract]]:
+        """The homepage and the secondary pages it links to: everything but the product catalog"""
+        # the secondary pages come from homepage footer links, so they follow the homepage
+        page = await self.fetch_website_content()
+        return page, await self.fetch_secondary_pages(page)
+
+    async def get_products_json(self, page: int = 1) -> List[Dict]:
+        try:
+            products_url = urljoin(self.base_url, "/products.json")
+            with track('fetch_products'):
+                body = await self._get(products_url, params=self._products_params(page))
+            FETCHED_BYTES.inc(len(body), kind='products')
+            return (await run_blocking(json.loads, body)).get('products', [])
+        except (httpx.HTTPError, HostUnavailableError, json.JSONDecodeError) as e:
+            if _transient(e):
+                raise _unavailable(e, self.base_url, f"Product catalog page {page}")
+            return []
+
+    async def _fetch_product_page(self, page: int) -> List[ProductRecord]:
+        products_data = await self.get_products_json(page)
+        return await run_blocking(self._build_products, products_data)
+
+    async def iter_product_pages(self, fanout: Optional[int] = None) -> AsyncIterator[List[ProductRecord]]:
+        """
+        Yield the catalog page by page, in order, keeping up to `fanout` page requests in flight.
+        Each page's JSON is turned into ProductRecords as soon as it arrives and then dropped,
+        so at most `fanout` pages are held in memory. A page with fewer than PRODUCTS_PAGE_LIMIT
+        products is the last one. Page 1 is fetched alone, so a store whose catalog fits on one
+        page costs a single request; the fan-out only starts once it came back full.
+        """
+        fanout = max(1, fanout or config.PRODUCTS_FANOUT)
+        in_flight = deque()
+        next_page = 1
+        window = 1
+        try:
+            while True:
+                while len(in_flight) < window and next_page <= config.PRODUCTS_MAX_PAGES:
+                    in_flight.append(asyncio.ensure_future(self._fetch_product_page(next_page)))
+                    next_page += 1
+                if not in_flight:
+                    return
+                page_products = await in_flight.popleft()
+                if not page_products:
+                    return
+                yield page_products
+                if len(page_products) < config.PRODUCTS_PAGE_LIMIT:
+                    return
+                window = fanout
+        finally:
+            for task in in_flight:
+                task.cancel()
+
+    async def extract_product_catalog(self) -> List[ProductRecord]:
+        products = []
+        async for page_products in self.iter_product_pages():
+            products.extend(page_products)
+        return products
+
+    async def extract_hero_products(self) -> List[ProductRecord]:
+        return await run_blocking(self._parse_hero_products, await self.fetch_website_content())
+
+    async def extract_contact_info(self) -> ContactRecord:
+        return await run_blocking(self._parse_contact_info, await self.fetch_website_content())
+
+    async def extract_social_handles(self) -> List[SocialRecord]:
+        return await run_blocking(self._parse_social_handles, await self.fetch_website_content())
+
+    async def extract_faqs(self) -> List[FAQRecord]:
+        return await run_blocking(self._parse_faqs, await self.fetch_website_content())
+
+    async def extract_about_brand(self) -> str:
+        return await run_blocking(self._parse_about_brand, await self.fetch_website_content())
+
+    async def extract_important_links(self) -> Dict[str, str]:
+        return await run_blocking(self._parse_important_links, await self.fetch_website_content())
+
+    async def scrape(self) -> InsightsRecord:
+        try:
+            # the secondary-page stage overlaps the catalog crawl instead of adding to it
+            catalog, site = await asyncio.gather(
+                self.extract_product_catalog(),
+                self.fetch_site_pages(),
+                return_exceptions=True
             )
+            # a missing or unavailable store fails both; the homepage error says which
+            for result in (site, catalog):
+                if isinstance(result, BaseException):
+                    raise result
+            product_catalog, (page, secondary) = catalog, site
+            return await run_blocking(self._build_insights, product_catalog, page, secondary)
+        except (WebsiteNotFoundError, HostUnavailableError):
+            raise
         except Exception as e:
-            raise ScrapingError(f"Error while scraping website: {str(e)}")
\ No newline at end of file
+            raise ScrapingError(f"Error while scraping website: {str(e)}")
+
+    async def scrape_site(self) -> InsightsRecord:
+        """scrape() without the product catalog, for callers that crawl it page by page themselves"""
+        try:
+            page, secondary = await self.fetch_site_pages()
+            return await run_blocking(self._build_insights, [], page, secondary)
+        except (WebsiteNotFoundError, HostUnavailableError):
+            raise
+        except Exception as e:
+            raise ScrapingError(f"Error while scraping website: {str(e)}")
+
+    async def get_all_insights(self) -> BrandInsights:
+        return await run_blocking(self.validate, await self.scrape())
@@ -0,0 +1,273 @@
+
+import sys
+import os
+for _path in (os.path.dirname(os.path.dirname(__file__)),
+              os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils')):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+import base64
+import json
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Iterator, List, Optional, Tuple
+from db_insert import get_connection, snapshot_time, PRODUCT_COLUMNS
+from ttl_cache import TTLCache
+import config
+
+# Rendered responses of the stored-insights endpoints, keyed (store_url, endpoint, params...)
+response_cache = TTLCache(config.RESPONSE_CACHE_TTL, config.RESPONSE_CACHE_MAX_ENTRIES)
+
+def _json(value):
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode('utf-8')
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+def _datetime(value) -> Optional[datetime]:
+    if value is None or isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+def age_seconds(extracted_at) -> Optional[float]:
+    """Seconds since a scrape, given its extracted_at (naive UTC datetime or ISO string, as the scraper writes it)"""
+    extracted_at = _datetime(extracted_at)
+    if extracted_at is None:
+        return None
+    return max((datetime.utcnow() - extracted_at).total_seconds(), 0.0)
+
+def encode_cursor(last_id: str) -> str:
+    return base64.urlsafe_b64encode(last_id.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: Optional[str]) -> str:
+    """Keyset position from an opaque cursor; raises ValueError if it was tampered with"""
+    if not cursor:
+        return ""
+    padded = cursor + '=' * (-len(cursor) % 4)
+    return base64.b64decode(padded.encode('ascii'), altchars=b'-_', validate=True).decode('utf-8')
+
+def encode_snapshot_cursor(captured_at, snapshot_id: int) -> str:
+    return encode_cursor(f"{snapshot_time(captured_at)}|{snapshot_id}")
+
+def decode_snapshot_cursor(cursor: Optional[str]) -> Optional[Tuple[str, int]]:
+    """(captured_at, id) keyset position of a snapshot page cursor; raises ValueError if it was tampered with"""
+    position = decode_cursor(cursor)
+    if not position:
+        return None
+    captured_at, snapshot_id = position.rsplit('|', 1)
+    return captured_at, int(snapshot_id)
+
+def _snapshot(captured_at, price, available) -> dict:
+    # a delisted product is recorded with neither price nor availability
+    return {
+        'captured_at': _datetime(captured_at).isoformat() if captured_at else None,
+        'price': price,
+        'available': None if available is None else bool(available),
+        'listed': price is not None or available is not None,
+    }
+
+def _product(row: tuple) -> dict:
+    product = dict(zip(PRODUCT_COLUMNS, row))
+    # available is stored as VARCHAR ('1'/'0' from the writer, 'True'/'False' from older rows)
+    product['available'] = str(product.get('available')).lower() in ('1', 'true')
+    return product
+
+
+class InsightsStore:
+    """
+    Read side of the tables BrandInsightsWriter fills. Like the writer it takes a `connect`
+    callable returning a DB-API connection, so it also runs against sqlite3 (placeholder='?',
+    dialect='sqlite'). Product pages use keyset pagination on (brand_id, id), which the
+    idx_products_brand index serves without scanning skipped rows.
+    """
+
+    def __init__(self, connect: Callable, placeholder: str = "%s", dialect: str = "mysql"):
+        self.connect = connect
+        self.placeholder = placeholder
+        self.dialect = dialect
+
+    @contextmanager
+    def _cursor(self):
+        cnx = self.connect()
+        cursor = cnx.cursor()
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+            cnx.close()
+
+    def _brand(self, cursor, store_url: str) -> Optional[tuple]:
+        cursor.execute(
+            "SELECT id, store_url, privacy_policy, return_refund_policy, about_brand, extracted_at, important_links"
+            f" FROM brand_insights WHERE store_url={self.placeholder}",
+            (store_url,)
+        )
+        return cursor.fetchone()
+
+    def brand_state(self, store_url: str) -> Optional[Tuple[int, Optional[datetime]]]:
+        """(brand_id, extracted_at) for a stored store, or None if it was never scraped"""
+        with self._cursor() as cursor:
+            cursor.execute(
+                f"SELECT id, extracted_at FROM brand_insights WHERE store_url={self.placeholder}", (store_url,)
+            )
+            row = cursor.fetchone()
+        return (row[0], _datetime(row[1])) if row else None
+
+    def refresh_states(self) -> List[Tuple[str, Optional[datetime], Optional[int]]]:
+        """(store_url, extracted_at, refresh_interval) for every known store, for the refresh scheduler"""
+        with self._cursor() as cursor:
+            cursor.execute("SELECT store_url, extracted_at, refresh_interval FROM brand_insights")
+            rows = cursor.fetchall()
+        return [(url, _datetime(extracted_at), interval) for url, extracted_at, interval in rows]
+
+    def get_insights(self, store_url: str) -> Optional[dict]:
+        """Everything stored for one store except the catalog itself, which is paginated separately"""
+        p = self.placeholder
+        with self._cursor() as cursor:
+            brand = self._brand(cursor, store_url)
+            if brand is None:
+                return None
+            brand_id = brand[0]
+            cursor.execute(f"SELECT {', '.join(PRODUCT_COLUMNS)} FROM hero_products WHERE brand_id={p} ORDER BY id", (brand_id,))
+            hero_products = [_product(row) for row in cursor.fetchall()]
+            cursor.execute(f"SELECT question, answer FROM faqs WHERE brand_id={p} ORDER BY id", (brand_id,))
+            faqs = [{'question': q, 'answer': a} for q, a in cursor.fetchall()]
+            cursor.execute(f"SELECT platform, url, handle FROM social_handles WHERE brand_id={p} ORDER BY id", (brand_id,))
+            social_handles = [{'platform': pl, 'url': u, 'handle': h} for pl, u, h in cursor.fetchall()]
+            cursor.execute(f"SELECT emails, phone_numbers, addresses FROM contact_info WHERE brand_id={p} LIMIT 1", (brand_id,))
+            contact = cursor.fetchone()
+            cursor.execute(f"SELECT COUNT(*) FROM products WHERE brand_id={p}", (brand_id,))
+            product_count = cursor.fetchone()[0]
+        extracted_at = _datetime(brand[5])
+        return {
+            'store_url': brand[1],
+            'privacy_policy': brand[2] or "",
+            'return_refund_policy': brand[3] or "",
+            'about_brand': brand[4] or "",
+            'important_links': _json(brand[6]) or {},
+            'hero_products': hero_products,
+            'faqs': faqs,
+            'social_handles': social_handles,
+            'contact_info': {
+                'emails': _json(contact[0]) or [],
+                'phone_numbers': _json(contact[1]) or [],
+                'addresses': _json(contact[2]) or []
+            } if contact else {'emails': [], 'phone_numbers': [], 'addresses': []},
+            'product_count': product_count,
+            'extracted_at': extracted_at.isoformat() if extracted_at else None,
+        }
+
+    def iter_product_texts(self, batch_size: int = 1000) -> Iterator[Tuple[str, str, str]]:
+        """(store_url, title, description) of every stored product, streamed in batches"""
+        with self._cursor() as cursor:
+            cursor.execute(
+                "SELECT b.store_url, p.title, p.description FROM products p"
+                " JOIN brand_insights b ON b.id = p.brand_id"
+            )
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield from rows
+
+    def _search_clause(self) -> str:
+        p = self.placeholder
+        if self.dialect == "sqlite":
+            return f" AND (title LIKE {p} OR description LIKE {p})"
+        # served by the ft_products_text FULLTEXT index
+        return f" AND MATCH(title, description) AGAINST ({p} IN NATURAL LANGUAGE MODE)"
+
+    def _search_params(self, query: str) -> tuple:
+        if self.dialect == "sqlite":
+            pattern = f"%{query}%"
+            return (pattern, pattern)
+        return (query,)
+
+    def list_products(self, brand_id: int, limit: int, after: str = "",
+                      query: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """
+        One page of a store's products in id order, starting after the keyset position `after`,
+        optionally filtered by a full-text `query`. Returns (products, next cursor or None).
+        """
+        p = self.placeholder
+        sql = f"SELECT {', '.join(PRODUCT_COLUMNS)} FROM products WHERE brand_id={p} AND id > {p}"
+        params: tuple = (brand_id, after)
+        if query:
+            sql += self._search_clause()
+            params += self._search_params(query)
+        # one extra row tells us whether there is a next page without a COUNT(*)
+        sql += f" ORDER BY id LIMIT {p}"
+        params += (limit + 1,)
+        with self._cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        products = [_product(row) for row in rows[:limit]]
+        next_cursor = encode_cursor(products[-1]['id']) if len(rows) > limit else None
+        return products, next_cursor
+
+    def _snapshot_page(self, sql: str, params: tuple, limit: int,
+                       after: Optional[Tuple[str, int]]) -> Tuple[List[tuple], Optional[str]]:
+        """
+        One page of product_snapshots rows in (captured_at, id) order. `sql` selects s.id and
+        s.captured_at first and ends in its WHERE clause; the keyset condition is appended to it.
+        """
+        p = self.placeholder
+        if after is not None:
+            sql += f" AND (s.captured_at > {p} OR (s.captured_at = {p} AND s.id > {p}))"
+            params += (after[0], after[0], after[1])
+        sql += f" ORDER BY s.captured_at, s.id LIMIT {p}"
+        params += (limit + 1,)
+        with self._cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        next_cursor = encode_snapshot_cursor(rows[limit - 1][1], rows[limit - 1][0]) if len(rows) > limit else None
+        return rows[:limit], next_cursor
+
+    def price_history(self, brand_id: int, product_id: str, limit: int, after: Optional[Tuple[str, int]] = None,
+                      since: Optional[datetime] = None) -> Tuple[List[dict], Optional[str]]:
+        """
+        A product's price and availability changes, oldest first, optionally from `since` on.
+        Served by idx_snapshots_product (brand_id, product_id, captured_at).
+        """
+        p = self.placeholder
+        sql = ("SELECT s.id, s.captured_at, s.price, s.available FROM product_snapshots s"
+               f" WHERE s.brand_id={p} AND s.product_id={p}")
+        params: tuple = (brand_id, product_id)
+        if since is not None:
+            sql += f" AND s.captured_at >= {p}"
+            params += (snapshot_time(since),)
+        rows, next_cursor = self._snapshot_page(sql, params, limit, after)
+        return [_snapshot(*row[1:]) for row in rows], next_cursor
+
+    def changes_since(self, since: datetime, limit: int,
+                      after: Optional[Tuple[str, int]] = None) -> Tuple[List[dict], Optional[str]]:
+        """
+        Price and availability changes of every store's products captured at or after `since`,
+        oldest first. A range scan of idx_snapshots_captured (InnoDB appends the primary key, so
+        it is also in keyset order), plus a primary key lookup of each row's store.
+        """
+        p = self.placeholder
+        sql = ("SELECT s.id, s.captured_at, s.price, s.available, b.store_url, s.product_id FROM product_snapshots s"
+               f" JOIN brand_insights b ON b.id = s.brand_id WHERE s.captured_at >= {p}")
+        rows, next_cursor = self._snapshot_page(sql, (snapshot_time(since),), limit, after)
+        changes = [
+            {'store_url': store_url, 'product_id': product_id, **_snapshot(captured_at, price, available)}
+            for _, captured_at, price, available, store_url, product_id in rows
+        ]
+        return changes, next_cursor
+
+
+_store: Optional[InsightsStore] = None
+
+def get_store() -> InsightsStore:
+    """Return the shared InsightsStore reading through the MySQL connection pool"""
+    global _store
+    if _store is None:
+        _store = InsightsStore(get_connection)
+    return _store
@@ -0,0 +1,87 @@
+
+import sys
+import os
+for _path in (os.path.dirname(os.path.dirname(__file__)),):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, Hashable, Optional
+import config
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+def get_executor() -> ThreadPoolExecutor:
+    """Return the process-wide bounded executor used for blocking work"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=config.BLOCKING_WORKERS, thread_name_prefix="blocking")
+    return _executor
+
+async def run_blocking(func: Callable, *args, **kwargs):
+    """Run a blocking callable on the bounded executor without stalling the event loop"""
+    loop = asyncio.get_running_loop()
+    # run_in_executor doesn't carry context variables over (e.g. the request's Server-Timing collector)
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(), functools.partial(context.run, func, *args, **kwargs))
+
+def shutdown_executor():
+    """Stop the bounded executor, waiting for queued work to finish"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+class HostLimiter:
+    """Caps concurrent work overall and per host; per-host slots are dropped once idle"""
+
+    def __init__(self, global_limit: int, per_host_limit: int):
+        self.per_host_limit = per_host_limit
+        self._global = asyncio.Semaphore(global_limit)
+        self._hosts: Dict[str, asyncio.Semaphore] = {}
+        self._users: Dict[str, int] = {}
+
+    @asynccontextmanager
+    async def limit(self, host: str):
+        semaphore = self._hosts.setdefault(host, asyncio.Semaphore(self.per_host_limit))
+        self._users[host] = self._users.get(host, 0) + 1
+        try:
+            async with semaphore:
+                async with self._global:
+                    yield
+        finally:
+            self._users[host] -= 1
+            if not self._users[host]:
+                del self._users[host]
+                del self._hosts[host]
+
+
+class SingleFlight:
+    """
+    Request coalescing: concurrent calls with the same key await one shared execution
+    instead of each running their own. The result object is shared, so treat it as read-only.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, func: Callable[..., Awaitable], *args, **kwargs):
+        task = self._calls.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            self.coalesced += 1
+        # shielded: one caller going away must not cancel the work the others are waiting on
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {'executions': self.executions, 'coalesced': self.coalesced, 'in_flight': len(self._calls)}
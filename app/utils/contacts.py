@@ -0,0 +1,146 @@
+
+import sys
+import os
+for _path in (os.path.dirname(os.path.dirname(__file__)),):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+import config
+
+# Patterns are compiled once. Emails are anchored on '@' (found with str.find, which is far
+# cheaper than letting a regex try every word): the local part is matched backwards from the
+# '@' and the domain forwards. A phone candidate is either '+'-prefixed or has a separator
+# after its first digit group, so bare digit runs (product ids, timestamps) never reach Python.
+EMAIL_LOCAL = re.compile(r"[A-Za-z0-9._%+-]{1,64}\Z")
+EMAIL_DOMAIN = re.compile(r"@([A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,})\b")
+PHONE_PATTERN = re.compile(
+    r"(?<![\w+])(?:\+\d[\d \t().-]{6,}\d|\(?\d+\)?[ \t.-]\(?\d[\d \t().-]{4,}\d)(?!\w)"
+)
+_NON_DIGITS = re.compile(r"\D")
+_DATE_LIKE = re.compile(r"\d{4}[./-]\d{1,2}[./-]\d{1,2}\b|\d{1,2}[./-]\d{1,2}[./-]\d{4}\b")
+# "logo@2x.png" and friends look like emails but are asset file names
+ASSET_SUFFIXES = ('.png', '.jpg', '.jpeg', '.gif', '.webp', '.svg', '.js', '.css')
+# Calling codes of country-code TLDs, for numbers a store writes without one. ccTLDs that are
+# mostly used as generic names (.co, .io, .me, .tv, .ai) are left out on purpose
+TLD_COUNTRY_CODES = {
+    'in': '91', 'uk': '44', 'us': '1', 'ca': '1', 'au': '61', 'nz': '64', 'ie': '353', 'de': '49',
+    'fr': '33', 'es': '34', 'it': '39', 'nl': '31', 'be': '32', 'ch': '41', 'at': '43', 'se': '46',
+    'no': '47', 'dk': '45', 'fi': '358', 'pl': '48', 'pt': '351', 'jp': '81', 'kr': '82', 'sg': '65',
+    'my': '60', 'ph': '63', 'id': '62', 'th': '66', 'ae': '971', 'sa': '966', 'za': '27', 'ng': '234',
+    'ke': '254', 'br': '55', 'mx': '52', 'ar': '54', 'cl': '56', 'pk': '92', 'bd': '880', 'lk': '94',
+    'np': '977', 'hk': '852', 'tw': '886', 'cn': '86', 'il': '972', 'tr': '90',
+}
+# Pages are joined with a character no pattern can match across
+PAGE_SEPARATOR = "\0"
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def normalize_email(email: str) -> Optional[str]:
+    email = email.strip().strip('.').lower()
+    if email.endswith(ASSET_SUFFIXES):
+        return None
+    return email
+
+def normalize_phone(phone: str, country_code: Optional[str] = None) -> Optional[str]:
+    """E.164 form of a phone candidate ('+919876543210'), or None if it doesn't look like a phone number.
+    Numbers written without a country code get `country_code` (default PHONE_DEFAULT_COUNTRY_CODE);
+    with no country known they are kept as national digits ('02079460958'), never given a guessed one."""
+    phone = phone.strip()
+    if _DATE_LIKE.match(phone):
+        return None
+    digits = _NON_DIGITS.sub('', phone)
+    if phone.startswith('+'):
+        pass
+    elif digits.startswith('00'):
+        digits = digits[2:]  # international call prefix
+    else:
+        # No country code written: needs at least a full national number, and separators,
+        # so bare digit runs (ids, timestamps, prices) are not taken for phones
+        if len(digits) < 10 or len(digits) == len(phone):
+            return None
+        national = digits[1:] if len(digits) == 11 and digits.startswith('0') else digits  # trunk prefix
+        if len(national) != 10:
+            # only '+' or '00' marks a number as international; longer runs are order numbers and the like
+            return None
+        country_code = config.PHONE_DEFAULT_COUNTRY_CODE if country_code is None else country_code
+        if not country_code:
+            return digits  # national number as written; no country to put in front of it
+        digits = country_code + national
+    if not 8 <= len(digits) <= 15:
+        return None
+    return '+' + digits
+
+def country_code_for(url: str) -> Optional[str]:
+    """Calling code implied by a store's country-code TLD ('shop.example.co.uk' -> '44'), or None"""
+    host = urlparse(url if '//' in url else f"//{url}").hostname or ''
+    return TLD_COUNTRY_CODES.get(host.rsplit('.', 1)[-1])
+
+def _scan_emails(text: str, found: dict):
+    at = text.find('@')
+    while at != -1:
+        domain = EMAIL_DOMAIN.match(text, at)
+        local = EMAIL_LOCAL.search(text, max(0, at - 64), at) if domain else None
+        if local:
+            email = normalize_email(f"{local.group()}@{domain.group(1)}")
+            if email:
+                found[email] = None
+        at = text.find('@', at + 1)
+
+def _scan(text: str, country_code: Optional[str]) -> Tuple[List[str], List[str]]:
+    emails, phones = {}, {}
+    _scan_emails(text, emails)
+    for match in PHONE_PATTERN.finditer(text):
+        phone = normalize_phone(match.group(), country_code)
+        if phone:
+            phones[phone] = None
+    return list(emails), list(phones)
+
+def _split(texts: Sequence[str], parts: int) -> List[str]:
+    """Group pages into `parts` batches of roughly equal size, keeping page order"""
+    target = sum(len(t) for t in texts) / parts
+    batches, batch, size = [], [], 0
+    for text in texts:
+        batch.append(text)
+        size += len(text)
+        if size >= target and len(batches) < parts - 1:
+            batches.append(PAGE_SEPARATOR.join(batch))
+            batch, size = [], 0
+    if batch:
+        batches.append(PAGE_SEPARATOR.join(batch))
+    return batches
+
+def get_process_pool(processes: int) -> ProcessPoolExecutor:
+    """Return the shared process pool for large mining jobs, creating it on first use"""
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=processes)
+    return _process_pool
+
+def shutdown_process_pool():
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=True)
+        _process_pool = None
+
+def mine_contacts(texts: Iterable[str], processes: Optional[int] = None,
+                  country_code: Optional[str] = None) -> Tuple[List[str], List[str]]:
+    """
+    Emails (lowercased) and E.164 phone numbers found in the given page texts, deduplicated in the
+    order they first appear. All pages are scanned in one batched pass; when `processes`
+    (default CONTACT_MINING_PROCESSES) is set and there are at least CONTACT_MINING_MIN_BYTES
+    of text, the batch is split across a process pool instead.
+    """
+    texts = [t for t in texts if t]
+    processes = config.CONTACT_MINING_PROCESSES if processes is None else processes
+    if processes > 1 and len(texts) > 1 and sum(len(t) for t in texts) >= config.CONTACT_MINING_MIN_BYTES:
+        batches = _split(texts, processes)
+        results = list(get_process_pool(processes).map(_scan, batches, [country_code] * len(batches)))
+    else:
+        results = [_scan(PAGE_SEPARATOR.join(texts), country_code)]
+    emails = dict.fromkeys(email for batch_emails, _ in results for email in batch_emails)
+    phones = dict.fromkeys(phone for _, batch_phones in results for phone in batch_phones)
+    return list(emails), list(phones)
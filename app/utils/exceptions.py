@@ -1,7 +1,10 @@
 
 import sys
 import os
-sys.path.insert(0, os.path.dirname(__file__))
+for _path in (os.path.dirname(__file__),):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+from typing import Optional
 
 class WebsiteNotFoundError(Exception):
     """Raised when the website cannot be accessed or doesn't exist"""
@@ -9,4 +12,13 @@ class WebsiteNotFoundError(Exception):
 
 class ScrapingError(Exception):
     """Raised when there's an error during the scraping process"""
-    pass
\ No newline at end of file
+    pass
+
+class HostUnavailableError(Exception):
+    """
+    Raised when a host can't be scraped right now: its circuit breaker is open, or it kept
+    throttling or failing through the retries. `retry_after` is a hint in seconds, if known.
+    """
+    def __init__(self, message: str = "", retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
@@ -1,10 +1,15 @@
 
 import sys
 import os
-sys.path.insert(0, os.path.dirname(__file__))
+for _path in (os.path.dirname(__file__),):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
 import re
 from typing import List
 
+EMAIL_REGEX = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', re.IGNORECASE)
+PHONE_REGEX = re.compile(r'(\+?\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}\b')
+
 def clean_text(text: str) -> str:
     """Clean and normalize text by removing extra whitespace and special characters"""
     if not text:
@@ -14,12 +19,9 @@ def clean_text(text: str) -> str:
     return text
 
 def extract_emails(text: str) -> List[str]:
-    """Extract all email addresses from text"""
-    email_regex = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-    return re.findall(email_regex, text, re.IGNORECASE)
+    """Extract all email addresses from text (raw matches; see contacts.mine_contacts for normalized ones)"""
+    return EMAIL_REGEX.findall(text)
 
 def extract_phone_numbers(text: str) -> List[str]:
     """Extract phone numbers from text (international formats)"""
-    phone_regex = r'(\+?\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}\b'
-    matches = re.finditer(phone_regex, text)
-    return [match.group() for match in matches]
\ No newline at end of file
+    return [match.group() for match in PHONE_REGEX.finditer(text)]
\ No newline at end of file
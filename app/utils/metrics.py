@@ -0,0 +1,201 @@
+
+import sys
+import os
+for _path in (os.path.dirname(os.path.dirname(__file__)),):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+import asyncio
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# A small in-process metrics registry rendered in the Prometheus text format (version 0.0.4),
+# so the hot path can be profiled in production without another dependency.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Per-request stage timings for the Server-Timing header: {stage: [total seconds, count]}.
+# Tasks and run_blocking() calls started by the request share the dict through the context.
+request_timings: ContextVar[Optional[Dict[str, List[float]]]] = ContextVar('request_timings', default=None)
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple:
+        return tuple(str(labels.get(n, "")) for n in self.label_names)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.label_names, k)} {_number(v)}" for k, v in values]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [bucket counts..., +Inf count], sum
+        self._series: Dict[Tuple, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._series.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        with self._lock:
+            series = sorted((k, list(c), t[0]) for k, (c, t) in self._series.items())
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float('inf')), counts):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """A value read from elsewhere (cache stats, ...) at scrape time"""
+
+    def __init__(self, name: str, help: str, kind: str, read: Callable[[], float]):
+        super().__init__(name, help)
+        self.kind = kind
+        self._read = read
+
+    def render(self) -> List[str]:
+        return self.header() + [f"{self.name} {_number(self._read())}"]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def callback(self, name: str, help: str, kind: str, read: Callable[[], float]) -> CallbackMetric:
+        return self.register(CallbackMetric(name, help, kind, read))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+STAGE_SECONDS = registry.histogram(
+    "insights_stage_seconds", "Time spent in each stage of the insights pipeline", ("stage",))
+STAGE_ERRORS = registry.counter(
+    "insights_stage_errors_total", "Stages that ended with an exception", ("stage",))
+FETCHED_BYTES = registry.counter(
+    "insights_fetched_bytes_total", "Response body bytes fetched from stores", ("kind",))
+ITEMS = registry.counter(
+    "insights_items_total", "Items extracted or written, by kind", ("kind",))
+LLM_TOKENS = registry.counter(
+    "insights_llm_tokens_total", "Tokens reported by Groq", ("type",))
+DB_ROWS = registry.counter(
+    "insights_db_rows_total", "Child rows changed by the writer", ("table", "change"))
+HTTP_RETRIES = registry.counter(
+    "insights_http_retries_total", "Store requests retried, by cause", ("reason",))
+HOST_REJECTED = registry.counter(
+    "insights_host_rejected_total", "Store requests refused locally because the host's circuit was open")
+
+
+class track:
+    """
+    Time a block as `stage`: observed into insights_stage_seconds, counted in
+    insights_stage_errors_total if it raises, and added to the request's Server-Timing.
+    """
+    __slots__ = ('stage', 'started', 'seconds')
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.started = 0.0
+        self.seconds = 0.0
+
+    def __enter__(self) -> 'track':
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self.started
+        STAGE_SECONDS.observe(self.seconds, stage=self.stage)
+        # cancellation (e.g. catalog pages past the end) is not a failure
+        if exc_type is not None and not issubclass(exc_type, asyncio.CancelledError):
+            STAGE_ERRORS.inc(stage=self.stage)
+        timings = request_timings.get()
+        if timings is not None:
+            entry = timings.setdefault(self.stage, [0.0, 0])
+            entry[0] += self.seconds
+            entry[1] += 1
+        return False
+
+    @property
+    def ms(self) -> float:
+        return round(self.seconds * 1000, 1)
+
+def server_timing(timings: Dict[str, List[float]]) -> str:
+    """Server-Timing header value; a stage that ran several times reports its total and count"""
+    return ", ".join(
+        f'{stage};dur={total * 1000:.1f}' + (f';desc="x{count}"' if count > 1 else "")
+        for stage, (total, count) in timings.items()
+    )
@@ -0,0 +1,41 @@
+"""
+Standalone worker: keeps stored insights fresh and runs queued scrape jobs without an API process.
+Run from app/ like the server: `python worker.py`
+"""
+import sys
+import os
+for _path in (os.path.join(os.path.dirname(__file__)),
+              os.path.join(os.path.dirname(__file__), 'services'),
+              os.path.join(os.path.dirname(__file__), 'utils')):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+import asyncio
+import logging
+from scheduler import get_scheduler
+from jobs import JobQueue
+from http_client import close_async_client
+from concurrency import shutdown_executor
+from contacts import shutdown_process_pool
+import config
+
+
+async def main():
+    scheduler = get_scheduler()
+    jobs = JobQueue(workers=config.WORKER_JOB_WORKERS)
+    jobs.start()
+    try:
+        await scheduler.run_forever()
+    finally:
+        await jobs.stop()
+        await scheduler.stop()
+        await close_async_client()
+        shutdown_executor()
+        shutdown_process_pool()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
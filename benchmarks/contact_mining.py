@@ -0,0 +1,86 @@
+"""
+Contact-mining throughput in MB of page text per second: the old per-call helpers
+(two regex passes per page plus set()) vs contacts.mine_contacts in one batched pass,
+single process and fanned out over a process pool.
+
+    python benchmarks/contact_mining.py --pages 400 --page-kb 64 --processes 4
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+sys.path.insert(0, os.path.join(ROOT, "app", "utils"))
+
+import config  # noqa: E402
+from helpers import extract_emails, extract_phone_numbers  # noqa: E402
+from contacts import mine_contacts, shutdown_process_pool  # noqa: E402
+
+FILLER = ("Soft cotton kurta with a relaxed fit, Rs. 1,299.00. Free shipping over Rs. 999 "
+          "on orders placed before 2024-03-31. Product 7234567890123 ships in 3-5 days. ")
+CONTACTS = ("Write to Support@MockStore.test or call +91 98765 43210. ",
+            "Wholesale: sales@mockstore.test, 022 2345 6789. ",
+            "US line (555) 123-4567, logo@2x.png ")
+
+
+def make_pages(count: int, page_kb: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    pages = []
+    for _ in range(count):
+        parts, size = [], 0
+        while size < page_kb * 1024:
+            chunk = rng.choice(CONTACTS) if rng.random() < 0.05 else FILLER
+            parts.append(chunk)
+            size += len(chunk)
+        pages.append("".join(parts))
+    return pages
+
+
+def legacy_mine(pages: list):
+    emails, phones = set(), set()
+    for text in pages:
+        emails.update(extract_emails(text))
+        phones.update(extract_phone_numbers(text))
+    return list(emails), list(phones)
+
+
+def run(label: str, fn, pages: list, megabytes: float, repeat: int):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(pages)
+        best = min(best, time.perf_counter() - start)
+    emails, phones = result
+    print(f"{label:>22}: {megabytes / best:7.1f} MB/s  ({best * 1000:7.1f} ms, "
+          f"{len(emails)} emails, {len(phones)} phones)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--page-kb", type=int, default=64)
+    parser.add_argument("--processes", type=int, default=max(2, os.cpu_count() or 2))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pages = make_pages(args.pages, args.page_kb)
+    megabytes = sum(len(p) for p in pages) / 2**20
+    print(f"{args.pages} pages, {megabytes:.1f} MB of text")
+    # always take the parallel path in the pool run, whatever the configured threshold
+    config.CONTACT_MINING_MIN_BYTES = 0
+    try:
+        run("legacy helpers", legacy_mine, pages, megabytes, args.repeat)
+        run("mine_contacts", lambda p: mine_contacts(p, processes=0), pages, megabytes, args.repeat)
+        # warm the pool up so worker start-up isn't billed to the first run
+        mine_contacts(pages[:2], processes=args.processes)
+        run(f"mine_contacts x{args.processes} proc", lambda p: mine_contacts(p, processes=args.processes),
+            pages, megabytes, args.repeat)
+    finally:
+        shutdown_process_pool()
+
+
+if __name__ == "__main__":
+    main()
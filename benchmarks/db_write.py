@@ -0,0 +1,179 @@
+"""
+Rows/second of the brand insights writer against a local SQLite stand-in for MySQL.
+
+Compares the old write path (one cursor.execute per row) with BrandInsightsWriter's
+batched executemany inside a single transaction, at several batch sizes, and the
+incremental (diff-based) mode re-writing an unchanged catalog.
+
+SQLite runs in-process, so --rtt-ms adds a simulated network round trip to every
+statement sent (execute, executemany batch, commit), as a MySQL server would cost.
+mysql.connector sends one multi-row INSERT per executemany batch, so a batch is one round trip.
+
+    python benchmarks/db_write.py --products 5000 --runs 5 --rtt-ms 0.3
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for sub in ("", "utils"):
+    sys.path.insert(0, os.path.join(ROOT, "app", sub))
+
+from db_insert import BrandInsightsWriter, PRODUCT_COLUMNS  # noqa: E402
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS brand_insights (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    store_url VARCHAR(255) UNIQUE NOT NULL,
+    privacy_policy TEXT, return_refund_policy TEXT, about_brand TEXT,
+    extracted_at DATETIME, important_links JSON, refresh_interval INT
+);
+CREATE TABLE IF NOT EXISTS products (
+    id VARCHAR(64) PRIMARY KEY, brand_id INT, product_id VARCHAR(64), title VARCHAR(255),
+    description TEXT, price VARCHAR(64), available VARCHAR(16), url VARCHAR(255), image_url VARCHAR(255)
+);
+CREATE TABLE IF NOT EXISTS hero_products (
+    id VARCHAR(64) PRIMARY KEY, brand_id INT, product_id VARCHAR(64), title VARCHAR(255),
+    description TEXT, price VARCHAR(64), available VARCHAR(16), url VARCHAR(255), image_url VARCHAR(255)
+);
+CREATE TABLE IF NOT EXISTS faqs (id INTEGER PRIMARY KEY AUTOINCREMENT, brand_id INT, question TEXT, answer TEXT);
+CREATE TABLE IF NOT EXISTS social_handles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, brand_id INT, platform VARCHAR(64), url VARCHAR(255), handle VARCHAR(128)
+);
+CREATE TABLE IF NOT EXISTS contact_info (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, brand_id INT, emails JSON, phone_numbers JSON, addresses JSON
+);
+CREATE TABLE IF NOT EXISTS product_snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, brand_id INT NOT NULL, product_id VARCHAR(64) NOT NULL,
+    price VARCHAR(64), available TINYINT(1), captured_at DATETIME NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scrape_jobs (
+    id CHAR(32) PRIMARY KEY, store_url VARCHAR(255) NOT NULL, llm_mode VARCHAR(16) NOT NULL,
+    status VARCHAR(16) NOT NULL, progress JSON, result TEXT, error JSON, attempts INT NOT NULL DEFAULT 0,
+    created_at DATETIME NOT NULL, started_at DATETIME, finished_at DATETIME, updated_at DATETIME NOT NULL,
+    active_key VARCHAR(272)
+);
+CREATE INDEX IF NOT EXISTS idx_products_brand ON products (brand_id, id);
+CREATE INDEX IF NOT EXISTS idx_hero_products_brand ON hero_products (brand_id, id);
+CREATE INDEX IF NOT EXISTS idx_snapshots_product ON product_snapshots (brand_id, product_id, captured_at);
+CREATE INDEX IF NOT EXISTS idx_snapshots_captured ON product_snapshots (captured_at);
+CREATE INDEX IF NOT EXISTS idx_scrape_jobs_status ON scrape_jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS idx_scrape_jobs_store ON scrape_jobs (store_url, status);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_scrape_jobs_active ON scrape_jobs (active_key);
+"""
+
+
+class RoundTripCursor:
+    def __init__(self, cursor, rtt: float):
+        self._cursor = cursor
+        self._rtt = rtt
+
+    def execute(self, *args):
+        time.sleep(self._rtt)
+        return self._cursor.execute(*args)
+
+    def executemany(self, *args):
+        time.sleep(self._rtt)
+        return self._cursor.executemany(*args)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class RoundTripConnection:
+    def __init__(self, cnx, rtt: float):
+        self._cnx = cnx
+        self._rtt = rtt
+
+    def cursor(self):
+        return RoundTripCursor(self._cnx.cursor(), self._rtt)
+
+    def commit(self):
+        time.sleep(self._rtt)
+        self._cnx.commit()
+
+    def __getattr__(self, name):
+        return getattr(self._cnx, name)
+
+
+def sqlite_connect(path: str, rtt: float):
+    sqlite3.connect(path).executescript(SQLITE_SCHEMA)
+
+    def connect():
+        return RoundTripConnection(sqlite3.connect(path), rtt)
+    return connect
+
+
+def make_insights(products: int) -> dict:
+    return {
+        "store_url": "https://bench.example.com/",
+        "privacy_policy": "", "return_refund_policy": "", "about_brand": "A benchmark brand.",
+        "extracted_at": "2025-01-01T00:00:00",
+        "important_links": {"contact_us": "https://bench.example.com/pages/contact"},
+        "product_catalog": [
+            {"id": str(i), "title": f"Product {i}", "description": f"<p>Description {i}</p>",
+            "price": f"{100 + i % 900}.00", "available": i % 2 == 0,
+            "url": f"https://bench.example.com/products/p-{i}", "image_url": f"https://cdn.example.com/{i}.jpg"}
+            for i in range(products)
+        ],
+        "hero_products": [], "faqs": [{"question": "COD?", "answer": "Yes"}],
+        "social_handles": [], "contact_info": {"emails": [], "phone_numbers": [], "addresses": []},
+    }
+
+
+def legacy_write(connect, data: dict):
+    """The previous write path: delete, then one INSERT round trip per product"""
+    cnx = connect()
+    cursor = cnx.cursor()
+    cursor.execute("INSERT OR IGNORE INTO brand_insights (store_url) VALUES (?)", (data["store_url"],))
+    cnx.commit()
+    cursor.execute("SELECT id FROM brand_insights WHERE store_url=?", (data["store_url"],))
+    brand_id = cursor.fetchone()[0]
+    cursor.execute("DELETE FROM products WHERE brand_id=?", (brand_id,))
+    for item in data["product_catalog"]:
+        cursor.execute(
+            f"INSERT INTO products (brand_id, {', '.join(PRODUCT_COLUMNS)}) VALUES ({', '.join(['?'] * 8)})",
+            (brand_id, *(item.get(col) for col in PRODUCT_COLUMNS))
+        )
+    cnx.commit()
+    cnx.close()
+
+
+def best_of(runs: int, fn) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--batch-sizes", default="100,500,2000")
+    parser.add_argument("--rtt-ms", type=float, default=0.3, help="simulated round trip per statement")
+    args = parser.parse_args()
+
+    data = make_insights(args.products)
+    with tempfile.TemporaryDirectory() as tmp:
+        connect = sqlite_connect(os.path.join(tmp, "bench.sqlite3"), args.rtt_ms / 1000)
+        elapsed = best_of(args.runs, lambda: legacy_write(connect, data))
+        print(f"{'row-at-a-time':>18}: {args.products / elapsed:>10.0f} rows/s")
+        for size in (int(s) for s in args.batch_sizes.split(",")):
+            writer = BrandInsightsWriter(connect, placeholder="?", dialect="sqlite", batch_size=size)
+            elapsed = best_of(args.runs, lambda: writer.write(data, mode="replace"))
+            print(f"{f'executemany x{size}':>18}: {args.products / elapsed:>10.0f} rows/s")
+        # a daily re-scrape of an unchanged store: the diff issues no child-row writes at all
+        writer = BrandInsightsWriter(connect, placeholder="?", dialect="sqlite")
+        writer.write(data, mode="incremental")
+        elapsed = best_of(args.runs, lambda: writer.write(data, mode="incremental"))
+        print(f"{'incremental (same)':>18}: {args.products / elapsed:>10.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+End-to-end latency, throughput and memory of GET /api/v1/insights, fully offline.
+
+Starts --stores mock Shopify stores and a stub Groq endpoint in this process, runs the API
+under uvicorn in a subprocess pointed at them (GROQ_BASE_URL, PERSIST_INSIGHTS=false unless
+--persist), fires --requests requests --concurrency at a time spread round-robin over the
+stores, and reports latency percentiles, requests/s and the server's peak RSS.
+
+The HTTP and LLM caches are disabled (and the stores send no ETags) so every request does a
+cold scrape and real LLM round trips; requests for a store that is already being scraped are
+coalesced, so keep --stores >= --concurrency to measure independent runs.
+
+    python benchmarks/e2e_insights.py --requests 100 --concurrency 10 --products 1000 --llm-latency 0.5
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import ExitStack
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "app")
+
+from mock_store import MockStore  # noqa: E402
+from mock_groq import MockGroq  # noqa: E402
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return float("nan")
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def start_api(port: int, env: dict) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=APP, env=env,
+    )
+
+
+def wait_ready(url: str, proc: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"API server exited with code {proc.returncode}")
+        try:
+            httpx.get(f"{url}/metrics", timeout=1.0)
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise RuntimeError("API server did not start in time")
+
+
+def peak_rss_mib(proc: subprocess.Popen) -> float:
+    """High-water RSS of the server: /proc on Linux, else rusage of reaped children"""
+    try:
+        with open(f"/proc/{proc.pid}/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+
+def children_peak_rss_mib() -> float:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def run_load(api: str, stores: list, requests: int, concurrency: int, llm: str):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one(client: httpx.AsyncClient, i: int):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await client.get(f"{api}/api/v1/insights",
+                                            params={"website_url": stores[i % len(stores)], "llm": llm})
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=300.0, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(one(client, i) for i in range(requests)))
+        elapsed = time.perf_counter() - start
+    return sorted(latencies), errors, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=2, help="requests sent before measuring")
+    parser.add_argument("--stores", type=int, default=None, help="mock stores (default: --concurrency)")
+    parser.add_argument("--products", type=int, default=1000, help="products per store")
+    parser.add_argument("--heroes", type=int, default=8, help="hero products on each homepage")
+    parser.add_argument("--homepage-kb", type=int, default=64, help="extra homepage markup (KiB)")
+    parser.add_argument("--store-latency", type=float, default=0.05, help="mock store latency per response (s)")
+    parser.add_argument("--llm", choices=("off", "partial", "full"), default="full")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="stub Groq latency per call (s)")
+    parser.add_argument("--llm-per-1k-tokens", type=float, default=0.0, help="extra stub latency per 1k prompt tokens (s)")
+    parser.add_argument("--host-rate", type=float, default=0, help="per-store request rate limit (0: off)")
+    parser.add_argument("--persist", action="store_true", help="write results to the configured MySQL database")
+    parser.add_argument("--server-timing", action="store_true", help="enable the Server-Timing header")
+    args = parser.parse_args()
+
+    with ExitStack() as stack:
+        stores = [
+            stack.enter_context(MockStore(products=args.products, latency=args.store_latency, etags=False,
+                                          heroes=args.heroes, homepage_kb=args.homepage_kb)).url
+            for _ in range(args.stores or args.concurrency)
+        ]
+        groq = stack.enter_context(MockGroq(latency=args.llm_latency, per_1k_tokens=args.llm_per_1k_tokens))
+        port = free_port()
+        env = dict(
+            os.environ,
+            GROQ_API_KEY=os.environ.get("GROQ_API_KEY") or "offline-benchmark",
+            GROQ_BASE_URL=groq.url,
+            HTTP_CACHE_DIR="",
+            LLM_CACHE_PATH="",
+            LLM_CACHE_MAX_ENTRIES="0",
+            PERSIST_INSIGHTS="true" if args.persist else "false",
+            SERVER_TIMING="true" if args.server_timing else "false",
+            SCHEDULER_ENABLED="false",
+            HOST_RATE=str(args.host_rate),
+        )
+        api = f"http://127.0.0.1:{port}"
+        proc = start_api(port, env)
+        try:
+            wait_ready(api, proc)
+            if args.warmup:
+                asyncio.run(run_load(api, stores, args.warmup, args.concurrency, args.llm))
+            calls_before = groq.calls
+            latencies, errors, elapsed = asyncio.run(
+                run_load(api, stores, args.requests, args.concurrency, args.llm))
+            rss = peak_rss_mib(proc)
+        finally:
+            proc.terminate()
+            proc.wait()
+        if rss != rss:  # nan: no /proc, fall back to rusage now the server has been reaped
+            rss = children_peak_rss_mib()
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, {len(stores)} stores x "
+          f"{args.products} products, llm={args.llm}")
+    print(f"  ok / errors : {len(latencies)} / {errors}")
+    print(f"  throughput  : {len(latencies) / elapsed:.1f} req/s ({elapsed:.2f}s)")
+    print("  latency     : " + "  ".join(
+        f"p{p}={percentile(latencies, p) * 1000:.0f}ms" for p in (50, 90, 95, 99)))
+    print(f"  groq calls  : {groq.calls - calls_before}")
+    print(f"  peak RSS    : {rss:.1f} MiB (API server)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Cold-start import budget of the API entry point (what a serverless cold start pays before the
+first request), measured with `python -X importtime -c "import main"` in fresh interpreters.
+
+Fails (exit code 1) if the median cumulative import time of `main` is over --budget-ms, or if
+any module that should only load on first use (Groq SDK, MySQL driver, SQLAlchemy, lxml) is
+imported at startup. No secrets are set, so it also checks that importing needs none.
+tests/test_import_time.py runs the same checks under pytest.
+
+    python benchmarks/import_time.py --runs 5 --budget-ms 900
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "app")
+
+# Heavy clients and parsers that must be loaded lazily, not imported by `import main`
+LAZY_MODULES = ("groq", "mysql.connector", "sqlalchemy", "lxml")
+BUDGET_MS = 900.0
+
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def measure() -> dict:
+    """{module: (self us, cumulative us, imported directly by main)} for one cold `import main`"""
+    env = {k: v for k, v in os.environ.items() if k not in ("GROQ_API_KEY", "DATABASE_URL")}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=APP, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        sys.exit(f"`import main` failed:\n{result.stderr[-2000:]}")
+    modules, children = {}, []
+    # a module's imports are listed before it, one level deeper
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if not match:
+            continue
+        own, cumulative, indent, name = match.groups()
+        depth = (len(indent) - 1) // 2
+        modules[name] = (int(own), int(cumulative), False)
+        if depth == 1:
+            children.append(name)
+        elif depth == 0:
+            if name == "main":
+                for child in children:
+                    modules[child] = modules[child][:2] + (True,)
+            children = []
+    return modules
+
+
+def eager_modules(modules: dict) -> list:
+    """The LAZY_MODULES (and their submodules) that one `import main` loaded"""
+    return sorted({name for name in modules for lazy in LAZY_MODULES if name == lazy or name.startswith(lazy + ".")})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    parser.add_argument("--top", type=int, default=12, help="slowest top-level imports to list")
+    args = parser.parse_args()
+
+    runs = [measure() for _ in range(args.runs)]
+    total = statistics.median(run["main"][1] for run in runs) / 1000
+    last = runs[-1]
+    # main's direct imports, slowest first
+    direct = sorted(
+        ((name, cumulative) for name, (_, cumulative, direct) in last.items() if direct),
+        key=lambda item: item[1], reverse=True,
+    )
+    for name, cumulative in direct[:args.top]:
+        print(f"{cumulative / 1000:>9.1f} ms  {name}")
+    print(f"{total:>9.1f} ms  import main (median of {args.runs}), budget {args.budget_ms:.0f} ms")
+
+    failures = []
+    if total > args.budget_ms:
+        failures.append(f"import main takes {total:.0f} ms, over the {args.budget_ms:.0f} ms budget")
+    eager = eager_modules(last)
+    if eager:
+        failures.append(f"imported at startup but should load on first use: {', '.join(eager)}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
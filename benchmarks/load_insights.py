@@ -0,0 +1,65 @@
+"""
+Throughput of the scrape stage behind /api/v1/insights against a local mock store.
+
+Compares the old behaviour (synchronous ShopifyScraper calls, which serialize on a
+single event loop) with AsyncShopifyScraper running N scrapes concurrently.
+
+    python benchmarks/load_insights.py --requests 50 --concurrency 10 --latency 0.05
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# one mock host takes every request here, so leave the per-host rate limit out of the measurement
+os.environ.setdefault("HOST_RATE", "0")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for sub in ("", "services", "utils", "models"):
+    sys.path.insert(0, os.path.join(ROOT, "app", sub))
+
+from mock_store import MockStore  # noqa: E402
+from scraper import ShopifyScraper, AsyncShopifyScraper  # noqa: E402
+from http_client import close_async_client  # noqa: E402
+
+
+def run_sync(url: str, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        ShopifyScraper(url).get_all_insights()
+    return time.perf_counter() - start
+
+
+async def run_async(url: str, n: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await AsyncShopifyScraper(url).get_all_insights()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(n)))
+    elapsed = time.perf_counter() - start
+    await close_async_client()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.05, help="mock store latency per response (s)")
+    parser.add_argument("--products", type=int, default=250)
+    args = parser.parse_args()
+
+    with MockStore(products=args.products, latency=args.latency) as store:
+        sync_elapsed = run_sync(store.url, args.requests)
+        async_elapsed = asyncio.run(run_async(store.url, args.requests, args.concurrency))
+
+    for name, elapsed in (("sync", sync_elapsed), (f"async x{args.concurrency}", async_elapsed)):
+        print(f"{name:>12}: {args.requests} scrapes in {elapsed:.2f}s -> {args.requests / elapsed:.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Local stub of Groq's OpenAI-compatible chat completions endpoint (no network access needed).
+
+Point the app at it with GROQ_BASE_URL=<stub url>. Every completion echoes the user message
+back as the JSON answer after `latency` seconds, plus `per_1k_tokens` seconds per 1k
+prompt tokens, so structuring keeps the scraped data and only the wait is simulated.
+"""
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler
+
+from mock_store import _Server
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class MockGroq:
+    """Threaded HTTP server answering POST .../chat/completions with an echo of the prompt."""
+
+    def __init__(self, latency: float = 0.5, per_1k_tokens: float = 0.0, port: int = 0):
+        self.latency = latency
+        self.per_1k_tokens = per_1k_tokens
+        self.calls = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                messages = request.get("messages", [])
+                content = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "{}")
+                prompt_tokens = sum(_tokens(m.get("content", "")) for m in messages)
+                with stub._lock:
+                    stub.calls += 1
+                time.sleep(stub.latency + stub.per_1k_tokens * prompt_tokens / 1000)
+                body = json.dumps({
+                    "id": f"chatcmpl-{uuid.uuid4().hex}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model", "mock"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": _tokens(content),
+                        "total_tokens": prompt_tokens + _tokens(content),
+                    },
+                }).encode()
+                try:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+        self.server = _Server(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,164 @@
+"""Local mock Shopify store used by the benchmarks (no network access needed)."""
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+def render_homepage(hero_count: int = 8, filler_kb: int = 0) -> str:
+    """
+    `filler_kb` pads the page with roughly that much extra markup, like a theme's sections. It goes
+    on the heroes' line so an empty filler adds no blank line (parse_extract.py compares page text).
+    """
+    filler = "".join(
+        f'<div class="collection-card"><p>Collection {i}: handpicked styles for every season and occasion.</p></div>'
+        for i in range(filler_kb * 1024 // 110)
+    )
+    heroes = "".join(
+        f'<div class="featured-product"><a href="/products/hero-{i}">'
+        f'<h2 class="product__title">Hero Product {i}</h2></a>'
+        f'<span class="price__regular">Rs. {499 + i}.00</span>'
+        f'<img src="//cdn.shopify.com/s/files/hero-{i}.jpg"></div>'
+        for i in range(hero_count)
+    )
+    return f"""<html><head><title>Mock Store</title></head><body>
+<section class="about-us"><p>We are a mock brand that makes comfortable everyday clothing for everyone, designed and stitched in India.</p></section>
+{heroes}{filler}
+<div class="faq-item"><div class="faq-question">Do you have COD?</div><div class="faq-answer">Yes, COD is available.</div></div>
+<h3>How long does shipping take?</h3><p>Orders ship within 3-5 business days.</p>
+<footer>
+<address>12 Mock Street, Jaipur, Rajasthan 302001 India</address>
+<p>Write to support@mockstore.test or call +91 98765 43210</p>
+<a href="https://instagram.com/mockstore">Instagram</a>
+<a href="https://facebook.com/mockstore">Facebook</a>
+<a href="https://mockstore.test/pages/contact">Contact Us</a>
+<a href="https://mockstore.test/blogs/news">Blogs</a>
+</footer></body></html>"""
+
+
+def render_policy(title: str, paragraphs: int = 12) -> str:
+    body = "".join(
+        f"<p>{title} clause {i}: we handle your orders and data with care and only as described here.</p>"
+        for i in range(paragraphs)
+    )
+    return f"""<html><head><title>{title}</title></head><body>
+<header><nav><a href="/">Home</a></nav></header>
+<main id="MainContent"><div class="shopify-policy__container">
+<h1 class="shopify-policy__title">{title}</h1><div class="shopify-policy__body"><div class="rte">{body}</div></div>
+</div></main>
+<footer><a href="https://instagram.com/mockstore">Instagram</a></footer></body></html>"""
+
+
+# Secondary pages the mock store has; /pages/faq and /pages/contact 404 like on many real stores
+SECONDARY_PAGES = {
+    "/policies/privacy-policy": "Privacy Policy",
+    "/policies/refund-policy": "Refund Policy",
+    "/pages/about": "About Us",
+}
+
+
+def render_product(pid: int) -> dict:
+    return {
+        "id": pid,
+        "title": f"Mock Product {pid}",
+        "handle": f"mock-product-{pid}",
+        "body_html": f"<p>Cotton kurta number {pid}, regular fit.</p>",
+        "available": pid % 3 != 0,
+        "variants": [{"price": f"{999 + pid % 500}.00"}],
+        "images": [{"src": f"https://cdn.shopify.com/s/files/mock-{pid}.jpg"}],
+    }
+
+
+class _Server(ThreadingHTTPServer):
+    # the default backlog of 5 drops SYNs under concurrent load, and each drop costs a 1s retransmit
+    request_queue_size = 256
+
+
+class MockStore:
+    """Threaded HTTP server serving a homepage, policy pages and /products.json with optional latency."""
+
+    def __init__(self, products: int = 250, latency: float = 0.05, port: int = 0, etags: bool = True,
+                 heroes: int = 8, homepage_kb: int = 0, throttle_rate: float = 0.0, error_rate: float = 0.0,
+                 retry_after: float = 1.0):
+        """`throttle_rate` of responses are 429 with Retry-After: `retry_after`, `error_rate` are 503"""
+        self.products = products
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.requests = 0
+        self.latency = latency
+        self.etags = etags
+        self.homepage = render_homepage(heroes, homepage_kb).encode()
+        self.pages = {path: render_policy(title).encode() for path, title in SECONDARY_PAGES.items()}
+        store = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                time.sleep(store.latency)
+                store.requests += 1
+                roll = random.random()
+                if roll < store.throttle_rate:
+                    self.send_response(429)
+                    self.send_header("Retry-After", f"{store.retry_after:g}")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                if roll < store.throttle_rate + store.error_rate:
+                    self.send_error(503)
+                    return
+                parsed = urlparse(self.path)
+                if parsed.path == "/products.json":
+                    body = json.dumps({"products": store.product_page(parse_qs(parsed.query))}).encode()
+                    content_type = "application/json"
+                elif parsed.path in ("", "/"):
+                    body, content_type = store.homepage, "text/html; charset=utf-8"
+                elif parsed.path in store.pages:
+                    body, content_type = store.pages[parsed.path], "text/html; charset=utf-8"
+                else:
+                    self.send_error(404)
+                    return
+                etag = '"%s"' % hashlib.md5(body).hexdigest()
+                try:
+                    if store.etags and self.headers.get("If-None-Match") == etag:
+                        self.send_response(304)
+                        self.send_header("ETag", etag)
+                        self.end_headers()
+                        return
+                    self.send_response(200)
+                    if store.etags:
+                        self.send_header("ETag", etag)
+                    self.send_header("Content-Type", content_type)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # the client cancelled the request (e.g. pages past the end of the catalog)
+                    pass
+
+        self.server = _Server(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def product_page(self, query: dict) -> list:
+        limit = min(int(query.get("limit", ["30"])[0]), 250)
+        page = int(query.get("page", ["1"])[0])
+        start = (page - 1) * limit
+        return [render_product(i) for i in range(start, min(start + limit, self.products))]
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
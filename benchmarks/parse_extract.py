@@ -0,0 +1,137 @@
+"""
+Parse-plus-extract time and peak memory: lxml single-pass engine vs the previous
+BeautifulSoup(html.parser) code, on saved Shopify homepages.
+
+    python benchmarks/parse_extract.py saved/memy.html saved/hairoriginals.html
+    python benchmarks/parse_extract.py --synthetic-heroes 300   # no saved pages needed
+
+Both extractors run on every page and their outputs are compared, so a parity
+regression shows up here too.
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from urllib.parse import urljoin
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for sub in ("", "services", "utils"):
+    sys.path.insert(0, os.path.join(ROOT, "app", sub))
+
+from bs4 import BeautifulSoup  # noqa: E402
+from helpers import clean_text  # noqa: E402
+from parser import parse_page, SOCIAL_PLATFORMS  # noqa: E402
+from mock_store import render_homepage  # noqa: E402
+
+
+def legacy_extract(content: bytes, base_url: str) -> dict:
+    """The pre-lxml extraction: html.parser plus one select()/find_all() pass per field"""
+    soup = BeautifulSoup(content, 'html.parser')
+    heroes = []
+    for selector in ['.hero__product', '.featured-product', '.product-slider__slide',
+                     'section[data-section-type="featured-product"]']:
+        for element in soup.select(selector):
+            try:
+                title = element.select_one('.product-title, .product__title').get_text(strip=True)
+                price = element.select_one('.product-price, .price__regular').get_text(strip=True)
+                url = element.find('a', href=True)['href']
+            except (AttributeError, KeyError, TypeError):
+                continue
+            if not url.startswith('http'):
+                url = urljoin(base_url, url)
+            img = element.find('img', src=True)
+            image_url = None
+            if img:
+                src = img['src']
+                image_url = f"https:{src}" if src.startswith('//') else src if src.startswith('http') else urljoin(base_url, src)
+            heroes.append({'title': title, 'price': price, 'url': url, 'image_url': image_url})
+    text = soup.get_text()
+    addresses = [a for a in (clean_text(e.get_text()) for e in soup.select('.footer-address, .contact-address, address'))
+                 if a and len(a.split()) > 3]
+    social = []
+    for a in soup.find_all('a', href=True):
+        href = a['href'].lower()
+        for domain, platform in SOCIAL_PLATFORMS.items():
+            if domain in href:
+                social.append((platform, href))
+                break
+    faqs = []
+    for item in soup.select('.faq-item, .accordion__item'):
+        try:
+            faqs.append((item.select_one('.faq-question, .accordion__title').get_text(strip=True),
+                         item.select_one('.faq-answer, .accordion__content').get_text(strip=True)))
+        except AttributeError:
+            continue
+    for heading in soup.select('h3, h4'):
+        question, answer = heading.get_text(strip=True), []
+        sibling = heading.next_sibling
+        while sibling and getattr(sibling, 'name', None) not in ['h3', 'h4']:
+            if getattr(sibling, 'name', None) == 'p':
+                answer.append(sibling.get_text(strip=True))
+            sibling = sibling.next_sibling
+        if question and answer:
+            faqs.append((question, ' '.join(answer)))
+    about = ""
+    for block in soup.select('.about-content, .about, .about-us, .rte, .page-content'):
+        block_text = clean_text(block.get_text())
+        if block_text and len(block_text.split()) > 10:
+            about = block_text
+            break
+    links = {}
+    footer = soup.find('footer')
+    if footer:
+        for a in footer.find_all('a', href=True):
+            label = clean_text(a.get_text())
+            if label and len(label) > 2 and a['href'].startswith('http'):
+                links[label.lower().replace(' ', '_')] = a['href']
+    return {'text': text, 'hero_products': heroes, 'addresses': addresses, 'faqs': faqs,
+            'about_brand': about, 'important_links': links, 'social_links': social}
+
+
+LEGACY_FIELDS = ('text', 'hero_products', 'addresses', 'faqs', 'about_brand', 'important_links', 'social_links')
+
+
+def lxml_extract(content: bytes, base_url: str) -> dict:
+    page = parse_page(content, base_url)
+    return {field: getattr(page, field) for field in LEGACY_FIELDS}
+
+
+def measure(fn, content: bytes, base_url: str, runs: int):
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(content, base_url)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn(content, base_url)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pages", nargs="*", help="saved homepage HTML files")
+    parser.add_argument("--synthetic-heroes", type=int, default=200,
+                        help="hero cards in the synthetic homepage used when no files are given")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--base-url", default="https://store.example.com/")
+    args = parser.parse_args()
+
+    pages = [(path, open(path, "rb").read()) for path in args.pages]
+    if not pages:
+        pages = [(f"synthetic ({args.synthetic_heroes} heroes)", render_homepage(args.synthetic_heroes).encode())]
+
+    for name, content in pages:
+        old_time, old_peak = measure(legacy_extract, content, args.base_url, args.runs)
+        new_time, new_peak = measure(lxml_extract, content, args.base_url, args.runs)
+        same = legacy_extract(content, args.base_url) == lxml_extract(content, args.base_url)
+        print(f"{name} [{len(content) / 1024:.0f} KiB] outputs {'match' if same else 'DIFFER'}")
+        print(f"  bs4 html.parser: {old_time * 1000:8.1f} ms  peak {old_peak / 2**20:6.1f} MiB")
+        print(f"  lxml one-pass  : {new_time * 1000:8.1f} ms  peak {new_peak / 2**20:6.1f} MiB"
+              f"  ({old_time / new_time:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Time and memory per 10k products for the scrape -> structurize hand-off:
+per-item Pydantic models (Product + BrandInsights, then __dict__ + make_serializable)
+vs __slots__ records serialized with to_dict(), alone and with the one BrandInsights
+validation the pipeline runs at the API boundary.
+
+    python benchmarks/product_records.py --products 10000
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from urllib.parse import urljoin
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for sub in ("", "models", "services", "utils", "llm"):
+    sys.path.insert(0, os.path.join(ROOT, "app", sub))
+
+from mock_store import render_product  # noqa: E402
+from helpers import clean_text  # noqa: E402
+from schemas import BrandInsights, ContactInfo, Product  # noqa: E402
+from scraper import ShopifyScraper  # noqa: E402
+from structurizer import make_serializable  # noqa: E402
+
+BASE_URL = "https://store.example.com/"
+
+
+def legacy_build(scraper: ShopifyScraper, products_data: list) -> dict:
+    """The previous path: a validated Product per item, then make_serializable over BrandInsights.__dict__"""
+    catalog = [
+        Product(
+            id=str(product.get('id', '')),
+            title=product.get('title', ''),
+            description=clean_text(product.get('body_html', '')),
+            price=scraper._get_product_price(product),
+            available=product.get('available', False),
+            url=urljoin(BASE_URL, f"/products/{product.get('handle', '')}"),
+            image_url=scraper._get_product_image(product)
+        )
+        for product in products_data
+    ]
+    insights = BrandInsights(
+        store_url=BASE_URL, product_catalog=catalog, hero_products=[], privacy_policy="",
+        return_refund_policy="", faqs=[], social_handles=[],
+        contact_info=ContactInfo(emails=[], phone_numbers=[], addresses=[]),
+        about_brand="", important_links={}, extracted_at="", metadata={}
+    )
+    return make_serializable(insights.__dict__)
+
+
+def record_build(scraper: ShopifyScraper, products_data: list) -> dict:
+    record = scraper._build_insights(scraper._build_products(products_data), None)
+    return record.to_dict()
+
+
+def validated_record_build(scraper: ShopifyScraper, products_data: list) -> dict:
+    record = scraper._build_insights(scraper._build_products(products_data), None)
+    scraper.validate(record)
+    return record.to_dict()
+
+
+def measure(label: str, fn, scraper, products_data: list, per: int, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn(scraper, products_data)
+        best = min(best, time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    result = fn(scraper, products_data)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    scale = per / len(products_data)
+    print(f"{label:>18}: {best * scale * 1000:8.1f} ms  peak {peak * scale / 2**20:6.1f} MiB"
+          f"  retained {retained * scale / 2**20:6.1f} MiB  per {per} products")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    scraper = ShopifyScraper(BASE_URL)
+    products_data = [render_product(i) for i in range(args.products)]
+    old = measure("pydantic models", legacy_build, scraper, products_data, 10000, args.repeat)
+    new = measure("slots records", record_build, scraper, products_data, 10000, args.repeat)
+    validated = measure("records + validate", validated_record_build, scraper, products_data, 10000, args.repeat)
+    print(f"{old / new:.1f}x faster, {old / validated:.1f}x with the boundary validation")
+
+
+if __name__ == "__main__":
+    main()
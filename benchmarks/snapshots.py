@@ -0,0 +1,137 @@
+"""
+Cost of product price/availability snapshots, against the SQLite stand-in of db_write.py.
+
+Write side: re-writes one brand's catalog with --change-pct of the prices changed, with and
+without snapshots, and reports the time and the snapshot rows appended.
+
+Read side: bulk-loads --rows synthetic snapshot rows (--brands stores x --products products,
+spread over --days) and times a product's price history and the first --pages pages of
+"what changed since T" for a T near the end of the range, with their query plans.
+
+    python benchmarks/snapshots.py --rows 2000000 --products 5000 --change-pct 5
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for sub in ("", "utils", "services"):
+    sys.path.insert(0, os.path.join(ROOT, "app", sub))
+
+from db_write import sqlite_connect, make_insights  # noqa: E402
+from db_insert import BrandInsightsWriter, snapshot_time  # noqa: E402
+from storage import InsightsStore, decode_snapshot_cursor  # noqa: E402
+
+
+def timed(fn, runs: int = 5) -> float:
+    """Median wall time of `fn` in ms"""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def bench_writes(connect, products: int, change_pct: float):
+    data = make_insights(products)
+    changed = dict(data, product_catalog=[dict(p) for p in data["product_catalog"]])
+    for product in random.sample(changed["product_catalog"], int(products * change_pct / 100)):
+        product["price"] = f"{float(product['price']) + 1:.2f}"
+    for snapshots in (False, True):
+        writer = BrandInsightsWriter(connect, placeholder="?", dialect="sqlite", snapshots=snapshots)
+        writer.write(data, mode="incremental")
+        samples, appended = [], 0
+        for version in (changed, data) * 3:
+            start = time.perf_counter()
+            counts = writer.write(version, mode="incremental")
+            samples.append((time.perf_counter() - start) * 1000)
+            appended = counts.get("product_snapshots", {}).get("inserted", 0)
+        label = "with snapshots" if snapshots else "no snapshots"
+        print(f"  {label:<15}: {statistics.median(samples):>8.1f} ms per re-write, {appended} snapshot rows appended")
+
+
+def load_snapshots(path: str, rows: int, brands: int, products: int, days: int) -> datetime:
+    db = sqlite3.connect(path)
+    db.executemany("INSERT OR IGNORE INTO brand_insights (id, store_url) VALUES (?, ?)",
+                   [(b, f"https://store-{b}.example.com/") for b in range(1, brands + 1)])
+    start = datetime(2025, 1, 1)
+    step = days * 86400 / rows
+    batch = []
+    for i in range(rows):
+        batch.append((random.randint(1, brands), str(random.randrange(products)), f"{random.randint(100, 999)}.00",
+                      random.random() < 0.9, snapshot_time(start + timedelta(seconds=i * step))))
+        if len(batch) == 50000:
+            db.executemany("INSERT INTO product_snapshots (brand_id, product_id, price, available, captured_at)"
+                           " VALUES (?, ?, ?, ?, ?)", batch)
+            batch = []
+    if batch:
+        db.executemany("INSERT INTO product_snapshots (brand_id, product_id, price, available, captured_at)"
+                       " VALUES (?, ?, ?, ?, ?)", batch)
+    db.commit()
+    db.execute("ANALYZE")
+    db.close()
+    return start + timedelta(days=days)
+
+
+def plan(path: str, sql: str, params: tuple) -> str:
+    db = sqlite3.connect(path)
+    details = [row[-1] for row in db.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+    db.close()
+    return "; ".join(details)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000, help="snapshot rows to load")
+    parser.add_argument("--brands", type=int, default=200)
+    parser.add_argument("--products", type=int, default=5000, help="products per store")
+    parser.add_argument("--days", type=int, default=365, help="time span of the loaded snapshots")
+    parser.add_argument("--change-pct", type=float, default=5.0, help="prices changed per re-write")
+    parser.add_argument("--limit", type=int, default=100, help="page size")
+    parser.add_argument("--pages", type=int, default=20, help="changes-since pages to walk")
+    args = parser.parse_args()
+    random.seed(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Re-writing a {args.products}-product catalog with {args.change_pct:g}% of prices changed:")
+        bench_writes(sqlite_connect(os.path.join(tmp, "writes.sqlite3"), 0), args.products, args.change_pct)
+
+        path = os.path.join(tmp, "snapshots.sqlite3")
+        connect = sqlite_connect(path, 0)
+        start = time.perf_counter()
+        end = load_snapshots(path, args.rows, args.brands, args.products, args.days)
+        print(f"\nLoaded {args.rows} snapshot rows in {time.perf_counter() - start:.1f}s")
+        store = InsightsStore(connect, "?", "sqlite")
+
+        history = timed(lambda: store.price_history(1, "42", args.limit))
+        print(f"  price history, first page  : {history:>7.2f} ms")
+        print(f"    plan: {plan(path, 'SELECT id FROM product_snapshots s WHERE s.brand_id=? AND s.product_id=? ORDER BY s.captured_at, s.id', (1, '42'))}")
+
+        since = end - timedelta(days=1)
+
+        def walk():
+            after, rows = None, 0
+            for _ in range(args.pages):
+                changes, cursor = store.changes_since(since, args.limit, after)
+                rows += len(changes)
+                if cursor is None:
+                    break
+                after = decode_snapshot_cursor(cursor)
+            return rows
+
+        first = timed(lambda: store.changes_since(since, args.limit))
+        pages = timed(walk, runs=3)
+        print(f"  changes since T, first page: {first:>7.2f} ms")
+        print(f"  changes since T, {args.pages} pages  : {pages:>7.2f} ms ({walk()} rows)")
+        print(f"    plan: {plan(path, 'SELECT s.id FROM product_snapshots s JOIN brand_insights b ON b.id = s.brand_id WHERE s.captured_at >= ? ORDER BY s.captured_at, s.id LIMIT 100', (snapshot_time(since),))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+"""Cold-start import budget of the API entry point (see benchmarks/import_time.py)"""
+import os
+import statistics
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import import_time  # noqa: E402
+
+
+def test_import_main_stays_within_budget_and_lazy():
+    runs = [import_time.measure() for _ in range(3)]
+    total_ms = statistics.median(run["main"][1] for run in runs) / 1000
+    assert total_ms <= import_time.BUDGET_MS, f"import main takes {total_ms:.0f} ms"
+    assert import_time.eager_modules(runs[-1]) == []